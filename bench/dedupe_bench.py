@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark for near-duplicate merging (dedupe.py).
+
+Builds a synthetic corpus (search_bench's Zipf vocabulary) in which a
+share of the quotes are altered copies of others: different case and
+punctuation, a word replaced or dropped, the author shortened or set to
+"Unknown". Reports the time taken and how many of the planted copies
+were merged (recall) and how many merges were wrong (false merges).
+
+    python bench/dedupe_bench.py [--quotes 1000000] [--duplicates 0.2] [--workers N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import dedupe  # noqa: E402
+from search_bench import synthetic_corpus  # noqa: E402
+
+
+def alter(entry, rng):
+    words = entry["quote"].split()
+    change = rng.randrange(4)
+    if change == 0:
+        text = " ".join(words).upper() + "!"
+    elif change == 1:
+        text = ", ".join(words[:len(words) // 2]) + "; " + " ".join(words[len(words) // 2:]) + "."
+    elif change == 2:
+        words[rng.randrange(len(words))] = "wchanged"
+        text = " ".join(words)
+    else:
+        del words[rng.randrange(len(words))]
+        text = " ".join(words)
+    author = rng.choice([entry["author"], entry["author"].split()[0], "Unknown"])
+    return {"quote": text, "author": author}
+
+
+def planted_corpus(count, share, seed=2):
+    """Quotes plus, for each planted copy, the index of its original."""
+    rng = random.Random(seed)
+    originals = int(count * (1 - share))
+    quotes = synthetic_corpus(originals)
+    copy_of = {}
+    for _ in range(count - originals):
+        source = rng.randrange(originals)
+        copy_of[len(quotes)] = source
+        quotes.append(alter(quotes[source], rng))
+    order = list(range(count))
+    rng.shuffle(order)
+    position = {old: new for new, old in enumerate(order)}
+    return ([quotes[i] for i in order],
+            {position[c]: position[o] for c, o in copy_of.items()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quotes", type=int, default=1_000_000)
+    parser.add_argument("--duplicates", type=float, default=0.2,
+                        help="share of the corpus that are altered copies")
+    parser.add_argument("--workers", type=int, help="processes for signatures")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    quotes, copy_of = planted_corpus(args.quotes, args.duplicates)
+    generated = time.perf_counter()
+    kept, merged = dedupe.dedupe_quotes(quotes, workers=args.workers)
+    deduped = time.perf_counter()
+
+    group_of = {}
+    for number, record in enumerate(merged):
+        group_of[record["index"]] = number
+        for collapsed in record["collapsed"]:
+            group_of[collapsed["index"]] = number
+    found = sum(1 for copy, original in copy_of.items()
+                if copy in group_of and group_of[copy] == group_of.get(original))
+    # A group is wrong if it joins quotes that were not planted copies of one another
+    roots = {}
+    for index, number in group_of.items():
+        roots.setdefault(number, set()).add(copy_of.get(index, index))
+    false = sum(1 for members in roots.values() if len(members) > 1)
+
+    print(json.dumps({
+        "quotes": args.quotes,
+        "planted_copies": len(copy_of),
+        "generate_s": round(generated - start, 2),
+        "dedupe_s": round(deduped - generated, 2),
+        "kept": len(kept),
+        "groups_merged": len(merged),
+        "recall": round(found / max(1, len(copy_of)), 4),
+        "false_groups": false,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+A stand-in Hyprland for benchmarks.
+
+FakeHyprland serves the two sockets the overlay talks to, under
+ROOT/hypr/SIGNATURE/ (point XDG_RUNTIME_DIR at ROOT and set
+HYPRLAND_INSTANCE_SIGNATURE):
+
+  .socket.sock    j/clients, j/activeworkspace, j/monitors, dispatch ...,
+                  keyword ... and [[BATCH]] requests; every dispatch is
+                  recorded with its arrival time so a benchmark can wait
+                  for it
+  .socket2.sock   events emitted by switch(), open_window(), close_window()
+
+Workspaces and clients are scripted from the benchmark. Dispatches are
+logged; `movetoworkspacesilent` and `pin` also act on known clients the
+way Hyprland's do (`pin` toggles, and a pinned window stays out of
+special workspaces). Keywords (window rules) are only logged. The
+overlay's own windows are invisible to the fake too, so the benchmark
+adds a client under the title each one will look itself up by.
+
+Run as a program, this file is a fake `hyprctl` for the subprocess
+fallback: it forwards its arguments to the fake request socket and
+appends one line per invocation to $FAKE_HYPRCTL_LOG.
+"""
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+
+class FakeHyprland:
+    def __init__(self, root, signature="hyprquotes-bench"):
+        self.root = root
+        self.signature = signature
+        self.directory = os.path.join(root, "hypr", signature)
+        self.clients = {}           # address -> client dict as in `clients -j`
+        self.active = "1"
+        self.dispatches = []        # (perf_counter time, dispatch text)
+        self.keywords = []
+        self.requests = 0
+        self._subscribers = []
+        self._next_address = 0x5000
+        self._cond = threading.Condition()
+        self._servers = []
+        self._running = False
+
+    @property
+    def request_path(self):
+        return os.path.join(self.directory, ".socket.sock")
+
+    @property
+    def event_path(self):
+        return os.path.join(self.directory, ".socket2.sock")
+
+    def environ(self):
+        """Environment entries that make hypripc find this compositor."""
+        return {"XDG_RUNTIME_DIR": self.root,
+                "HYPRLAND_INSTANCE_SIGNATURE": self.signature}
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._running = True
+        for path, accept in ((self.request_path, self._serve_request),
+                             (self.event_path, self._subscribe)):
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(path)
+            server.listen(16)
+            self._servers.append(server)
+            threading.Thread(target=self._accept_loop, args=(server, accept),
+                             daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        for server in self._servers:
+            try:
+                server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            server.close()
+        with self._cond:
+            for conn in self._subscribers:
+                conn.close()
+            self._subscribers = []
+        for path in (self.request_path, self.event_path):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _accept_loop(self, server, accept):
+        while self._running:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            accept(conn)
+
+    # ── Scripting ────────────────────────────────────────────────────────────
+    def open_window(self, workspace, window_class="kitty", title="terminal"):
+        with self._cond:
+            address = f"0x{self._next_address:x}"
+            self._next_address += 1
+            self.clients[address] = {
+                "address": address, "mapped": True, "hidden": False, "pinned": False,
+                "workspace": {"id": _workspace_id(workspace), "name": workspace},
+                "class": window_class, "title": title, "pid": 0,
+            }
+        self.emit("openwindow", f"{address[2:]},{workspace},{window_class},{title}")
+        return address
+
+    def close_window(self, address):
+        with self._cond:
+            self.clients.pop(address, None)
+        self.emit("closewindow", address[2:])
+
+    def switch(self, workspace):
+        """Make *workspace* active and announce it; returns the send time."""
+        with self._cond:
+            self.active = workspace
+        sent = time.perf_counter()
+        self.emit("workspace", workspace)
+        self.emit("workspacev2", f"{_workspace_id(workspace)},{workspace}")
+        return sent
+
+    def emit(self, name, data):
+        line = f"{name}>>{data}\n".encode("utf-8")
+        with self._cond:
+            subscribers = list(self._subscribers)
+        for conn in subscribers:
+            try:
+                conn.sendall(line)
+            except OSError:
+                with self._cond:
+                    if conn in self._subscribers:
+                        self._subscribers.remove(conn)
+
+    def wait_for_dispatch(self, predicate, after=0.0, timeout=5.0):
+        """First dispatch received after *after* matching *predicate*, as (time, text)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for received, text in self.dispatches:
+                    if received >= after and predicate(text):
+                        return received, text
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def wait_for_subscriber(self, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._subscribers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # ── Sockets ──────────────────────────────────────────────────────────────
+    def _subscribe(self, conn):
+        with self._cond:
+            self._subscribers.append(conn)
+            self._cond.notify_all()
+
+    def _serve_request(self, conn):
+        with conn:
+            try:
+                conn.settimeout(1.0)
+                request = conn.recv(65536).decode("utf-8", "replace")
+                conn.sendall(self.reply(request).encode("utf-8"))
+            except OSError:
+                pass
+
+    def _apply_dispatch(self, text):
+        name, _, args = text.partition(" ")
+        if name == "pin":
+            client = self.clients.get(args.partition("address:")[2])
+            if client is not None:
+                client["pinned"] = not client["pinned"]
+        elif name == "movetoworkspacesilent":
+            workspace, _, target = args.partition(",")
+            client = self.clients.get(target.partition("address:")[2])
+            if client is not None and not (client["pinned"] and workspace.startswith("special")):
+                client["workspace"] = {"id": _workspace_id(workspace), "name": workspace}
+
+    def client(self, address):
+        """A copy of the client at *address* as `clients -j` reports it, or None."""
+        with self._cond:
+            client = self.clients.get(address)
+            return json.loads(json.dumps(client)) if client else None
+
+    def reply(self, request):
+        with self._cond:
+            self.requests += 1
+        if request.startswith("[[BATCH]]"):
+            return "".join(self.reply(part.strip())
+                           for part in request[len("[[BATCH]]"):].split(";") if part.strip())
+        if request.startswith("dispatch "):
+            with self._cond:
+                self._apply_dispatch(request[len("dispatch "):])
+                self.dispatches.append((time.perf_counter(), request[len("dispatch "):]))
+                self._cond.notify_all()
+            return "ok"
+        if request.startswith("keyword "):
+            with self._cond:
+                self.keywords.append(request[len("keyword "):])
+            return "ok"
+        with self._cond:
+            if request == "j/clients":
+                return json.dumps(list(self.clients.values()))
+            windows = sum(c["workspace"]["name"] == self.active for c in self.clients.values())
+            workspace = {"id": _workspace_id(self.active), "name": self.active,
+                         "monitor": "FAKE-1", "windows": windows}
+            if request == "j/activeworkspace":
+                return json.dumps(workspace)
+            if request == "j/monitors":
+                return json.dumps([{
+                    "id": 0, "name": "FAKE-1", "width": 1920, "height": 1080,
+                    "x": 0, "y": 0, "scale": 1.0, "focused": True,
+                    "activeWorkspace": {"id": workspace["id"], "name": workspace["name"]},
+                }])
+        return "unknown request"
+
+
+def _workspace_id(name):
+    return int(name) if name.lstrip("-").isdigit() else -99
+
+
+def write_fake_hyprctl(directory):
+    """Create an executable `hyprctl` in *directory* that runs this module."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "hyprctl")
+    with open(path, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" "$@"\n')
+    os.chmod(path, 0o755)
+    return path
+
+
+def hyprctl_main(argv):
+    """Minimal hyprctl: `CMD [-j]`, `dispatch|keyword ARGS...`, `--batch "a ; b"`."""
+    log = os.environ.get("FAKE_HYPRCTL_LOG")
+    if log:
+        with open(log, "a") as f:
+            f.write(" ".join(argv) + "\n")
+    if argv[:1] == ["--batch"]:
+        request = "[[BATCH]]" + ";".join(c.strip() for c in argv[1].split(";"))
+    elif argv[:1] in (["dispatch"], ["keyword"]):
+        request = " ".join(argv)
+    else:
+        request = ("j/" if "-j" in argv else "") + argv[0]
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE", "")
+    path = os.path.join(os.environ.get("XDG_RUNTIME_DIR", ""), "hypr", signature,
+                        ".socket.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError as e:
+            print(f"HYPRLAND_INSTANCE_SIGNATURE invalid or socket missing: {e}",
+                  file=sys.stderr)
+            return 1
+        sock.sendall(request.encode("utf-8"))
+        reply = b"".join(iter(lambda: sock.recv(65536), b""))
+    sys.stdout.write(reply.decode("utf-8", "replace"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(hyprctl_main(sys.argv[1:]))
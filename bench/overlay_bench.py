@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+Headless benchmark suite for the overlay, driven by a fake compositor.
+
+Runs without Hyprland: bench/fakehypr.py provides the request and event
+sockets (plus a fake `hyprctl` on PATH), and the overlay renders into
+Xvfb or, failing that, a GTK Broadway server. HOME, XDG dirs and the
+control socket all live in a temporary directory, so a real session and
+its caches are never touched.
+
+Measured:
+  corpus      load time for 1k / 100k / 1M synthetic quotes: JSON (with
+              normalization), compile, open compiled, quotes.d cold/warm
+  switch      workspace event -> show / hide dispatch received, per cycle
+  idle        CPU seconds, child processes, hyprctl runs, context switches
+              and overlay wakeups while hidden and while shown, scaled to
+              one hour
+  render      CPU per quote change (`hyprquotes next`, including the
+              crossfade in card mode) and resident memory afterwards
+  shared      total proportional memory (PSS) of 1 and N sessions holding
+              a corpus and its search index: each with a private copy vs.
+              all mapping one `--publish-shared` corpus in a tmpfs directory
+  stream      `hyprquotes --stream` with no display at all: time from a
+              workspace switch to the JSON line, idle CPU hidden and shown,
+              resident memory, and whether GTK got loaded (it must not)
+
+The overlay sections run once per --render mode, so the GTK label path
+and the Cairo card path can be compared side by side.
+
+    python bench/overlay_bench.py [--cycles 20] [--idle 30] [--append results.jsonl]
+    python bench/overlay_bench.py --only overlay --render card --transitions 50
+    python bench/overlay_bench.py --only stream --idle 10
+    python bench/overlay_bench.py --only corpus --sizes 1000 100000
+    python bench/overlay_bench.py --only shared --sessions 16 --sizes 100000
+"""
+import argparse
+import json
+import os
+import re
+import select
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, ROOT)
+
+import control  # noqa: E402
+import corpus  # noqa: E402
+import shared  # noqa: E402
+from config import SPECIAL_WORKSPACE  # noqa: E402
+from fakehypr import FakeHyprland, write_fake_hyprctl  # noqa: E402
+from search_bench import synthetic_corpus  # noqa: E402
+from startup_bench import git_label  # noqa: E402
+from workspaces import IGNORED_WINDOW, overlay_title  # noqa: E402
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+START_TIMEOUT = 30
+# Long enough for a card crossfade to finish between two `next`s
+TRANSITION_SETTLE = 0.4
+
+
+def millis(seconds):
+    return round(seconds * 1000, 3)
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "p50_ms": millis(statistics.median(samples)),
+        "p95_ms": millis(samples[min(len(samples) - 1, int(len(samples) * 0.95))]),
+        "max_ms": millis(samples[-1]),
+    }
+
+
+# ── Corpus load ──────────────────────────────────────────────────────────────
+def bench_corpus(sizes, workdir):
+    results = {}
+    for size in sizes:
+        quotes = synthetic_corpus(size)
+        directory = os.path.join(workdir, f"corpus-{size}")
+        quotes_dir = os.path.join(directory, "quotes.d")
+        os.makedirs(quotes_dir)
+        source = os.path.join(quotes_dir, "quotes.json")
+        with open(source, "w") as f:
+            json.dump(quotes, f)
+        del quotes
+
+        timings = {}
+        start = time.perf_counter()
+        loaded = corpus.load_corpus(source)
+        timings["json_ms"] = millis(time.perf_counter() - start)
+        del loaded
+
+        compiled = os.path.join(directory, "quotes.hqc")
+        start = time.perf_counter()
+        corpus.compile_file(source, compiled)
+        timings["compile_ms"] = millis(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        loaded = corpus.load_corpus(compiled)
+        loaded[len(loaded) // 2]
+        timings["compiled_open_ms"] = millis(time.perf_counter() - start)
+        loaded.close()
+
+        cache = os.path.join(directory, "cache")
+        for phase in ("quotes_dir_cold_ms", "quotes_dir_warm_ms"):
+            start = time.perf_counter()
+            loaded = corpus.load_quote_dir(quotes_dir, cache)
+            timings[phase] = millis(time.perf_counter() - start)
+            loaded.close()
+        results[str(size)] = timings
+        shutil.rmtree(directory)
+    return results
+
+
+# ── Shared corpus ────────────────────────────────────────────────────────────
+# A session as far as memory goes: the corpus, every quote touched once, and
+# the search index --filter would use
+SESSION = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import config
+if sys.argv[2] == "shared":
+    config.use_shared_corpus(sys.argv[3])
+else:
+    config.QUOTES_FILE = sys.argv[3]
+path, quotes = config.load_quotes()
+for entry in quotes:
+    pass
+config.open_search_index(path, quotes).search("the")
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def process_pss(pid):
+    """Proportional set size in MiB: shared pages split between their users."""
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        kilobytes = int(re.search(r"^Pss:\s+(\d+)", f.read(), re.M).group(1))
+    return kilobytes / 1024
+
+
+def session_pss(mode, argument, sessions, workdir):
+    processes = []
+    try:
+        for n in range(sessions):
+            home = os.path.join(workdir, f"{mode}-{n}")
+            os.makedirs(home, exist_ok=True)
+            source = argument
+            if mode == "private":
+                source = os.path.join(home, "quotes.json")
+                shutil.copy(argument, source)
+            env = dict(os.environ, HOME=home, XDG_CACHE_HOME=os.path.join(home, ".cache"),
+                       XDG_STATE_HOME=os.path.join(home, ".state"))
+            process = subprocess.Popen(
+                [sys.executable, "-c", SESSION, ROOT, mode, source], env=env, text=True,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+            processes.append(process)
+            if process.stdout.readline().strip() != "ready":
+                raise RuntimeError(f"{mode} session exited with {process.wait()}")
+        return round(sum(process_pss(p.pid) for p in processes), 1)
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+
+
+def bench_shared(size, sessions, workdir):
+    workdir = os.path.join(workdir, "shared")
+    os.makedirs(workdir)
+    source = os.path.join(workdir, "quotes.json")
+    with open(source, "w") as f:
+        json.dump(synthetic_corpus(size), f)
+    # tmpfs like /dev/shm, but private to this run
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else workdir
+    directory = tempfile.mkdtemp(prefix="hyprquotes-bench-", dir=base)
+    os.chmod(directory, 0o755)
+    try:
+        start = time.perf_counter()
+        shared.publish(source, directory)
+        results = {"quotes": size, "publish_ms": millis(time.perf_counter() - start)}
+        for mode, argument in (("private", source), ("shared", directory)):
+            results[mode] = {f"pss_mb_{n}": session_pss(mode, argument, n, workdir)
+                             for n in sorted({1, sessions})}
+        return results
+    finally:
+        shutil.rmtree(directory)
+
+
+# ── Headless display ─────────────────────────────────────────────────────────
+def start_display(workdir):
+    """Start Xvfb or broadwayd; returns (process, environment entries)."""
+    free = [n for n in range(90, 100) if not os.path.exists(f"/tmp/.X11-unix/X{n}")]
+    if shutil.which("Xvfb") and free:
+        process = subprocess.Popen(
+            ["Xvfb", f":{free[0]}", "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 5
+        while process.poll() is None and time.monotonic() < deadline:
+            if os.path.exists(f"/tmp/.X11-unix/X{free[0]}"):
+                return process, {"DISPLAY": f":{free[0]}", "GDK_BACKEND": "x11"}
+            time.sleep(0.05)
+        process.kill()
+    if shutil.which("broadwayd"):
+        process = subprocess.Popen(
+            ["broadwayd", ":9"], cwd=workdir,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        time.sleep(0.5)
+        if process.poll() is None:
+            return process, {"GDK_BACKEND": "broadway", "BROADWAY_DISPLAY": ":9"}
+    raise RuntimeError("neither Xvfb nor broadwayd could be started")
+
+
+# ── Overlay process ──────────────────────────────────────────────────────────
+def process_usage(pid):
+    """(CPU seconds incl. reaped children, voluntary + involuntary context switches)."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = sum(int(fields[i]) for i in (11, 12, 13, 14)) / CLOCK_TICKS
+    switches = 0
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/status") as f:
+                switches += sum(int(n) for n in re.findall(r"ctxt_switches:\s+(\d+)", f.read()))
+        except OSError:
+            pass  # thread exited
+    return cpu, switches
+
+
+def process_rss(pid):
+    """Resident set size in MiB."""
+    with open(f"/proc/{pid}/status") as f:
+        kilobytes = int(re.search(r"VmRSS:\s+(\d+)", f.read()).group(1))
+    return round(kilobytes / 1024, 1)
+
+
+def metric_total(text, name):
+    return sum(float(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+               if line.startswith(name + "{") or line.startswith(name + " "))
+
+
+def isolated_env(fake, workdir, display_env):
+    """Environment for a hyprquotes process that only sees *fake* and *workdir*."""
+    bin_dir = os.path.join(workdir, "bin")
+    write_fake_hyprctl(bin_dir)
+    home = os.path.join(workdir, "home")
+    os.makedirs(home, exist_ok=True)
+    env = dict(os.environ, HOME=home, PATH=bin_dir + os.pathsep + os.environ["PATH"],
+               XDG_CACHE_HOME=os.path.join(home, ".cache"),
+               XDG_STATE_HOME=os.path.join(home, ".local", "state"),
+               FAKE_HYPRCTL_LOG=os.path.join(workdir, "hyprctl.log"),
+               **fake.environ())
+    for name in ("DISPLAY", "WAYLAND_DISPLAY", "GDK_BACKEND", "BROADWAY_DISPLAY"):
+        env.pop(name, None)
+    env.update(display_env)
+    return env
+
+
+class Overlay:
+    def __init__(self, fake, workdir, display_env, render="widgets"):
+        self.fake = fake
+        self.control_socket = os.path.join(fake.root, "hyprquotes.sock")
+        self.hyprctl_log = os.path.join(workdir, "hyprctl.log")
+        env = isolated_env(fake, workdir, display_env)
+        self.log = open(os.path.join(workdir, "overlay.log"), "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", os.path.join(ROOT, "hyprquotes.py"), "--metrics",
+             "--render", render],
+            env=env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        # Stands in for the overlay window so its address handshake succeeds
+        self.address = fake.open_window(SPECIAL_WORKSPACE, IGNORED_WINDOW,
+                                        overlay_title(self.process.pid, "FAKE-1"))
+
+    def command(self, name):
+        return control.send_command(name, path=self.control_socket)
+
+    def wait_ready(self):
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"overlay exited with {self.process.returncode}")
+            try:
+                if self.command("status").get("ok"):
+                    return self.fake.wait_for_subscriber()
+            except OSError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError("overlay did not open its control socket")
+
+    def counters(self):
+        cpu, switches = process_usage(self.process.pid)
+        text = self.command("metrics")["text"]
+        wakeups = self.command("status")["wakeups"]
+        try:
+            with open(self.hyprctl_log) as f:
+                hyprctl_runs = sum(1 for _ in f)
+        except FileNotFoundError:
+            hyprctl_runs = 0
+        return {"cpu_s": cpu, "context_switches": switches,
+                "forks": metric_total(text, "hyprquotes_subprocesses_total"),
+                "hyprctl_runs": hyprctl_runs, "wakeups": sum(wakeups.values())}
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+
+def is_show(text, workspace):
+    return text.startswith(f"movetoworkspacesilent {workspace},")
+
+
+def is_hide(text):
+    return text.startswith("movetoworkspacesilent special:")
+
+
+def placed(fake, address, workspace, pinned):
+    """Whether the overlay's window ended up on *workspace*, pinned or not."""
+    client = fake.client(address)
+    return (client is not None and client["workspace"]["name"] == workspace
+            and client["pinned"] == pinned)
+
+
+def bench_switching(fake, overlay, cycles):
+    # Warm-up: the first show maps the window and parks it (address handshake)
+    sent = fake.switch("2")
+    fake.wait_for_dispatch(lambda t: t.startswith("movetoworkspacesilent"), after=sent)
+    time.sleep(0.5)
+    fake.switch("1")
+    time.sleep(0.5)
+
+    show, hide, missed, misplaced = [], [], 0, 0
+    for _ in range(cycles):
+        sent = fake.switch("2")
+        received = fake.wait_for_dispatch(lambda t: is_show(t, "2"), after=sent)
+        if received:
+            show.append(received[0] - sent)
+        else:
+            missed += 1
+        time.sleep(0.2)
+        misplaced += not placed(fake, overlay.address, "2", pinned=True)
+        sent = fake.switch("1")
+        received = fake.wait_for_dispatch(is_hide, after=sent)
+        if received:
+            hide.append(received[0] - sent)
+        else:
+            missed += 1
+        time.sleep(0.2)
+        misplaced += not placed(fake, overlay.address, SPECIAL_WORKSPACE, pinned=False)
+    text = overlay.command("metrics")["text"]
+    return {
+        "show": summarize(show),
+        "hide": summarize(hide),
+        "missed": missed,
+        # Shown but not pinned, or left behind pinned instead of hidden
+        "misplaced": misplaced,
+        # The overlay's own view: event received -> transition completed
+        "overlay_show_mean_ms": _histogram_mean(text, "hyprquotes_visibility_seconds", "show"),
+        "overlay_hide_mean_ms": _histogram_mean(text, "hyprquotes_visibility_seconds", "hide"),
+    }
+
+
+def _histogram_mean(text, name, action):
+    label = f'{{action="{action}"}}'
+    total = metric_total(text, f"{name}_sum{label}")
+    count = metric_total(text, f"{name}_count{label}")
+    return millis(total / count) if count else None
+
+
+def bench_idle(fake, overlay, seconds):
+    results = {}
+    for state, workspace in (("hidden", "1"), ("shown", "2")):
+        fake.switch(workspace)
+        time.sleep(1.0)
+        before = overlay.counters()
+        time.sleep(seconds)
+        after = overlay.counters()
+        scale = 3600 / seconds
+        results[state] = {
+            "cpu_s_per_hour": round((after["cpu_s"] - before["cpu_s"]) * scale, 3),
+            "forks_per_hour": round((after["forks"] - before["forks"]) * scale, 1),
+            "hyprctl_runs_per_hour": round(
+                (after["hyprctl_runs"] - before["hyprctl_runs"]) * scale, 1),
+            "context_switches_per_hour": round(
+                (after["context_switches"] - before["context_switches"]) * scale),
+            # Event reads, polls and rotation timers: zero while hidden
+            "wakeups_per_hour": round((after["wakeups"] - before["wakeups"]) * scale, 1),
+        }
+    return results
+
+
+def bench_render(fake, overlay, transitions):
+    fake.switch("2")
+    time.sleep(1.0)
+    before, _ = process_usage(overlay.process.pid)
+    for _ in range(transitions):
+        overlay.command("next")
+        time.sleep(TRANSITION_SETTLE)
+    after, _ = process_usage(overlay.process.pid)
+    return {
+        "transitions": transitions,
+        "cpu_ms_per_transition": millis((after - before) / transitions),
+        "rss_mb": process_rss(overlay.process.pid),
+    }
+
+
+def bench_overlay(workdir, cycles, idle, transitions, render):
+    workdir = os.path.join(workdir, render)
+    os.makedirs(workdir)
+    fake = FakeHyprland(os.path.join(workdir, "run")).start()
+    fake.open_window("1")
+    display, display_env = start_display(workdir)
+    overlay = Overlay(fake, workdir, display_env, render)
+    try:
+        overlay.wait_ready()
+        return {
+            "display": display_env.get("GDK_BACKEND"),
+            "switch": bench_switching(fake, overlay, cycles),
+            "idle": bench_idle(fake, overlay, idle),
+            "render": bench_render(fake, overlay, transitions),
+            "compositor_requests": fake.requests,
+        }
+    finally:
+        overlay.stop()
+        display.terminate()
+        fake.stop()
+
+
+# ── Status bar stream ────────────────────────────────────────────────────────
+def read_line(process, timeout=START_TIMEOUT):
+    ready, _, _ = select.select([process.stdout], [], [], timeout)
+    if not ready:
+        raise RuntimeError("--stream printed nothing")
+    line = process.stdout.readline()
+    if not line:
+        raise RuntimeError(f"--stream exited with {process.wait()}")
+    return json.loads(line)
+
+
+def bench_stream(workdir, cycles, idle):
+    workdir = os.path.join(workdir, "stream")
+    os.makedirs(workdir)
+    fake = FakeHyprland(os.path.join(workdir, "run")).start()
+    fake.open_window("1")
+    process = subprocess.Popen(
+        [sys.executable, "-u", os.path.join(ROOT, "hyprquotes.py"), "--stream"],
+        env=isolated_env(fake, workdir, {}), text=True,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        read_line(process)      # hidden: workspace 1 has a window
+        show, hide = [], []
+        for _ in range(cycles):
+            sent = fake.switch("2")
+            read_line(process)
+            show.append(time.perf_counter() - sent)
+            sent = fake.switch("1")
+            read_line(process)
+            hide.append(time.perf_counter() - sent)
+        results = {"show": summarize(show), "hide": summarize(hide), "idle": {}}
+        for state, workspace in (("hidden", "1"), ("shown", "2")):
+            fake.switch(workspace)
+            time.sleep(1.0)
+            before, _ = process_usage(process.pid)
+            time.sleep(idle)
+            after, _ = process_usage(process.pid)
+            results["idle"][state] = {
+                "cpu_s_per_hour": round((after - before) * 3600 / idle, 3)}
+        results["rss_mb"] = process_rss(process.pid)
+        with open(f"/proc/{process.pid}/maps") as f:
+            results["gtk_loaded"] = "libgtk" in f.read()
+        return results
+    finally:
+        process.terminate()
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", choices=("corpus", "overlay", "stream", "shared"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+    parser.add_argument("--cycles", type=int, default=20,
+                        help="workspace switches to time (each one show + one hide)")
+    parser.add_argument("--idle", type=float, default=30,
+                        help="seconds to sample idle usage for, hidden and shown")
+    parser.add_argument("--transitions", type=int, default=20,
+                        help="quote changes to time for the render section")
+    parser.add_argument("--render", nargs="+", choices=("widgets", "card"),
+                        default=["widgets", "card"],
+                        help="rendering modes to run the overlay sections with")
+    parser.add_argument("--sessions", type=int, default=8,
+                        help="concurrent sessions for the shared section "
+                             "(corpus of the largest --sizes)")
+    parser.add_argument("--append", metavar="FILE",
+                        help="also append the results as a JSON line to FILE")
+    args = parser.parse_args()
+
+    results = {"label": git_label(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with tempfile.TemporaryDirectory(prefix="hyprquotes-bench-") as workdir:
+        if args.only in (None, "overlay"):
+            results["overlay"] = {}
+            for render in args.render:
+                try:
+                    results["overlay"][render] = bench_overlay(
+                        workdir, args.cycles, args.idle, args.transitions, render)
+                except RuntimeError as e:
+                    results["overlay"][render] = {"error": str(e)}
+        if args.only in (None, "stream"):
+            try:
+                results["stream"] = bench_stream(workdir, args.cycles, args.idle)
+            except RuntimeError as e:
+                results["stream"] = {"error": str(e)}
+        if args.only in (None, "shared"):
+            results["shared"] = bench_shared(max(args.sizes), args.sessions, workdir)
+        if args.only in (None, "corpus"):
+            results["corpus"] = bench_corpus(args.sizes, workdir)
+    print(json.dumps(results, indent=2))
+    if args.append:
+        with open(args.append, "a") as f:
+            f.write(json.dumps(results) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the search index.
+
+Builds a synthetic corpus (Zipf-distributed vocabulary, so a few words
+are in most quotes and most words are rare), indexes it and times a mix
+of common, rare, author and multi-word queries against the mmap'd index.
+
+    python bench/search_bench.py [--quotes 1000000] [--repeat 200]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import search  # noqa: E402
+
+
+def synthetic_corpus(count, vocabulary=50000, authors=20000, words=15, seed=1):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocabulary)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary)))
+    names = [f"Author{i} Surname{i % 997}" for i in range(authors)]
+    quotes = []
+    for _ in range(count):
+        quotes.append({
+            "quote": " ".join(rng.choices(vocab, cum_weights=cumulative, k=words)),
+            "author": rng.choice(names),
+        })
+    return quotes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quotes", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    quotes = synthetic_corpus(args.quotes)
+    generated = time.perf_counter()
+    path = os.path.join(tempfile.mkdtemp(prefix="hyprquotes-bench-"), "search.idx")
+    search.build_index(quotes, path)
+    built = time.perf_counter()
+    index = search.SearchIndex(path)
+
+    queries = {
+        "common word": "w0",
+        "rare word": "w49000",
+        "author": "author:author123",
+        "two common words": "w0 w1",
+        "common + rare": "w0 w30000",
+        "author + word": "author:surname5 w2",
+        "no match": "doesnotexist",
+    }
+    results = {
+        "quotes": args.quotes,
+        "generate_s": round(generated - start, 3),
+        "build_s": round(built - generated, 3),
+        "index_bytes": os.path.getsize(path),
+        "queries": {},
+    }
+    for label, query in queries.items():
+        timings = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            matches = index.search(query, limit=100)
+            timings.append(time.perf_counter() - t0)
+        timings.sort()
+        results["queries"][label] = {
+            "query": query,
+            "matches": len(matches),
+            "p50_ms": round(timings[len(timings) // 2] * 1000, 4),
+            "p99_ms": round(timings[int(len(timings) * 0.99) - 1] * 1000, 4),
+        }
+    print(json.dumps(results, indent=2))
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-quote benchmark for the overlay.
+
+Starts `hyprquotes.py --profile-startup` several times inside a running
+Hyprland session, reads the phase breakdown it prints once the first quote
+is on screen, then stops it with SIGTERM. Before each run the benchmark
+switches to an empty workspace (and back afterwards) so the overlay shows
+right away; the wait for that switch is not part of the result.
+
+    python bench/startup_bench.py [--runs 5] [--append bench/startup.jsonl]
+
+Results are printed as JSON; --append adds them as one line to a file,
+labelled with `git describe`, to track startup across releases.
+"""
+import argparse
+import json
+import os
+import queue
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import control  # noqa: E402
+import hypripc  # noqa: E402
+
+_PHASE = re.compile(r"^\s+(.+?)\s+([\d.]+) ms(  \(not counted\))?$")
+RUN_TIMEOUT = 30
+
+
+def git_label():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty", "--tags"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _read_lines(stream, lines):
+    """Reader thread: every line of *stream* into *lines*, then None at EOF."""
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+
+def profile_once(hyprctl, switch):
+    """One overlay start; returns {phase: ms} or raises RuntimeError."""
+    if switch:
+        hyprctl.dispatch("workspace empty")
+    process = subprocess.Popen(
+        [sys.executable, "-u", os.path.join(ROOT, "hyprquotes.py"), "--profile-startup"],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    # A reader thread, so a silent, hung overlay can't block past the deadline
+    lines = queue.Queue()
+    threading.Thread(target=_read_lines, args=(process.stdout, lines), daemon=True).start()
+    phases = {}
+    deadline = time.monotonic() + RUN_TIMEOUT
+    try:
+        while "time to first quote" not in phases:
+            try:
+                line = lines.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break   # timed out
+            if line is None:
+                break   # the overlay exited
+            match = _PHASE.match(line)
+            if match and not match.group(3):
+                phases[match.group(1)] = float(match.group(2))
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        if switch:
+            hyprctl.dispatch("workspace previous")
+    if "time to first quote" not in phases:
+        raise RuntimeError("overlay never reported its first quote")
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-switch", action="store_true",
+                        help="don't change workspace (run from an empty one yourself)")
+    parser.add_argument("--append", metavar="FILE",
+                        help="also append the results as a JSON line to FILE")
+    args = parser.parse_args()
+
+    try:
+        control.send_command("status")
+    except OSError:
+        pass
+    else:
+        sys.exit("hyprquotes is already running; stop it before benchmarking")
+
+    hyprctl = hypripc.HyprctlClient()
+    runs = []
+    for _ in range(args.runs):
+        try:
+            runs.append(profile_once(hyprctl, not args.no_switch))
+        except (RuntimeError, hypripc.HyprctlError) as e:
+            sys.exit(f"Benchmark run failed: {e}")
+        time.sleep(0.5)  # let the compositor settle between runs
+
+    results = {
+        "label": git_label(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runs": args.runs,
+        "median_ms": {
+            phase: round(statistics.median(run[phase] for run in runs if phase in run), 1)
+            for phase in runs[0]
+        },
+        "max_ms": round(max(run["time to first quote"] for run in runs), 1),
+    }
+    print(json.dumps(results, indent=2))
+    if args.append:
+        with open(args.append, "a") as f:
+            f.write(json.dumps(results) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Quote cards drawn directly with Pango and Cairo (`--render card`).
+
+In the default mode the quote sits in two GTK labels styled by the CSS in
+overlay.py; every quote change has GTK re-resolve that style (rounded
+backgrounds, shadows, transitions) and repaint the widgets. Here the same
+card is drawn once into an ARGB image surface and the window only ever
+paints finished surfaces. Cards are cached per (quote, author), and the
+overlay renders the upcoming ones while idle, so changing quote is a blit,
+or a crossfade between two cached surfaces.
+"""
+import gi
+gi.require_version('Pango', '1.0')
+gi.require_version('PangoCairo', '1.0')
+from gi.repository import Pango, PangoCairo
+import math
+from collections import OrderedDict, namedtuple
+import cairo
+
+# Same look as #quote-label and #author-label in overlay.apply_styling()
+QUOTE_FONT, QUOTE_SIZE = "Sans Italic", 24
+QUOTE_PADDING, QUOTE_RADIUS = 15, 10
+QUOTE_COLOR = (1, 1, 1, 0.85)
+QUOTE_BACKGROUND = (0, 0, 0, 0.5)
+AUTHOR_FONT, AUTHOR_SIZE = "Sans Bold", 20
+AUTHOR_PADDING_X, AUTHOR_PADDING_Y, AUTHOR_RADIUS = 12, 8, 6
+AUTHOR_COLOR = (1, 1, 1, 0.9)
+AUTHOR_BACKGROUND = (40 / 255, 40 / 255, 60 / 255, 0.7)
+TEXT_SHADOW = (0, 0, 0, 0.5)
+# Content box spacing + the author's margin-top
+AUTHOR_GAP = 10 + 10
+# The quote label's margin, kept around the whole card
+CARD_MARGIN = 10
+
+# Sizes are in logical pixels; the surface itself is scaled for HiDPI
+Card = namedtuple("Card", "surface width height")
+
+
+def _font(family, size):
+    font = Pango.FontDescription.from_string(family)
+    font.set_absolute_size(size * Pango.SCALE)
+    return font
+
+
+def _rounded_rectangle(cr, x, y, width, height, radius):
+    cr.new_sub_path()
+    cr.arc(x + width - radius, y + radius, radius, -math.pi / 2, 0)
+    cr.arc(x + width - radius, y + height - radius, radius, 0, math.pi / 2)
+    cr.arc(x + radius, y + height - radius, radius, math.pi / 2, math.pi)
+    cr.arc(x + radius, y + radius, radius, math.pi, 3 * math.pi / 2)
+    cr.close_path()
+
+
+def _show_text(cr, layout, x, y, color):
+    """Text with a 1px offset shadow, like the labels' text-shadow."""
+    for dx, rgba in ((1, TEXT_SHADOW), (0, color)):
+        cr.move_to(x + dx, y + dx)
+        cr.set_source_rgba(*rgba)
+        PangoCairo.show_layout(cr, layout)
+
+
+class CardRenderer:
+    def __init__(self, wrap_chars=None, capacity=8):
+        """
+        *capacity* bounds the cache: the shown card, the one fading out and
+        the few rendered ahead are all that is ever needed.
+        """
+        self.wrap_chars = wrap_chars
+        self.capacity = capacity
+        self.quote_font = _font(QUOTE_FONT, QUOTE_SIZE)
+        self.author_font = _font(AUTHOR_FONT, AUTHOR_SIZE)
+        self.stats = {"rendered": 0, "hits": 0}
+        self._scale = None
+        self._cards = OrderedDict()
+        # Layouts are measured on a 1x1 surface before the card size is known
+        self._scratch = cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1))
+
+    def __contains__(self, key):
+        return key in self._cards
+
+    def card(self, quote, author, scale=1):
+        """The Card for (*quote*, *author*) at *scale*, rendered if not cached."""
+        if scale != self._scale:
+            self._scale = scale
+            self._cards.clear()
+        key = (quote, author)
+        cached = self._cards.get(key)
+        if cached is not None:
+            self._cards.move_to_end(key)
+            self.stats["hits"] += 1
+            return cached
+        cached = self._cards[key] = self.render(quote, author, scale)
+        self.stats["rendered"] += 1
+        if len(self._cards) > self.capacity:
+            self._cards.popitem(last=False)
+        return cached
+
+    def _layout(self, text, font, wrap_chars=None):
+        layout = PangoCairo.create_layout(self._scratch)
+        layout.set_font_description(font)
+        layout.set_alignment(Pango.Alignment.CENTER)
+        if wrap_chars:
+            metrics = layout.get_context().get_metrics(font, None)
+            layout.set_width(metrics.get_approximate_char_width() * wrap_chars)
+            layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+        layout.set_text(text, -1)
+        return layout
+
+    def render(self, quote, author, scale=1):
+        quote_layout = self._layout(quote, self.quote_font, self.wrap_chars)
+        author_layout = self._layout(f"— {author}", self.author_font)
+        # The logical rectangle's x is non-zero once centred inside a width
+        quote_rect = quote_layout.get_pixel_extents()[1]
+        author_rect = author_layout.get_pixel_extents()[1]
+        quote_box = (quote_rect.width + 2 * QUOTE_PADDING,
+                     quote_rect.height + 2 * QUOTE_PADDING)
+        author_box = (author_rect.width + 2 * AUTHOR_PADDING_X,
+                      author_rect.height + 2 * AUTHOR_PADDING_Y)
+        width = max(quote_box[0], author_box[0]) + 2 * CARD_MARGIN
+        height = quote_box[1] + AUTHOR_GAP + author_box[1] + 2 * CARD_MARGIN
+
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                     math.ceil(width * scale), math.ceil(height * scale))
+        surface.set_device_scale(scale, scale)
+        cr = cairo.Context(surface)
+
+        x, y = (width - quote_box[0]) / 2, CARD_MARGIN
+        _rounded_rectangle(cr, x, y, *quote_box, QUOTE_RADIUS)
+        cr.set_source_rgba(*QUOTE_BACKGROUND)
+        cr.fill()
+        PangoCairo.update_layout(cr, quote_layout)
+        _show_text(cr, quote_layout, x + QUOTE_PADDING - quote_rect.x,
+                   y + QUOTE_PADDING - quote_rect.y, QUOTE_COLOR)
+
+        x, y = (width - author_box[0]) / 2, y + quote_box[1] + AUTHOR_GAP
+        _rounded_rectangle(cr, x, y, *author_box, AUTHOR_RADIUS)
+        cr.set_source_rgba(*AUTHOR_BACKGROUND)
+        cr.fill()
+        PangoCairo.update_layout(cr, author_layout)
+        _show_text(cr, author_layout, x + AUTHOR_PADDING_X - author_rect.x,
+                   y + AUTHOR_PADDING_Y - author_rect.y, AUTHOR_COLOR)
+
+        surface.flush()
+        return Card(surface, width, height)
+
+    def format_stats(self):
+        return " ".join(f"{key}={value}" for key, value in self.stats.items())
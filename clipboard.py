@@ -0,0 +1,119 @@
+"""
+Clipboard writes off the GTK main loop.
+
+wl-copy normally returns at once, but it waits on the compositor and has
+been seen to hang with it, which used to freeze the overlay. Here it runs
+on a worker thread with a timeout. Clicks that arrive while a copy is in
+flight replace each other, so only the latest text is copied next.
+
+The result goes back through *post* (GLib.idle_add in the overlay). If
+wl-copy is missing, fails or times out, *fallback* (the GTK clipboard,
+which only works on the main loop) is tried there before *on_done*
+reports the outcome.
+"""
+import shutil
+import subprocess
+import threading
+from collections import namedtuple
+
+import metrics
+
+# Seconds before a stuck wl-copy is killed and the GTK fallback is used
+CLIPBOARD_TIMEOUT = 2.0
+
+# In-process PATH lookup; forking `which` cost a few ms of every startup
+WL_COPY_AVAILABLE = shutil.which("wl-copy") is not None
+
+CopyJob = namedtuple("CopyJob", "serial text")
+
+
+class ClipboardWriter:
+    def __init__(self, post, on_done, fallback=None, timeout=CLIPBOARD_TIMEOUT):
+        """
+        *on_done(job, ok, method)* runs on the main loop for the latest job
+        only; *method* is "wl-copy", "fallback" or None when both failed.
+        """
+        self.post = post
+        self.on_done = on_done
+        self.fallback = fallback
+        self.timeout = timeout
+        self.stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "wl-copy": 0,
+            "fallback": 0,
+            "timeouts": 0,
+            "failed": 0,
+        }
+        self.spawned = metrics.REGISTRY.counter(
+            "hyprquotes_subprocesses_total", "Child processes started", program="wl-copy")
+        self.copies = {
+            method: metrics.REGISTRY.counter(
+                "hyprquotes_clipboard_copies_total", "Clipboard writes by outcome",
+                method=method)
+            for method in ("wl-copy", "fallback", "failed")
+        }
+        self._serial = 0
+        self._pending = None
+        self._active = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        with self._cond:
+            self._serial += 1
+            self.stats["submitted"] += 1
+            if self._pending is not None:
+                self.stats["coalesced"] += 1
+            self._pending = CopyJob(self._serial, text)
+            self._cond.notify()
+            return self._serial
+
+    def is_current(self, serial):
+        return serial == self._serial
+
+    def format_stats(self):
+        return " ".join(f"{key}={value}" for key, value in self.stats.items())
+
+    def stop(self):
+        with self._cond:
+            self._active = False
+            self._pending = None
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._active and self._pending is None:
+                    self._cond.wait()
+                if not self._active:
+                    return
+                job, self._pending = self._pending, None
+            ok = WL_COPY_AVAILABLE and self._wl_copy(job.text)
+            self.post(self._finish, job, ok)
+
+    def _wl_copy(self, text):
+        self.spawned.inc()
+        try:
+            subprocess.run(["wl-copy"], input=text.encode("utf-8"),
+                           check=True, timeout=self.timeout)
+            return True
+        except subprocess.TimeoutExpired:
+            self.stats["timeouts"] += 1
+            print(f"wl-copy timed out after {self.timeout:g}s")
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"wl-copy failed: {e}")
+        return False
+
+    def _finish(self, job, ok):
+        """Main loop: fall back if needed and report the latest job."""
+        if not self.is_current(job.serial):
+            return False  # superseded by a newer click
+        method = "wl-copy" if ok else None
+        if not ok and self.fallback is not None and self.fallback(job.text):
+            method = "fallback"
+        self.stats[method or "failed"] += 1
+        self.copies[method or "failed"].inc()
+        self.on_done(job, method is not None, method)
+        return False
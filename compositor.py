@@ -0,0 +1,133 @@
+"""
+Compositor state shared by the overlay and --stream.
+
+CompositorTracker keeps the workspace and monitor indexes (workspaces.py)
+in step with Hyprland on a thread of its own and reports, after every
+sync or event, which monitors should now show or hide a quote:
+
+  sync      `clients -j` and `monitors -j` rebuild both indexes; on
+            start, after every (re)connection to the event socket, on
+            monitor hotplug and workspace moves, and at least every
+            INDEX_RESYNC_INTERVAL seconds to catch drift in the patches
+  events    everything else patches the indexes in place
+  polling   without an event socket, a sync every POLL_INTERVAL
+
+Nothing here imports GTK: the overlay hands the results to its main loop
+itself, --stream wakes its own thread.
+"""
+import threading
+import time
+
+import hypripc
+import metrics
+import tracer
+from workspaces import MONITOR_RESYNC_EVENTS, MonitorIndex, WorkspaceIndex, visibility_changes
+
+# Only used when Hyprland's event socket is unavailable
+POLL_INTERVAL = 0.5
+# Rebuild the workspace and monitor indexes at least this often (seconds)
+INDEX_RESYNC_INTERVAL = 60
+
+
+class CompositorTracker:
+    def __init__(self, on_update, on_sync=None, on_other_event=None, other_events=(),
+                 hyprctl=None):
+        """
+        *on_update(changed, removed, since)* is called on the tracker thread
+        after every sync or event, with {monitor: show?} for the monitors
+        whose (workspace, occupied) changed and the monitors that are gone;
+        both may be empty. *since* is when the triggering event arrived
+        (time.perf_counter()), for latency metrics.
+
+        *on_sync()* is called after every successful sync, and
+        *on_other_event(name, data)* for the *other_events* the tracker
+        subscribes to on the caller's behalf. *hyprctl* lets the caller
+        share its HyprctlClient.
+        """
+        self.on_update = on_update
+        self.on_sync = on_sync
+        self.on_other_event = on_other_event
+        self.hyprctl = hyprctl or hypripc.HyprctlClient()
+        self.workspace_index = WorkspaceIndex()
+        self.monitor_index = MonitorIndex()
+        self.states = {}        # monitor name -> (workspace, occupied)
+        self.last_sync = 0
+        self.trace = tracer.TRACER
+        self.event_monitor = hypripc.EventMonitor(
+            self.on_compositor_event, events=hypripc.WORKSPACE_EVENTS | set(other_events),
+            on_connect=self.refresh,
+        )
+        self.events_seen = metrics.Counter()
+        # Socket reads and polls; both stay at zero while the compositor is quiet
+        self.wakeups = {"events": self.event_monitor.wakeups, "poll": metrics.Counter()}
+        self.active = True
+        self.thread = None
+
+    def resync(self):
+        """Rebuild the occupancy and monitor indexes from hyprctl."""
+        try:
+            clients = self.hyprctl.query("clients")
+            monitors = self.hyprctl.query("monitors")
+            if self.trace.enabled:
+                self.trace.record(tracer.SYNC, tracer.compact_clients(clients),
+                                  tracer.compact_monitors(monitors), self.states)
+            self.workspace_index.rebuild(clients)
+            self.monitor_index.rebuild(monitors)
+            self.last_sync = time.monotonic()
+        except Exception as e:
+            print(f"Error syncing workspace index: {e}")
+            return
+        if self.on_sync is not None:
+            self.on_sync()
+
+    def update(self, since=None):
+        """Work out which monitors changed since the last update and report them."""
+        states, changed, removed = visibility_changes(
+            self.monitor_index, self.workspace_index, self.states)
+        for monitor, show in changed.items():
+            self.trace.record(tracer.DECIDE, monitor, show)
+        for monitor in removed:
+            self.trace.record(tracer.REMOVE, monitor)
+        self.states = states
+        self.on_update(changed, removed, since)
+
+    def refresh(self, since=None):
+        since = since or time.perf_counter()
+        self.resync()
+        self.update(since)
+
+    def on_compositor_event(self, name, data):
+        if name not in hypripc.WORKSPACE_EVENTS:
+            self.on_other_event(name, data)
+            return
+        since = time.perf_counter()
+        self.events_seen.inc()
+        resync = (name in MONITOR_RESYNC_EVENTS
+                  or time.monotonic() - self.last_sync > INDEX_RESYNC_INTERVAL)
+        self.trace.record(tracer.EVENT, name, data, resync)
+        if resync:
+            # Hotplug and workspace moves re-read the monitors; the periodic
+            # resync catches any drift in the incremental indexes
+            self.refresh(since)
+            return
+        if not self.monitor_index.apply_event(name, data):
+            self.workspace_index.apply_event(name, data)
+        self.update(since)
+
+    def run(self):
+        while self.active:
+            if self.event_monitor.available():
+                # Blocks until the compositor goes away or stop() is called
+                self.event_monitor.run()
+                continue
+            self.wakeups["poll"].inc()
+            self.refresh()
+            time.sleep(POLL_INTERVAL)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.active = False
+        self.event_monitor.stop()
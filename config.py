@@ -0,0 +1,144 @@
+"""
+Paths and corpus helpers shared by the overlay and the command line.
+
+Nothing here imports GTK, so --search, --compile and friends can use the
+same quotes, caches and rotation state as the running overlay without
+starting a display connection.
+"""
+import hashlib
+import json
+import os
+import time
+
+import corpus
+import metrics
+import normalize
+import search
+import shared
+
+# ── Paths ─────────────────────────────────────────────────────────────────────
+BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+
+# Quotes file: prefer user config (~/.config/hyprquotes/), fall back to assets/
+_USER_QUOTES = os.path.expanduser("~/.config/hyprquotes/programming-quotes.json")
+_BUNDLED_QUOTES = os.path.join(BASE_DIR, "assets", "programming-quotes.json")
+QUOTES_FILE = _USER_QUOTES if os.path.exists(_USER_QUOTES) else _BUNDLED_QUOTES
+
+# Any number of .json / .jsonl files here replace QUOTES_FILE when present
+QUOTES_DIR = os.path.expanduser("~/.config/hyprquotes/quotes.d")
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "hyprquotes"
+)
+# Rotation state (shuffle bag + history) survives logouts here
+STATE_DIR = os.path.join(
+    os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state"), "hyprquotes"
+)
+SCHEDULER_STATE = os.path.join(STATE_DIR, "rotation.bin")
+# Inverted index for --search / --filter, rebuilt when the corpus changes
+SEARCH_INDEX = os.path.join(CACHE_DIR, "search.idx")
+# Where --trace writes its ring buffer (tracer.py)
+TRACE_FILE = os.path.join(STATE_DIR, "trace.jsonl.gz")
+# Optional overrides for normalize.DEFAULT_RULES (author shortening etc.)
+NORMALIZE_RULES_FILE = os.path.expanduser("~/.config/hyprquotes/normalize.json")
+
+SPECIAL_WORKSPACE = "special:scratchpad"
+
+# Directory of a host-wide published corpus (shared.py), when --shared-corpus
+SHARED_CORPUS = None
+
+
+def use_shared_corpus(directory):
+    """Load quotes from the corpus published in *directory* from now on."""
+    global SHARED_CORPUS
+    SHARED_CORPUS = directory
+
+
+def load_quotes():
+    """
+    Return (source description, quotes) from the shared corpus, quotes.d/
+    or QUOTES_FILE, in that order.
+    """
+    start = time.perf_counter()
+    rules = normalize.load_rules(NORMALIZE_RULES_FILE)
+    path = None
+    quotes = None
+    if SHARED_CORPUS:
+        try:
+            quotes = shared.open_shared(SHARED_CORPUS)
+            if quotes is None:
+                print(f"Nothing published in {SHARED_CORPUS}, using your own quotes")
+            else:
+                path = quotes.path
+        except (OSError, corpus.CorpusError) as e:
+            print(f"Shared corpus unavailable, using your own quotes: {e}")
+    if path is None and os.path.isdir(QUOTES_DIR):
+        quotes = corpus.load_quote_dir(QUOTES_DIR, CACHE_DIR, rules)
+        if quotes is not None:
+            path = QUOTES_DIR
+    if path is None:
+        path = corpus.resolve_quotes_file(QUOTES_FILE)
+        quotes = corpus.load_corpus(path, rules)
+    metrics.REGISTRY.histogram(
+        "hyprquotes_corpus_load_seconds", "Time to load (or reload) the quotes",
+        buckets=metrics.SLOW_BUCKETS,
+    ).observe(time.perf_counter() - start)
+    return path, quotes
+
+
+def corpus_fingerprint(path, quotes):
+    """
+    Identify the file a corpus was read from, the normalization rules and
+    the index format, to key derived caches on: editing normalize.json or
+    upgrading hyprquotes invalidates them as surely as editing the quotes.
+    """
+    source = getattr(quotes, "path", path)
+    try:
+        st = os.stat(source)
+    except (OSError, TypeError):
+        return ""
+    rules = json.dumps(normalize.load_rules(NORMALIZE_RULES_FILE), sort_keys=True)
+    rules_hash = hashlib.sha1(rules.encode("utf-8")).hexdigest()[:12]
+    return (f"{source}:{st.st_size}:{st.st_mtime_ns}:{len(quotes)}"
+            f":rules={rules_hash}-v{corpus.CACHE_VERSION}:index=v{search.FORMAT_VERSION}")
+
+
+def open_search_index(path, quotes):
+    if getattr(quotes, "version", None):
+        try:
+            return shared.open_index(quotes)
+        except (OSError, ValueError) as e:
+            print(f"Shared search index unusable, building a private one: {e}")
+    return search.open_index(SEARCH_INDEX, quotes, corpus_fingerprint(path, quotes))
+
+
+def scheduler_state_path(quote_filter, variant=None):
+    """
+    Each --filter query keeps its own rotation state, and so does each
+    *variant* of the overlay (e.g. "stream" for --stream).
+    """
+    if not quote_filter and not variant:
+        return SCHEDULER_STATE
+    name = "rotation"
+    if quote_filter:
+        name += "-" + hashlib.sha1(quote_filter.encode("utf-8")).hexdigest()[:12]
+    if variant:
+        name += f"-{variant}"
+    return os.path.join(STATE_DIR, f"{name}.bin")
+
+
+def filter_members(quote_filter, path, quotes):
+    """Indices matching *quote_filter*, or None to rotate through everything."""
+    if not quote_filter:
+        return None
+    try:
+        index = open_search_index(path, quotes)
+        members = index.search(quote_filter)
+        index.close()
+    except Exception as e:
+        print(f"Error searching quotes, ignoring filter: {e}")
+        return None
+    if not members:
+        print(f"No quotes match filter {quote_filter!r}, showing all quotes")
+        return None
+    print(f"Rotating through {len(members)} quotes matching {quote_filter!r}")
+    return members
@@ -0,0 +1,221 @@
+"""
+Single-instance lock and control socket.
+
+The first hyprquotes process takes an exclusive lock and listens on a
+Unix socket in $XDG_RUNTIME_DIR. Later invocations (`hyprquotes next`,
+usually from a keybind) connect, send one command line, get one JSON
+reply line back and exit:
+
+  -> next\\n
+  <- {"ok": true}\\n
+
+Only the standard library is imported here so the client side never pays
+for loading GTK; hyprquotes.py dispatches to main() before importing
+anything else.
+"""
+import fcntl
+import json
+import os
+import socket
+import stat
+import sys
+import threading
+
+COMMANDS = {
+    "next": "show the next quote",
+    "prev": "go back to the previous quote",
+    "pause": "stop auto-rotation",
+    "resume": "restart auto-rotation",
+    "toggle": "pause or resume auto-rotation",
+    "reload": "reload the quotes file(s)",
+    "status": "print the overlay state as JSON",
+    "metrics": "print metrics in Prometheus text format (needs --metrics)",
+    "trace": "write the recent event/decision trace to a file (needs --trace)",
+}
+
+CLIENT_TIMEOUT = 2.0
+MAX_REQUEST = 4096
+
+
+def runtime_dir():
+    """
+    $XDG_RUNTIME_DIR, or a per-user fallback in /tmp.
+
+    Anyone can create the fallback before us, and whoever owns it controls
+    the lock, the socket and the rules marker in it. So it is only used if
+    it is a real directory (not a symlink) that we own with mode 0700;
+    otherwise PermissionError.
+    """
+    directory = os.environ.get("XDG_RUNTIME_DIR")
+    if directory and os.path.isdir(directory):
+        return directory
+    directory = f"/tmp/hyprquotes-{os.getuid()}"
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.lstat(directory)
+    if (not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid()
+            or stat.S_IMODE(st.st_mode) != 0o700):
+        raise PermissionError(f"{directory} is not a private directory of ours, not using it")
+    return directory
+
+
+def socket_path():
+    return os.path.join(runtime_dir(), "hyprquotes.sock")
+
+
+def lock_path():
+    return os.path.join(runtime_dir(), "hyprquotes.lock")
+
+
+class AlreadyRunning(RuntimeError):
+    def __init__(self, pid):
+        super().__init__(f"hyprquotes is already running (pid {pid or 'unknown'})")
+        self.pid = pid
+
+
+class InstanceLock:
+    """
+    flock() held for the life of the overlay process.
+
+    The kernel drops the lock when the process dies, however it dies, so a
+    stale lock file never blocks the next start.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or lock_path()
+        self._fd = None
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            pid = os.read(fd, 32).decode("ascii", "replace").strip()
+            os.close(fd)
+            raise AlreadyRunning(pid)
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode("ascii"))
+        self._fd = fd
+        return self
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class ControlServer:
+    """
+    Accepts control connections on a daemon thread.
+
+    *handler(command, args)* is called on that thread and returns a dict
+    for the reply; the overlay marshals it onto the GTK main loop. Only
+    start() while holding the InstanceLock: any socket file left at the
+    path then belongs to a dead process and is replaced.
+    """
+
+    def __init__(self, handler, path=None):
+        self.handler = handler
+        self.path = path or socket_path()
+        self._sock = None
+        self._thread = None
+
+    def start(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        os.chmod(self.path, 0o600)
+        sock.listen(8)
+        self._sock = sock
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        sock, self._sock = self._sock, None
+        if sock is None:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _serve(self):
+        while self._sock is not None:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return  # stop() closed the listening socket
+            with conn:
+                try:
+                    conn.settimeout(CLIENT_TIMEOUT)
+                    self._handle(conn)
+                except OSError as e:
+                    print(f"Control connection failed: {e}")
+
+    def _handle(self, conn):
+        request = b""
+        while b"\n" not in request and len(request) < MAX_REQUEST:
+            chunk = conn.recv(MAX_REQUEST)
+            if not chunk:
+                break
+            request += chunk
+        command, *args = request.decode("utf-8", "replace").split() or [""]
+        if command not in COMMANDS:
+            reply = {"ok": False, "error": f"unknown command {command!r}"}
+        else:
+            try:
+                reply = self.handler(command, args)
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+        conn.sendall(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def send_command(command, args=(), path=None, timeout=CLIENT_TIMEOUT):
+    """
+    Send one command to the running overlay and return its reply dict.
+
+    Raises OSError (usually FileNotFoundError / ConnectionRefusedError)
+    when no overlay is listening.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or socket_path())
+        sock.sendall(" ".join([command, *args]).encode("utf-8") + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            reply += chunk
+    if not reply:
+        raise ConnectionError("overlay closed the connection without replying")
+    return json.loads(reply)
+
+
+def main(argv):
+    """`hyprquotes COMMAND [ARGS]`: exit status 0 on success."""
+    command, args = argv[0], argv[1:]
+    try:
+        reply = send_command(command, args)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print("hyprquotes is not running", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"hyprquotes {command}: {e}", file=sys.stderr)
+        return 1
+    if not reply.get("ok"):
+        print(f"hyprquotes {command}: {reply.get('error', 'failed')}", file=sys.stderr)
+        return 1
+    if command == "status":
+        print(json.dumps(reply, indent=2, ensure_ascii=False))
+    elif command in ("metrics", "trace"):
+        sys.stdout.write(reply["text"])
+    return 0
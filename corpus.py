@@ -0,0 +1,444 @@
+"""
+Quote corpus loading and the compiled (.hqc) corpus format.
+
+A compiled corpus is a single little-endian file that is mmap'd read-only,
+so opening it costs the same for 500 quotes as for 5 million and quotes
+are only decoded when they are displayed:
+
+  header   "<4sIII"   magic b"HQC1", format version, quote count, author count
+  quotes   "<QII"     per quote: text offset, text byte length, author id
+  authors  "<QI"      per author: name offset, name byte length
+  strings            UTF-8 text referenced by the tables above
+
+Authors are interned: every distinct author string is stored once.
+
+A quotes directory (quotes.d/) holds any number of .json arrays and .jsonl
+files (one quote object per line). They are merged into one compiled
+corpus that is cached together with each source's (path, size, mtime):
+when nothing changed the merged file is simply mapped again, otherwise
+only the changed sources are re-parsed. Every source is run through
+normalize.py before it is compiled, so cached text is display-ready.
+An optional sources.json in the
+directory disables or weights individual files:
+
+  {"movies.jsonl": {"enabled": false}, "programming.json": {"weight": 2}}
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections import deque, namedtuple
+from collections.abc import Sequence
+
+from normalize import DEFAULT_RULES, normalize_quotes
+
+MAGIC = b"HQC1"
+FORMAT_VERSION = 1
+COMPILED_SUFFIX = ".hqc"
+
+SOURCE_SUFFIXES = (".json", ".jsonl")
+SOURCES_MANIFEST = "sources.json"
+CACHE_VERSION = 4
+
+# A contiguous run of quotes [start, stop) that came from one source file
+Source = namedtuple("Source", "name start stop weight")
+
+_HEADER = struct.Struct("<4sIII")
+_QUOTE = struct.Struct("<QII")
+_AUTHOR = struct.Struct("<QI")
+
+
+class CorpusError(ValueError):
+    pass
+
+
+class CompiledCorpus(Sequence):
+    """
+    Read-only, lazily decoded view of a compiled corpus file.
+
+    Opening always checks that the tables fit in the file. With *verify*
+    every quote and author is also checked to point at valid UTF-8 inside
+    the strings area, so a damaged file fails here rather than when one of
+    its quotes is displayed. That is a pass over the whole file, so it is
+    meant for files someone else wrote (shared.py); our own caches skip it.
+    """
+
+    def __init__(self, path, verify=False, fd=None):
+        """*fd*, if given, is an open descriptor of *path* to map instead."""
+        self.path = path
+        if fd is not None:
+            self._map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        else:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open(verify)
+        except CorpusError:
+            self.close()
+            raise
+
+    def _open(self, verify):
+        if len(self._map) < _HEADER.size:
+            raise CorpusError(f"{self.path}: truncated corpus header")
+        magic, version, self._count, author_count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise CorpusError(f"{self.path}: not a version {FORMAT_VERSION} compiled corpus")
+        self._quotes_at = _HEADER.size
+        self._authors_at = self._quotes_at + self._count * _QUOTE.size
+        self._strings_at = self._authors_at + author_count * _AUTHOR.size
+        self._author_count = author_count
+        self._authors = {}  # author id -> decoded name, filled on demand
+        if self._strings_at > len(self._map):
+            raise CorpusError(f"{self.path}: truncated corpus tables")
+        if verify:
+            self._verify()
+
+    def _verify(self):
+        with memoryview(self._map) as view:
+            problem = (self._check_entries(view, "quote", _QUOTE, self._quotes_at, self._authors_at)
+                       or self._check_entries(view, "author", _AUTHOR, self._authors_at,
+                                              self._strings_at))
+        if problem:
+            raise CorpusError(f"{self.path}: {problem}")
+
+    def _check_entries(self, view, kind, layout, start, end):
+        """What is wrong with the first bad entry of a table, or None."""
+        for number, (offset, length, *author_id) in enumerate(layout.iter_unpack(view[start:end])):
+            if not self._strings_at <= offset <= offset + length <= len(view):
+                return f"{kind} {number} points outside the file"
+            if author_id and author_id[0] >= self._author_count:
+                return f"{kind} {number} has no author"
+            try:
+                str(view[offset:offset + length], "utf-8")
+            except UnicodeDecodeError:
+                return f"{kind} {number} is not UTF-8"
+        return None
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("quote index out of range")
+        offset, length, author_id = _QUOTE.unpack_from(
+            self._map, self._quotes_at + index * _QUOTE.size
+        )
+        return {
+            "author": self._author(author_id),
+            "quote": self._map[offset:offset + length].decode("utf-8"),
+        }
+
+    def _author(self, author_id):
+        name = self._authors.get(author_id)
+        if name is None:
+            offset, length = _AUTHOR.unpack_from(
+                self._map, self._authors_at + author_id * _AUTHOR.size
+            )
+            name = self._map[offset:offset + length].decode("utf-8")
+            self._authors[author_id] = name
+        return name
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def validate_quotes(quotes, source="<quotes>"):
+    if not isinstance(quotes, list):
+        raise CorpusError(f"{source}: expected a JSON array of quotes")
+    for i, entry in enumerate(quotes):
+        if not (isinstance(entry, dict)
+                and isinstance(entry.get("quote"), str)
+                and isinstance(entry.get("author"), str)):
+            raise CorpusError(f'{source}: entry {i} needs string "quote" and "author" fields')
+    return quotes
+
+
+def write_compiled(quotes, path):
+    """
+    Write *quotes* (dicts with "quote" and "author") as a compiled corpus.
+
+    The file is written next to *path* and renamed into place, so readers
+    that already mapped the old version keep a consistent view.
+    """
+    author_ids = {}
+    authors = []
+    for entry in quotes:
+        if entry["author"] not in author_ids:
+            author_ids[entry["author"]] = len(authors)
+            authors.append(entry["author"])
+
+    strings_at = (_HEADER.size + len(quotes) * _QUOTE.size
+                  + len(authors) * _AUTHOR.size)
+    blob = bytearray()
+    quote_table = bytearray()
+    for entry in quotes:
+        text = entry["quote"].encode("utf-8")
+        quote_table += _QUOTE.pack(strings_at + len(blob), len(text),
+                                   author_ids[entry["author"]])
+        blob += text
+    author_table = bytearray()
+    for name in authors:
+        data = name.encode("utf-8")
+        author_table += _AUTHOR.pack(strings_at + len(blob), len(data))
+        blob += data
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(quotes), len(authors)))
+        f.write(quote_table)
+        f.write(author_table)
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def compiled_path_for(path):
+    return os.path.splitext(path)[0] + COMPILED_SUFFIX
+
+
+def compile_file(source, destination=None, rules=DEFAULT_RULES):
+    """Compile a JSON quotes file; returns (destination, quote count)."""
+    destination = destination or compiled_path_for(source)
+    with open(source, "r") as f:
+        quotes = validate_quotes(json.load(f), source)
+    write_compiled(normalize_quotes(quotes, rules), destination)
+    return destination, len(quotes)
+
+
+def is_compiled(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def resolve_quotes_file(path):
+    """Prefer an up-to-date compiled sibling (foo.hqc next to foo.json)."""
+    compiled = compiled_path_for(path)
+    if compiled == path or not os.path.exists(compiled):
+        return path
+    if not os.path.exists(path):
+        return compiled
+    try:
+        if os.path.getmtime(compiled) >= os.path.getmtime(path):
+            return compiled
+    except OSError:
+        pass
+    return path
+
+
+def load_corpus(path, rules=DEFAULT_RULES):
+    """
+    Return a sequence of quote dicts from a JSON or compiled corpus.
+
+    Compiled corpora were normalized when they were built; JSON is
+    normalized here, once, as it is loaded.
+    """
+    if is_compiled(path):
+        return CompiledCorpus(path)
+    with open(path, "r") as f:
+        return normalize_quotes(validate_quotes(json.load(f), path), rules)
+
+
+def corpus_sources(quotes):
+    """The Source ranges of a corpus; a single-file corpus is one source."""
+    sources = getattr(quotes, "sources", None)
+    return sources or [Source("quotes", 0, len(quotes), 1.0)]
+
+
+def diff_quotes(old, new):
+    """
+    Where each quote of *old* went in *new*: an array with the new index
+    of every old quote, or -1 for quotes that were removed or edited.
+
+    Edits usually touch a few quotes or append some, so the common prefix
+    and suffix are matched by position and only what lies between them is
+    matched by content.
+    """
+    remap = array("i", [-1]) * len(old)
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and _same_quote(old[prefix], new[prefix]):
+        remap[prefix] = prefix
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and _same_quote(old[len(old) - 1 - suffix], new[len(new) - 1 - suffix])):
+        remap[len(old) - 1 - suffix] = len(new) - 1 - suffix
+        suffix += 1
+    moved = {}
+    for index in range(prefix, len(new) - suffix):
+        entry = new[index]
+        moved.setdefault((entry["quote"], entry["author"]), deque()).append(index)
+    for index in range(prefix, len(old) - suffix):
+        entry = old[index]
+        candidates = moved.get((entry["quote"], entry["author"]))
+        if candidates:
+            remap[index] = candidates.popleft()
+    return remap
+
+
+def _same_quote(a, b):
+    return a["quote"] == b["quote"] and a["author"] == b["author"]
+
+
+def read_source(path):
+    """Parse one .json (array) or .jsonl (object per line) quotes file."""
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            quotes = [json.loads(line) for line in f if line.strip()]
+        else:
+            quotes = json.load(f)
+    return validate_quotes(quotes, path)
+
+
+def _read_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable {path}: {e}")
+        return default
+
+
+def _write_json(data, path):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def list_sources(directory):
+    """Enabled source files in *directory* as (path, weight), sorted by name."""
+    settings = _read_json(os.path.join(directory, SOURCES_MANIFEST), {})
+    sources = []
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return sources
+    for name in names:
+        if name == SOURCES_MANIFEST or not name.endswith(SOURCE_SUFFIXES):
+            continue
+        options = settings.get(name, {})
+        if not options.get("enabled", True):
+            continue
+        sources.append((os.path.join(directory, name), float(options.get("weight", 1.0))))
+    return sources
+
+
+def load_quote_dir(directory, cache_dir, rules=DEFAULT_RULES):
+    """
+    Merge every enabled source in *directory* into one CompiledCorpus.
+
+    The merged corpus, one compiled file per source and a manifest of
+    source stats live in *cache_dir*. Returns the corpus with a .sources
+    list of Source ranges, or None if the directory has no sources.
+    """
+    start = time.perf_counter()
+    sources = []
+    for path, weight in list_sources(directory):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        sources.append({"path": path, "size": st.st_size,
+                        "mtime_ns": st.st_mtime_ns, "weight": weight})
+    if not sources:
+        return None
+
+    os.makedirs(os.path.join(cache_dir, "sources"), exist_ok=True)
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    merged_path = os.path.join(cache_dir, "merged" + COMPILED_SUFFIX)
+    manifest = _read_json(manifest_path, {})
+    if manifest.get("version") != CACHE_VERSION or manifest.get("rules") != rules:
+        manifest = {}  # different format or normalization: rebuild everything
+    cached = {entry["path"]: entry for entry in manifest.get("sources", [])}
+
+    def unchanged(source):
+        entry = cached.get(source["path"])
+        return (entry is not None and entry["size"] == source["size"]
+                and entry["mtime_ns"] == source["mtime_ns"])
+
+    # Warm start: same sources, same stats, same weights -> map the merged file
+    if (os.path.exists(merged_path) and len(cached) == len(sources)
+            and all(unchanged(s) and cached[s["path"]]["weight"] == s["weight"]
+                    for s in sources)):
+        try:
+            merged = _open_merged(merged_path, manifest["sources"])
+        except (OSError, CorpusError) as e:
+            print(f"Quote cache unusable, rebuilding: {e}")
+        else:
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Loaded {len(merged)} quotes from {len(sources)} sources "
+                  f"(warm cache) in {elapsed:.1f} ms")
+            return merged
+
+    # Cold or partial rebuild: re-parse only sources whose stats changed
+    quotes = []
+    reparsed = 0
+    for source in sources:
+        digest = hashlib.sha1(source["path"].encode("utf-8")).hexdigest()[:16]
+        source["cache"] = os.path.join(cache_dir, "sources", digest + COMPILED_SUFFIX)
+        entries = None
+        if unchanged(source) and os.path.exists(source["cache"]):
+            try:
+                compiled = CompiledCorpus(source["cache"])
+                entries = list(compiled)
+                compiled.close()
+            except (OSError, CorpusError):
+                entries = None
+        if entries is None:
+            try:
+                entries = normalize_quotes(read_source(source["path"]), rules)
+            except (OSError, ValueError) as e:
+                print(f"Skipping quotes source {source['path']}: {e}")
+                entries = []
+            write_compiled(entries, source["cache"])
+            reparsed += 1
+        source["start"] = len(quotes)
+        source["stop"] = len(quotes) + len(entries)
+        quotes.extend(entries)
+
+    write_compiled(quotes, merged_path)
+    _write_json({"version": CACHE_VERSION, "rules": rules, "sources": sources},
+                manifest_path)
+    _prune_source_cache(os.path.join(cache_dir, "sources"),
+                        {os.path.basename(s["cache"]) for s in sources})
+    merged = _open_merged(merged_path, sources)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Merged {len(merged)} quotes from {len(sources)} sources "
+          f"({reparsed} re-parsed, cache rebuilt) in {elapsed:.1f} ms")
+    return merged
+
+
+def _prune_source_cache(directory, keep):
+    """Delete cached sources whose files were removed or disabled."""
+    for name in os.listdir(directory):
+        if name not in keep:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def _open_merged(path, sources):
+    merged = CompiledCorpus(path)
+    merged.sources = [
+        Source(os.path.basename(s["path"]), s["start"], s["stop"], s["weight"])
+        for s in sources
+    ]
+    if merged.sources[-1].stop != len(merged):
+        merged.close()
+        raise CorpusError(f"{path}: does not match the cache manifest")
+    return merged
@@ -0,0 +1,230 @@
+"""
+Near-duplicate detection for imported quote corpora.
+
+Merging collections yields the same quote many times over, differing in
+punctuation, case, a word or two, or the attribution. Comparing every
+pair stops scaling at a few thousand quotes, so dedupe_quotes() finds
+candidates with MinHash and LSH banding instead, in time roughly linear
+in the corpus:
+
+  canonical   cleaned text (normalize.clean_text), case-folded, with
+              punctuation and repeated whitespace removed; quotes that are
+              identical at this point are merged without further work
+  shingles    the set of SHINGLE-byte substrings of the canonical text
+  signature   one-permutation MinHash: every shingle hash lands in one of
+              SIGNATURE bins and each bin keeps its minimum; empty bins
+              borrow from the next filled one (rotation densification)
+  bands       the signature is cut into BANDS bands of ROWS values; two
+              quotes sharing any band are candidates
+  verify      candidates are merged only if the Jaccard similarity of
+              their shingle sets is at least THRESHOLD
+
+Only the band hashes (an array of BANDS ints per quote) and the canonical
+texts stay in memory. Bands are bucketed one at a time, and a quote is
+compared with the first quote of each bucket it falls into, so a popular
+bucket costs one comparison per member rather than one per pair.
+
+Each group of duplicates keeps one entry, in the position of the group's
+first quote: the one with the best attribution (see attribution_score),
+with the tags of the whole group.
+"""
+import os
+import re
+import unicodedata
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from normalize import CHUNK_SIZE, PARALLEL_THRESHOLD, clean_text
+
+SHINGLE = 5
+SIGNATURE = 32
+BANDS = 8
+ROWS = SIGNATURE // BANDS
+# Minimum Jaccard similarity of two quotes' shingle sets to merge them
+THRESHOLD = 0.7
+
+_BIN_BITS = SIGNATURE.bit_length() - 1
+_BIN_MASK = SIGNATURE - 1
+_EMPTY = 1 << 32
+_MASK64 = (1 << 64) - 1
+
+_NOT_WORD = re.compile(r"[\W_]+")
+UNKNOWN_AUTHORS = {"", "unknown", "anonymous", "anon", "unknown author", "n a", "various"}
+
+
+def canonical(text):
+    """The form two quotes are compared in."""
+    text = unicodedata.normalize("NFKC", clean_text(text)).casefold()
+    return _NOT_WORD.sub(" ", text).strip()
+
+
+def shingles(text):
+    """Hashed SHINGLE-byte substrings of a canonical text."""
+    data = text.encode("utf-8")
+    if len(data) <= SHINGLE:
+        return {zlib.crc32(data)}
+    # CRC32 is linear; the multiply spreads near-identical shingles apart
+    return {(zlib.crc32(data[i:i + SHINGLE]) * 0x9E3779B1) & 0xFFFFFFFF
+            for i in range(len(data) - SHINGLE + 1)}
+
+
+def signature(hashes):
+    values = [_EMPTY] * SIGNATURE
+    for h in hashes:
+        b = h & _BIN_MASK
+        v = h >> _BIN_BITS
+        if v < values[b]:
+            values[b] = v
+    for b in range(SIGNATURE):
+        if values[b] == _EMPTY:
+            # Borrow from the next bin that got a shingle, tagged with the
+            # distance so two borrowed bins only agree if they borrowed alike
+            for step in range(1, SIGNATURE):
+                borrowed = values[(b + step) % SIGNATURE]
+                if borrowed < _EMPTY:
+                    values[b] = borrowed + (step << 32)
+                    break
+    return values
+
+
+def band_keys(text):
+    """BANDS hashes of a canonical text's signature, one per band."""
+    values = signature(shingles(text))
+    return [hash((band,) + tuple(values[band * ROWS:(band + 1) * ROWS])) & _MASK64
+            for band in range(BANDS)]
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _analyse_chunk(texts):
+    """(canonical texts, band keys) for a chunk of quote texts."""
+    canonicals = [canonical(text) for text in texts]
+    keys = array("Q")
+    for text in canonicals:
+        keys.extend(band_keys(text))
+    return canonicals, keys
+
+
+def attribution_score(author, votes):
+    """
+    Higher is better: a real name over "Unknown", the spelling most of the
+    group agrees on, no leftover citations or URLs, then the fuller name.
+    """
+    name = canonical(author)
+    return (
+        name not in UNKNOWN_AUTHORS,
+        votes.get(name, 0),
+        not any(c in author for c in "[]()/:@"),
+        min(len(author), 40),
+    )
+
+
+class _Groups:
+    """Union-find over quote indices; the root is always the lowest index."""
+
+    def __init__(self, size):
+        self.parent = array("I", range(size))
+
+    def find(self, i):
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+
+
+def dedupe_quotes(quotes, threshold=THRESHOLD, workers=None):
+    """
+    Merge near-duplicates in *quotes* (dicts with "quote" and "author").
+
+    Returns (kept, merged): the deduplicated list in corpus order, and one
+    record per group that lost entries: {"index", "kept": entry,
+    "collapsed": [{"index", "similarity", "entry"}, ...]}, where index is
+    a position in *quotes* and similarity the Jaccard similarity with the
+    kept quote.
+    """
+    texts = [entry["quote"] for entry in quotes]
+    if len(texts) < PARALLEL_THRESHOLD or workers == 1:
+        canonicals, keys = _analyse_chunk(texts)
+    else:
+        chunks = [texts[i:i + CHUNK_SIZE] for i in range(0, len(texts), CHUNK_SIZE)]
+        canonicals, keys = [], array("Q")
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for chunk_canonicals, chunk_keys in pool.map(_analyse_chunk, chunks):
+                canonicals.extend(chunk_canonicals)
+                keys.extend(chunk_keys)
+    del texts
+
+    groups = _Groups(len(quotes))
+    first = {}
+    for i, text in enumerate(canonicals):
+        j = first.setdefault(text, i)
+        if j != i:
+            groups.union(j, i)
+    del first
+
+    for band in range(BANDS):
+        buckets = {}
+        for i in range(len(canonicals)):
+            j = buckets.setdefault(keys[i * BANDS + band], i)
+            if j == i or groups.find(i) == groups.find(j):
+                continue
+            if jaccard(shingles(canonicals[i]), shingles(canonicals[j])) >= threshold:
+                groups.union(j, i)
+    del keys
+
+    members = {}
+    for i in range(len(quotes)):
+        root = groups.find(i)
+        if root != i:
+            members.setdefault(root, [root]).append(i)
+
+    kept, merged = [], []
+    for i, entry in enumerate(quotes):
+        group = members.get(i)
+        if group is None:
+            if groups.find(i) == i:
+                kept.append(entry)
+            continue
+        votes = {}
+        for m in group:
+            name = canonical(quotes[m]["author"])
+            votes[name] = votes.get(name, 0) + 1
+        best = max(group, key=lambda m: attribution_score(quotes[m]["author"], votes))
+        entry = dict(quotes[best])
+        tags = []
+        for m in group:
+            tags.extend(t for t in quotes[m].get("tags") or () if t not in tags)
+        if tags:
+            entry["tags"] = tags
+        kept.append(entry)
+        reference = shingles(canonicals[best])
+        merged.append({"index": best, "kept": entry, "collapsed": [
+            {"index": m, "similarity": round(jaccard(reference, shingles(canonicals[m])), 3),
+             "entry": quotes[m]}
+            for m in group if m != best
+        ]})
+    return kept, merged
+
+
+def format_group(group):
+    """A merged group as text for the --dedupe report."""
+    kept = group["kept"]
+    lines = [f'kept   {group["index"]:>7}  "{kept["quote"]}" — {kept["author"]}']
+    for collapsed in group["collapsed"]:
+        entry = collapsed["entry"]
+        lines.append(f'merged {collapsed["index"]:>7}  {collapsed["similarity"]:.2f}  '
+                     f'"{entry["quote"]}" — {entry["author"]}')
+    return "\n".join(lines)
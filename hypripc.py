@@ -0,0 +1,298 @@
+"""
+Hyprland IPC helpers.
+
+Hyprland exposes two UNIX sockets per running instance, under
+$XDG_RUNTIME_DIR/hypr/$HYPRLAND_INSTANCE_SIGNATURE/:
+
+  .socket.sock    request / reply (what hyprctl talks to)
+  .socket2.sock   event stream, one "EVENT>>DATA" line per event
+"""
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+
+import metrics
+import tracer
+from metrics import LatencyHistogram
+
+# Events that can change whether a monitor's active workspace is empty.
+WORKSPACE_EVENTS = frozenset({
+    "workspace", "openwindow", "closewindow", "movewindow", "focusedmon",
+    "monitoradded", "monitorremoved", "moveworkspace",
+})
+
+
+def hypr_socket_dir():
+    """Return the socket directory of the running Hyprland instance, or None."""
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE")
+    if not signature:
+        return None
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+    path = os.path.join(runtime, "hypr", signature)
+    if not os.path.isdir(path):
+        # Hyprland < 0.40 kept its sockets under /tmp/hypr/
+        legacy = os.path.join("/tmp", "hypr", signature)
+        if os.path.isdir(legacy):
+            return legacy
+    return path
+
+
+def workspace_argument(name):
+    """Dispatcher argument for the workspace called *name* ("3", "name:web")."""
+    return name if name.lstrip("-").isdigit() else f"name:{name}"
+
+
+def request_socket_path():
+    """Path of .socket.sock, or None outside a Hyprland session."""
+    directory = hypr_socket_dir()
+    return os.path.join(directory, ".socket.sock") if directory else None
+
+
+def event_socket_path():
+    """Path of .socket2.sock, or None outside a Hyprland session."""
+    directory = hypr_socket_dir()
+    return os.path.join(directory, ".socket2.sock") if directory else None
+
+
+class EventMonitor:
+    """
+    Blocking reader for Hyprland's event socket.
+
+    run() connects to the socket, calls *on_event(name, data)* for every
+    event listed in *events* and transparently reconnects (with back-off)
+    when the compositor drops the connection. It returns once stop() has
+    been called or the socket file disappears, so the caller can fall back
+    to polling.
+
+    *on_connect* is called after every (re)connection: events may have been
+    missed while disconnected, so the caller should resynchronise there.
+
+    *path* overrides the socket location, e.g. to point at a fake server.
+    """
+
+    RECONNECT_DELAYS = (0.1, 0.25, 0.5, 1.0, 2.0)
+    # Reads block until an event arrives: stop() shuts the socket down to
+    # wake them, so there is no timeout to poll self.active with
+    READ_TIMEOUT = None
+
+    def __init__(self, on_event, events=WORKSPACE_EVENTS, path=None,
+                 on_connect=None):
+        self.on_event = on_event
+        self.events = events
+        self.path = path
+        self.on_connect = on_connect
+        self.active = True
+        self._sock = None
+        self._wakeup = threading.Event()
+        self.wakeups = metrics.Counter()  # returns from recv()
+
+    def socket_path(self):
+        return self.path or event_socket_path()
+
+    def available(self):
+        path = self.socket_path()
+        return bool(path) and os.path.exists(path)
+
+    def stop(self):
+        self.active = False
+        self._wakeup.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def run(self):
+        attempt = 0
+        while self.active and self.available():
+            try:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.connect(self.socket_path())
+                self._sock.settimeout(self.READ_TIMEOUT)
+            except OSError as e:
+                self._close()
+                delay = self.RECONNECT_DELAYS[min(attempt, len(self.RECONNECT_DELAYS) - 1)]
+                print(f"Event socket connect failed ({e}), retrying in {delay}s")
+                attempt += 1
+                self._wakeup.wait(delay)
+                continue
+
+            attempt = 0
+            if self.on_connect:
+                self.on_connect()
+            try:
+                self._read_loop()
+            except OSError as e:
+                if self.active:
+                    print(f"Event socket error: {e}")
+            finally:
+                self._close()
+
+    def _read_loop(self):
+        buffer = b""
+        while self.active:
+            try:
+                chunk = self._sock.recv(4096)
+            except socket.timeout:
+                continue
+            self.wakeups.inc()
+            if not chunk:
+                return  # compositor closed the connection
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                name, sep, data = line.decode("utf-8", "replace").partition(">>")
+                if sep and (self.events is None or name in self.events):
+                    self.on_event(name, data)
+
+    def _close(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+
+class HyprctlError(RuntimeError):
+    pass
+
+
+class HyprctlClient:
+    """
+    In-process replacement for the hyprctl binary.
+
+    Requests go straight to .socket.sock; Hyprland answers one request per
+    connection, so each call is a connect/send/read-to-EOF round trip with
+    no process creation. When the socket is missing the client falls back
+    to running hyprctl.
+
+    Latencies are recorded per transport in self.latency so both paths can
+    be compared (see ``hyprquotes.py --ipc-latency``).
+    """
+
+    def __init__(self, path=None, timeout=1.0):
+        self.path = path
+        self.timeout = timeout
+        self.trace = tracer.TRACER
+        self.latency = {
+            "socket": LatencyHistogram(),
+            "subprocess": LatencyHistogram(),
+        }
+        registry = metrics.REGISTRY
+        for transport, histogram in self.latency.items():
+            registry.register("hyprquotes_ipc_seconds",
+                              "Compositor request round trip time", histogram,
+                              transport=transport)
+        self.requests = {
+            (kind, transport): registry.counter(
+                "hyprquotes_ipc_requests_total", "Compositor queries and dispatches",
+                kind=kind, transport=transport)
+            for kind in ("query", "dispatch", "keyword") for transport in self.latency
+        }
+        self.errors = {
+            kind: registry.counter("hyprquotes_ipc_errors_total",
+                                   "Compositor requests that failed", kind=kind)
+            for kind in ("query", "dispatch", "keyword")
+        }
+        self.spawned = registry.counter("hyprquotes_subprocesses_total",
+                                        "Child processes started", program="hyprctl")
+
+    def socket_path(self):
+        return self.path or request_socket_path()
+
+    def available(self):
+        path = self.socket_path()
+        return bool(path) and os.path.exists(path)
+
+    def request(self, command):
+        """Send a raw request (e.g. ``j/clients``) and return the reply text."""
+        start = time.perf_counter()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path())
+            sock.sendall(command.encode("utf-8"))
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        self.latency["socket"].observe(time.perf_counter() - start)
+        return b"".join(chunks).decode("utf-8", "replace")
+
+    def _run_hyprctl(self, args):
+        self.spawned.inc()
+        start = time.perf_counter()
+        result = subprocess.run(
+            ["hyprctl", *args], capture_output=True, text=True,
+            timeout=self.timeout,
+        )
+        self.latency["subprocess"].observe(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise HyprctlError(result.stderr.strip() or f"hyprctl {args[0]} failed")
+        return result.stdout
+
+    def query(self, command, use_socket=None):
+        """Run a JSON query such as ``activeworkspace`` and return parsed data."""
+        if use_socket is None:
+            use_socket = self.available()
+        self.requests["query", "socket" if use_socket else "subprocess"].inc()
+        try:
+            if use_socket:
+                reply = self.request(f"j/{command}")
+            else:
+                reply = self._run_hyprctl([command, "-j"])
+            return json.loads(reply)
+        except Exception:
+            self.errors["query"].inc()
+            raise
+
+    def dispatch(self, *dispatches):
+        """
+        Run one or more dispatches (``"pin address:0x..."``).
+
+        Several dispatches are sent as a single [[BATCH]] request, which
+        Hyprland applies back to back.
+        """
+        use_socket = self.available()
+        self.requests["dispatch", "socket" if use_socket else "subprocess"].inc()
+        start = time.perf_counter()
+        try:
+            reply = self._send([f"dispatch {d}" for d in dispatches], use_socket)
+        except Exception:
+            self.errors["dispatch"].inc()
+            self.trace.record(tracer.DISPATCH, dispatches, False,
+                              int((time.perf_counter() - start) * 1e6))
+            raise
+        self.trace.record(tracer.DISPATCH, dispatches, True,
+                          int((time.perf_counter() - start) * 1e6))
+        return reply
+
+    def keyword(self, *keywords):
+        """
+        Change config values at runtime (``"windowrulev2 float,title:..."``),
+        batched like dispatch().
+        """
+        use_socket = self.available()
+        self.requests["keyword", "socket" if use_socket else "subprocess"].inc()
+        try:
+            return self._send([f"keyword {k}" for k in keywords], use_socket)
+        except Exception:
+            self.errors["keyword"].inc()
+            raise
+
+    def _send(self, commands, use_socket):
+        if use_socket:
+            if len(commands) == 1:
+                reply = self.request(commands[0])
+            else:
+                reply = self.request("[[BATCH]]" + ";".join(commands))
+            # Batch replies are the individual replies concatenated ("okok")
+            if reply.replace("ok", "").strip():
+                raise HyprctlError(reply.strip())
+            return reply
+        if len(commands) == 1:
+            return self._run_hyprctl(commands[0].split(" ", 2))
+        return self._run_hyprctl(["--batch", " ; ".join(commands)])
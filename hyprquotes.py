@@ -1,619 +1,263 @@
 #!/usr/bin/env python3
-import gi
-gi.require_version('Gtk', '3.0')
-gi.require_version('Gdk', '3.0')
-from gi.repository import Gtk, Gdk, GLib
-import json
-import random
-import os
+"""
+hyprquotes entry point.
+
+  hyprquotes                      start the overlay (once per session)
+  hyprquotes next|prev|pause|...  control the running overlay and exit
+  hyprquotes --search QUERY ...   command-line tools, see --help
+
+Control commands are dispatched before anything else is imported so a
+keybind costs a Python start-up and one socket round trip, not a GTK
+import. The other modules are imported only by the branch that uses them.
+"""
 import sys
-import subprocess
 import time
-import threading
-import cairo
 
-# ── Paths ─────────────────────────────────────────────────────────────────────
-BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+STARTED = time.perf_counter()
 
-# Quotes file: prefer user config (~/.config/hyprquotes/), fall back to assets/
-_USER_QUOTES = os.path.expanduser("~/.config/hyprquotes/programming-quotes.json")
-_BUNDLED_QUOTES = os.path.join(BASE_DIR, "assets", "programming-quotes.json")
-QUOTES_FILE = _USER_QUOTES if os.path.exists(_USER_QUOTES) else _BUNDLED_QUOTES
+import control  # noqa: E402
 
-SPECIAL_WORKSPACE = "special:scratchpad"
-ADDR_FILE = "/tmp/quote_window_addr"
 
-# ── Clipboard helper ───────────────────────────────────────────────────────────
-def _wl_copy_available():
-    """Return True if wl-copy is present on PATH."""
-    try:
-        subprocess.run(["which", "wl-copy"], capture_output=True, check=True)
-        return True
-    except subprocess.CalledProcessError:
-        return False
+def measure_ipc_latency(samples):
+    """Time `activeworkspace` through the request socket and through hyprctl."""
+    import hypripc
+
+    client = hypripc.HyprctlClient()
+    if not client.available():
+        print("Hyprland request socket not found — only measuring hyprctl.")
+    for _ in range(samples):
+        if client.available():
+            client.query("activeworkspace", use_socket=True)
+        client.query("activeworkspace", use_socket=False)
+    for transport, histogram in client.latency.items():
+        print(f"{transport:>10}: {histogram.summary()}")
+        print(histogram.format_buckets())
+
 
-WL_COPY_AVAILABLE = _wl_copy_available()
+def main(argv):
+    if argv and argv[0] in control.COMMANDS:
+        return control.main(argv)
 
+    import argparse
 
-def copy_to_clipboard(text: str) -> bool:
-    """
-    Copy *text* to the system clipboard.
+    commands = "\n".join(f"  {name:<8} {help}" for name, help in control.COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        description="Quote overlay for Hyprland",
+        epilog=f"commands for the running overlay (hyprquotes COMMAND):\n{commands}",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--ipc-latency", type=int, metavar="N",
+                        help="compare N socket vs. hyprctl round trips and exit")
+    parser.add_argument("--compile", nargs="+", metavar=("JSON", "OUTPUT"),
+                        help="compile a JSON quotes file to the mmap'd .hqc format and exit")
+    parser.add_argument("--search", metavar="QUERY",
+                        help='print quotes matching QUERY (words, author:NAME, tag:TAG) and exit')
+    parser.add_argument("--filter", metavar="QUERY",
+                        help="only rotate through quotes matching QUERY")
+    parser.add_argument("--normalize", nargs="+", metavar=("JSON", "OUTPUT"),
+                        help="clean HTML, entities and long authors in a JSON quotes "
+                             "file (in place unless OUTPUT is given) and exit")
+    parser.add_argument("--dedupe", nargs="+", metavar=("QUOTES", "OUTPUT"),
+                        help="merge near-duplicate quotes in a .json/.jsonl file (in "
+                             "place unless OUTPUT is given), list what was merged in "
+                             "OUTPUT's name + .dedupe.txt and exit")
+    parser.add_argument("--shared-corpus", nargs="?", const="", metavar="DIR",
+                        help="use the corpus published for every user on this host "
+                             "(in DIR, default /dev/shm/hyprquotes) instead of your own")
+    parser.add_argument("--publish-shared", metavar="QUOTES",
+                        help="compile and index a .json/.jsonl/.hqc quotes file into "
+                             "the shared corpus directory, swap it in and exit")
+    parser.add_argument("--metrics", nargs="?", const="", metavar="FILE",
+                        help="collect IPC, corpus and show/hide metrics for "
+                             "`hyprquotes metrics`, and write them to FILE "
+                             "in Prometheus text format if given")
+    parser.add_argument("--stream", nargs="?", const="", metavar="MONITOR",
+                        help="print quotes as JSON lines for waybar/eww instead of "
+                             "opening a window (no GTK); follows the focused monitor, "
+                             "or MONITOR")
+    parser.add_argument("--render", choices=("widgets", "card"), default="widgets",
+                        help="draw quotes with GTK labels and CSS (default) or as "
+                             "cached Cairo cards that crossfade")
+    parser.add_argument("--trace", nargs="?", type=int, const=0, metavar="RECORDS",
+                        help="keep the last RECORDS compositor events, visibility "
+                             "decisions, dispatches and quote changes in memory and "
+                             "write them out on SIGUSR2, `hyprquotes trace` or a crash")
+    parser.add_argument("--replay", metavar="TRACE",
+                        help="run a --trace file through the visibility logic without "
+                             "a compositor, print the timeline and a summary and exit")
+    parser.add_argument("--replay-speed", type=float, default=0, metavar="X",
+                        help="replay X times faster than recorded (default: as fast "
+                             "as possible)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long each startup phase took once the "
+                             "first quote is on screen")
+    args = parser.parse_args(argv)
 
-    Strategy:
-      1. Try wl-copy (native Wayland, best option).
-      2. Fall back to GTK's Gtk.Clipboard (works without wl-clipboard installed,
-         but the content is lost once hyprquotes exits).
+    if args.normalize:
+        import json
+        import config
+        import corpus
+        import normalize
 
-    Returns True on success, False on failure.
-    """
-    if WL_COPY_AVAILABLE:
+        if len(args.normalize) > 2:
+            parser.error("--normalize takes a JSON file and an optional output path")
+        source = args.normalize[0]
+        output = args.normalize[-1]
         try:
-            subprocess.run(
-                ["wl-copy"],
-                input=text.encode("utf-8"),
-                check=True,
+            with open(source, "r") as f:
+                quotes = corpus.validate_quotes(json.load(f), source)
+            cleaned = normalize.normalize_quotes(
+                quotes, normalize.load_rules(config.NORMALIZE_RULES_FILE)
             )
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"wl-copy failed: {e}")
-            # fall through to GTK fallback
+            with open(output, "w") as f:
+                json.dump(cleaned, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+        except (OSError, ValueError) as e:
+            print(f"Error normalizing quotes: {e}")
+            return 1
+        changed = sum(a != b for a, b in zip(quotes, cleaned))
+        print(f"Normalized {len(cleaned)} quotes ({changed} changed) into {output}")
+        return 0
 
-    # GTK fallback ─────────────────────────────────────────────────────────────
-    try:
-        clipboard = Gtk.Clipboard.get(Gdk.SELECTION_CLIPBOARD)
-        clipboard.set_text(text, -1)
-        clipboard.store()          # persist across process lifetime
-        print("Clipboard set via GTK fallback (content lost on exit).")
-        return True
-    except Exception as e:
-        print(f"GTK clipboard fallback failed: {e}")
-        return False
-
-
-class QuoteOverlay(Gtk.Window):
-    def __init__(self):
-        super().__init__(title="Quote Display")
-        
-        # Window properties for overlay
-        self.set_decorated(False)
-        self.set_keep_above(True)
-        self.set_skip_taskbar_hint(True)
-        self.set_skip_pager_hint(True)
-        self.set_type_hint(Gdk.WindowTypeHint.DOCK)
-        self.set_accept_focus(False)
-        self.set_resizable(False)
-        
-        # Make fully transparent
-        screen = self.get_screen()
-        visual = screen.get_rgba_visual()
-        if visual:
-            self.set_visual(visual)
-        
-        self.set_app_paintable(True)
-        self.connect("draw", self.on_draw)
-        
-        # Set window size with more space for buttons
-        self.set_default_size(700, 250)
-        
-        # Position in bottom-right corner
-        screen_width = screen.get_width()
-        screen_height = screen.get_height()
-        self.move(screen_width - 750, screen_height - 300)
-        
-        # Create main box that fills the window
-        self.main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
-        
-        # Create header box for buttons (fixed height)
-        self.header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
-        self.header_box.set_size_request(-1, 70)
-        self.header_box.set_margin_top(10)
-        self.header_box.set_margin_end(20)
-        
-        self.header_spacer = Gtk.Box()
-        self.header_box.pack_start(self.header_spacer, True, True, 0)
-        
-        self.button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
-        
-        # Previous quote button
-        self.prev_button = Gtk.Button()
-        self.prev_button.set_label("◀")
-        self.prev_button.set_name("prev-button")
-        self.prev_button.connect("clicked", self.on_prev_clicked)
-        self.prev_button.set_tooltip_text("Previous quote")
-        self.prev_button.set_sensitive(False)
-        self.prev_button.set_can_focus(False)
-        self.prev_button.set_halign(Gtk.Align.CENTER)
-        self.prev_button.set_valign(Gtk.Align.CENTER)
-        
-        # Pause/Play button
-        self.pause_button = Gtk.Button()
-        self.pause_button.set_label("⏸")
-        self.pause_button.set_name("pause-button")
-        self.pause_button.connect("clicked", self.on_pause_clicked)
-        self.pause_button.set_tooltip_text("Pause/Resume auto-rotation")
-        self.is_paused = False
-        self.pause_button.set_can_focus(False)
-        self.pause_button.set_halign(Gtk.Align.CENTER)
-        self.pause_button.set_valign(Gtk.Align.CENTER)
-        
-        # Next quote button
-        self.next_button = Gtk.Button()
-        self.next_button.set_label("▶")
-        self.next_button.set_name("next-button")
-        self.next_button.connect("clicked", self.on_next_clicked)
-        self.next_button.set_tooltip_text("Next quote")
-        self.next_button.set_sensitive(False)
-        self.next_button.set_can_focus(False)
-        self.next_button.set_halign(Gtk.Align.CENTER)
-        self.next_button.set_valign(Gtk.Align.CENTER)
-        
-        # Copy button — label reflects wl-copy availability
-        self.copy_button = Gtk.Button()
-        self.copy_button.set_label("📋")
-        self.copy_button.set_name("copy-button")
-        self.copy_button.connect("clicked", self.on_copy_clicked)
-        self.copy_button.set_sensitive(False)
-        _copy_tip = "Copy quote to clipboard"
-        if not WL_COPY_AVAILABLE:
-            _copy_tip += " (wl-copy missing — using GTK fallback, content lost on exit)"
-        self.copy_button.set_tooltip_text(_copy_tip)
-        self.copy_button.set_can_focus(False)
-        self.copy_button.set_halign(Gtk.Align.CENTER)
-        self.copy_button.set_valign(Gtk.Align.CENTER)
-        
-        self.button_box.pack_start(self.prev_button, False, False, 0)
-        self.button_box.pack_start(self.pause_button, False, False, 0)
-        self.button_box.pack_start(self.next_button, False, False, 0)
-        self.button_box.pack_start(self.copy_button, False, False, 0)
-        
-        self.header_box.pack_end(self.button_box, False, False, 0)
-        
-        # Content box
-        self.content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
-        self.content_box.set_halign(Gtk.Align.CENTER)
-        self.content_box.set_valign(Gtk.Align.CENTER)
-        self.content_box.set_margin_start(40)
-        self.content_box.set_margin_end(40)
-        self.content_box.set_margin_top(20)
-        self.content_box.set_margin_bottom(20)
-        
-        self.quote_label = Gtk.Label()
-        self.quote_label.set_line_wrap(True)
-        self.quote_label.set_max_width_chars(70)
-        self.quote_label.set_justify(Gtk.Justification.CENTER)
-        self.quote_label.set_selectable(False)
-        self.quote_label.set_name("quote-label")
-        
-        self.author_label = Gtk.Label()
-        self.author_label.set_justify(Gtk.Justification.CENTER)
-        self.author_label.set_name("author-label")
-        
-        self.content_box.pack_start(self.quote_label, True, True, 0)
-        self.content_box.pack_start(self.author_label, False, False, 0)
-        
-        self.main_box.pack_start(self.header_box, False, False, 0)
-        self.main_box.pack_start(self.content_box, True, True, 0)
-        
-        self.add(self.main_box)
-        
-        self.apply_styling()
-        
-        # State
-        self.is_visible = False
-        self.window_check_active = True
-        self.quote_timer_id = None
-        self.display_duration = 10
-        self.monitor_thread = None
-        self.current_workspace = None
-        self.window_address = None
-        
-        # Quote management
-        self.all_quotes = []
-        self.current_quote_index = -1
-        self.current_quote = ""
-        self.current_author = ""
-        
-        # Timer tracking
-        self.last_quote_change_time = 0
-        self.pause_start_time = 0
-        
-        self.load_all_quotes()
-        self.start_workspace_monitor()
-        self.hide()
-        self.connect("map-event", self.on_window_mapped)
-    
-    def on_window_mapped(self, widget, event):
-        if not self.window_address:
-            self.window_address = self.get_window_address()
-            if self.window_address:
-                print(f"Window address obtained: {self.window_address}")
-                with open(ADDR_FILE, 'w') as f:
-                    f.write(self.window_address)
-                self.move_to_special_workspace()
-    
-    def get_window_address(self):
-        try:
-            xid = hex(self.get_window().get_xid())
-            return xid
-        except Exception as e:
-            print(f"Error getting window address: {e}")
-            return None
-    
-    def apply_styling(self):
-        css = """
-        #quote-label {
-            font-family: 'Sans';
-            font-size: 24px;
-            font-weight: normal;
-            font-style: italic;
-            color: rgba(255, 255, 255, 0.85);
-            padding: 15px;
-            background-color: rgba(0, 0, 0, 0.5);
-            border-radius: 10px;
-            margin: 10px;
-            text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.5);
-        }
-        #author-label {
-            font-family: 'Sans';
-            font-size: 20px;
-            font-weight: bold;
-            color: rgba(255, 255, 255, 0.9);
-            padding: 8px 12px;
-            background-color: rgba(40, 40, 60, 0.7);
-            border-radius: 6px;
-            margin-top: 10px;
-            text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.5);
-        }
-        #prev-button, #pause-button, #next-button, #copy-button {
-            font-family: 'Sans';
-            font-size: 24px;
-            font-weight: bold;
-            color: rgba(255, 255, 255, 0.95);
-            border: 2px solid rgba(255, 255, 255, 0.4);
-            border-radius: 50%;
-            padding: 8px;
-            box-shadow: 0px 3px 10px rgba(0, 0, 0, 0.5);
-            transition: all 0.2s ease;
-        }
-        #prev-button, #next-button {
-            background-color: rgba(33, 150, 243, 0.85);
-        }
-        #pause-button {
-            background-color: rgba(255, 193, 7, 0.85);
-        }
-        #copy-button {
-            background-color: rgba(76, 175, 80, 0.85);
-        }
-        #prev-button:hover, #pause-button:hover, #next-button:hover, #copy-button:hover {
-            border-color: rgba(255, 255, 255, 0.6);
-            box-shadow: 0px 4px 12px rgba(0, 0, 0, 0.6);
-            transform: scale(1.08);
-        }
-        #prev-button:active, #pause-button:active, #next-button:active, #copy-button:active {
-            transform: scale(0.95);
-        }
-        #prev-button:disabled, #next-button:disabled,
-        #copy-button:disabled {
-            background-color: rgba(100, 100, 100, 0.4);
-            color: rgba(255, 255, 255, 0.4);
-            border-color: rgba(255, 255, 255, 0.2);
-        }
-        window {
-            background-color: transparent;
-        }
-        """
-        css_provider = Gtk.CssProvider()
-        try:
-            css_provider.load_from_data(css.encode())
-        except Exception as e:
-            print(f"CSS loading error: {e}")
-            return
-        screen = Gdk.Screen.get_default()
-        style_context = Gtk.StyleContext()
-        style_context.add_provider_for_screen(
-            screen, css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
-
-    def on_draw(self, widget, cr):
-        cr.set_source_rgba(0, 0, 0, 0)
-        cr.set_operator(cairo.OPERATOR_SOURCE)
-        cr.paint()
-        return False
-    
-    def load_all_quotes(self):
+    if args.dedupe:
+        import json
+        import os
+        import corpus
+        import dedupe
+
+        if len(args.dedupe) > 2:
+            parser.error("--dedupe takes a quotes file and an optional output path")
+        source = args.dedupe[0]
+        output = args.dedupe[-1]
+        report = os.path.splitext(output)[0] + ".dedupe.txt"
+        start = time.perf_counter()
         try:
-            with open(QUOTES_FILE, 'r') as f:
-                self.all_quotes = json.load(f)
-                if self.all_quotes:
-                    print(f"Loaded {len(self.all_quotes)} quotes from {QUOTES_FILE}")
+            quotes = corpus.read_source(source)
+            kept, merged = dedupe.dedupe_quotes(quotes)
+            with open(output, "w") as f:
+                if output.endswith(".jsonl"):
+                    for entry in kept:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
                 else:
-                    print("No quotes found in file, using defaults")
-                    self._use_default_quotes()
-        except Exception as e:
-            print(f"Error loading quotes: {e}")
-            self._use_default_quotes()
-
-    def _use_default_quotes(self):
-        self.all_quotes = [
-            {"author": "System", "quote": "Add quotes to your JSON file"},
-            {"author": "Unknown", "quote": "The only way to learn a new programming language is by writing programs in it."}
-        ]
-    
-    def show_quote_at_index(self, index):
-        if not self.all_quotes or index < 0 or index >= len(self.all_quotes):
-            return False
-        
-        quote_data = self.all_quotes[index]
-        self.current_quote_index = index
-        self.current_quote = quote_data["quote"]
-        self.current_author = quote_data["author"]
-        self.last_quote_change_time = time.time()
-        
-        quote = self.current_quote
-        wrapped_quote = ""
-        words = quote.split()
-        line = ""
-        for word in words:
-            if len(line + " " + word) > 70:
-                wrapped_quote += line + "\n"
-                line = word
-            else:
-                line += (" " if line else "") + word
-        wrapped_quote += line
-        
-        self.quote_label.set_text(wrapped_quote)
-        self.author_label.set_text(f"— {self.current_author}")
-        
-        self.prev_button.set_sensitive(index > 0)
-        self.next_button.set_sensitive(index < len(self.all_quotes) - 1)
-        self.copy_button.set_sensitive(True)
-        
-        return True
-    
-    def show_random_quote(self):
-        if not self.all_quotes:
-            return False
-        if len(self.all_quotes) > 1:
-            new_index = self.current_quote_index
-            while new_index == self.current_quote_index:
-                new_index = random.randrange(0, len(self.all_quotes))
-        else:
-            new_index = 0
-        return self.show_quote_at_index(new_index)
-    
-    def show_next_quote(self):
-        if not self.all_quotes:
-            return False
-        next_index = (self.current_quote_index + 1) % len(self.all_quotes)
-        return self.show_quote_at_index(next_index)
-    
-    def show_prev_quote(self):
-        if not self.all_quotes:
-            return False
-        prev_index = self.current_quote_index - 1 if self.current_quote_index > 0 else len(self.all_quotes) - 1
-        return self.show_quote_at_index(prev_index)
-    
-    def on_prev_clicked(self, button):
-        if self.show_prev_quote():
-            self.reset_quote_timer()
-    
-    def on_next_clicked(self, button):
-        if self.show_next_quote():
-            self.reset_quote_timer()
-    
-    def on_pause_clicked(self, button):
-        self.is_paused = not self.is_paused
-        if self.is_paused:
-            if self.quote_timer_id:
-                self.pause_start_time = time.time()
-                GLib.source_remove(self.quote_timer_id)
-                self.quote_timer_id = None
-            button.set_label("▶")
-            button.set_tooltip_text("Resume auto-rotation")
-        else:
-            if self.is_visible and not self.quote_timer_id and self.last_quote_change_time > 0:
-                elapsed = time.time() - self.last_quote_change_time
-                remaining = max(0.1, self.display_duration - elapsed)
-                self.quote_timer_id = GLib.timeout_add(
-                    int(remaining * 1000), self.on_quote_timer_ms
+                    json.dump(kept, f, indent=2, ensure_ascii=False)
+                    f.write("\n")
+            with open(report, "w") as f:
+                for group in merged:
+                    f.write(dedupe.format_group(group) + "\n")
+        except (OSError, ValueError) as e:
+            print(f"Error deduplicating quotes: {e}")
+            return 1
+        print(f"Kept {len(kept)} of {len(quotes)} quotes ({len(merged)} groups merged) "
+              f"in {time.perf_counter() - start:.1f} s; wrote {output} and {report}")
+        return 0
+
+    if args.shared_corpus is not None or args.publish_shared:
+        import config
+        import normalize
+        import shared
+
+        directory = args.shared_corpus or shared.SHARED_DIR
+        if args.publish_shared:
+            try:
+                version, count = shared.publish(
+                    args.publish_shared, directory,
+                    normalize.load_rules(config.NORMALIZE_RULES_FILE),
                 )
-            button.set_label("⏸")
-            button.set_tooltip_text("Pause auto-rotation")
-    
-    def reset_quote_timer(self):
-        if self.quote_timer_id:
-            GLib.source_remove(self.quote_timer_id)
-            self.quote_timer_id = None
-        if self.is_visible and not self.is_paused:
-            self.start_quote_timer()
-    
-    def on_copy_clicked(self, button):
-        """Copy current quote to clipboard using wl-copy or GTK fallback."""
-        if not self.current_quote:
-            return
-        
-        full_text = f'"{self.current_quote}"\n\n— {self.current_author}'
-        success = copy_to_clipboard(full_text)
-        
-        original_label = button.get_label()
-        button.set_label("✓" if success else "✗")
-        GLib.timeout_add(1000 if success else 2000,
-                         self.reset_button_label, button, original_label)
-    
-    def reset_button_label(self, button, label):
-        button.set_label(label)
-        return False
-    
-    def start_quote_timer(self):
-        if self.quote_timer_id:
-            GLib.source_remove(self.quote_timer_id)
-        if not self.is_paused and self.all_quotes:
-            self.quote_timer_id = GLib.timeout_add_seconds(
-                self.display_duration, self.on_quote_timer
-            )
-    
-    def on_quote_timer(self):
-        if self.is_visible and not self.is_paused and self.all_quotes:
-            self.show_next_quote()
-            self.start_quote_timer()
-        return False
-    
-    def on_quote_timer_ms(self):
-        if self.is_visible and not self.is_paused and self.all_quotes:
-            self.show_next_quote()
-            self.start_quote_timer()
-        return False
-    
-    def get_active_workspace(self):
-        try:
-            result = subprocess.run(
-                ["hyprctl", "activeworkspace", "-j"],
-                capture_output=True, text=True, timeout=1
-            )
-            if result.returncode == 0:
-                return json.loads(result.stdout)["id"]
-        except Exception as e:
-            print(f"Error getting active workspace: {e}")
-        return 1
-    
-    def move_to_special_workspace(self):
-        if not self.window_address:
-            return
-        try:
-            subprocess.run(
-                ["hyprctl", "dispatch", "movetoworkspacesilent",
-                 f"{SPECIAL_WORKSPACE},address:{self.window_address}"],
-                capture_output=True, text=True, timeout=1
-            )
-            subprocess.run(
-                ["hyprctl", "dispatch", "pin", f"address:{self.window_address}"],
-                capture_output=True, text=True, timeout=1
-            )
-        except Exception as e:
-            print(f"Error moving window to special workspace: {e}")
-    
-    def get_windows_on_current_workspace(self):
+            except (OSError, ValueError) as e:
+                print(f"Error publishing quotes: {e}")
+                return 1
+            print(f"Published {count} quotes to {directory} as version {version}")
+            return 0
+        config.use_shared_corpus(directory)
+
+    if args.compile:
+        import config
+        import corpus
+        import normalize
+
+        if len(args.compile) > 2:
+            parser.error("--compile takes a JSON file and an optional output path")
         try:
-            result = subprocess.run(
-                ["hyprctl", "clients", "-j"],
-                capture_output=True, text=True, timeout=1
+            output, count = corpus.compile_file(
+                *args.compile, rules=normalize.load_rules(config.NORMALIZE_RULES_FILE)
             )
-            if result.returncode == 0:
-                clients = json.loads(result.stdout)
-                current_workspace = self.get_active_workspace()
-                windows = []
-                for client in clients:
-                    if not (client["workspace"]["id"] == current_workspace and client["mapped"]):
-                        continue
-                    if client.get("class") == "Quote Display" or "Quote Display" in client.get("title", ""):
-                        continue
-                    windows.append(client)
-                return len(windows) > 0
-        except Exception as e:
-            print(f"Error getting windows: {e}")
-        return True
-
-    def workspace_monitor_thread(self):
-        last_workspace = None
-        last_window_state = None
-        while self.window_check_active:
-            current_workspace = self.get_active_workspace()
-            windows_exist = self.get_windows_on_current_workspace()
-            if current_workspace != last_workspace or windows_exist != last_window_state:
-                GLib.idle_add(self.update_visibility, not windows_exist)
-                last_workspace = current_workspace
-                last_window_state = windows_exist
-            time.sleep(0.5)
-    
-    def start_workspace_monitor(self):
-        self.monitor_thread = threading.Thread(
-            target=self.workspace_monitor_thread, daemon=True
-        )
-        self.monitor_thread.start()
-    
-    def update_visibility(self, should_show):
-        if should_show and not self.is_visible:
-            if self.show_random_quote():
-                self.show_all()
-                self.is_visible = True
-                if self.window_address:
-                    try:
-                        current_workspace = self.get_active_workspace()
-                        subprocess.run(
-                            ["hyprctl", "dispatch", "movetoworkspacesilent",
-                             f"{current_workspace},address:{self.window_address}"],
-                            capture_output=True, text=True, timeout=1
-                        )
-                        subprocess.run(
-                            ["hyprctl", "dispatch", "pin", f"address:{self.window_address}"],
-                            capture_output=True, text=True, timeout=1
-                        )
-                    except Exception as e:
-                        print(f"Error moving window: {e}")
-                self.start_quote_timer()
-                
-        elif not should_show and self.is_visible:
-            if self.quote_timer_id:
-                GLib.source_remove(self.quote_timer_id)
-                self.quote_timer_id = None
-            if self.window_address:
-                try:
-                    subprocess.run(
-                        ["hyprctl", "dispatch", "movetoworkspacesilent",
-                         f"{SPECIAL_WORKSPACE},address:{self.window_address}"],
-                        capture_output=True, text=True, timeout=1
-                    )
-                except Exception as e:
-                    print(f"Error hiding window: {e}")
-            self.hide()
-            self.is_visible = False
-    
-    def cleanup(self):
-        self.window_check_active = False
-        if self.quote_timer_id:
-            GLib.source_remove(self.quote_timer_id)
-            self.quote_timer_id = None
+        except (OSError, ValueError) as e:
+            print(f"Error compiling quotes: {e}")
+            return 1
+        print(f"Compiled {count} quotes to {output}")
+        return 0
+
+    if args.search:
+        import config
+
+        path, quotes = config.load_quotes()
+        start = time.perf_counter()
+        index = config.open_search_index(path, quotes)
+        opened = time.perf_counter()
+        matches = index.search(args.search)
+        searched = time.perf_counter()
+        for i in matches[:20]:
+            print(f'{i:>7}  "{quotes[i]["quote"]}" — {quotes[i]["author"]}')
+        if len(matches) > 20:
+            print(f"... and {len(matches) - 20} more")
+        print(f"{len(matches)} matches in {(searched - opened) * 1000:.3f} ms "
+              f"(index ready in {(opened - start) * 1000:.1f} ms)")
+        return 0
+
+    if args.replay:
+        import tracer
+
         try:
-            if os.path.exists(ADDR_FILE):
-                os.remove(ADDR_FILE)
-        except:
-            pass
+            mismatches = tracer.replay(args.replay, speed=args.replay_speed)
+        except (OSError, ValueError, EOFError) as e:
+            print(f"Error replaying {args.replay}: {e}")
+            return 1
+        return 1 if mismatches else 0
 
+    if args.ipc_latency:
+        measure_ipc_latency(args.ipc_latency)
+        return 0
 
-if __name__ == "__main__":
-    if not WL_COPY_AVAILABLE:
-        print("Warning: wl-copy not found — clipboard will use GTK fallback.")
-        print("         Install wl-clipboard for persistent clipboard support:")
-        print("         sudo pacman -S wl-clipboard")
-
-    if not os.path.exists(QUOTES_FILE):
-        print(f"Quotes file not found at {QUOTES_FILE}")
-        print("Creating sample quotes file...")
-        sample_quotes = [
-            {"author": "Jason Gorman", "quote": "Refuctoring - the process of taking a well-designed piece of code and, through a series of small, reversible changes, making it completely unmaintainable by anyone except yourself."},
-            {"author": "E. W. Dijkstra", "quote": "If debugging is the process of removing software bugs, then programming must be the process of putting them in."},
-            {"author": "Alan Kay", "quote": "The best way to predict the future is to invent it."},
-            {"author": "Linus Torvalds", "quote": "Talk is cheap. Show me the code."}
-        ]
-        os.makedirs(os.path.dirname(QUOTES_FILE), exist_ok=True)
-        with open(QUOTES_FILE, 'w') as f:
-            json.dump(sample_quotes, f, indent=2)
-
-    win = QuoteOverlay()
-
-    def on_destroy(window):
-        window.cleanup()
-        Gtk.main_quit()
-
-    win.connect("destroy", on_destroy)
-
-    import signal
-    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if args.stream is not None:
+        import stream
+
+        return stream.run(quote_filter=args.filter, monitor=args.stream or None)
+
+    # Take the lock before loading GTK so a second start fails fast
+    try:
+        lock = control.InstanceLock().acquire()
+    except control.AlreadyRunning as e:
+        print(f"{e}. Use `hyprquotes next|prev|pause|reload|status` to control it.")
+        return 1
+    except OSError as e:
+        print(f"Could not take the instance lock, starting anyway: {e}")
+        lock = None
+
+    profile = None
+    if args.profile_startup:
+        from metrics import StartupProfile
+        profile = StartupProfile(STARTED)
+
+    if args.metrics is not None:
+        import metrics
+        metrics.enable()
+
+    if args.trace is not None:
+        import tracer
+        tracer.enable(args.trace or tracer.TRACE_CAPACITY)
 
+    import overlay
+
+    if profile:
+        profile.mark("imports")
     try:
-        print(f"hyprquotes started. Quotes loaded from: {QUOTES_FILE}")
-        Gtk.main()
-    except KeyboardInterrupt:
-        print("\nShutting down...")
-        win.cleanup()
-        Gtk.main_quit()
+        overlay.run(quote_filter=args.filter, profile=profile,
+                    metrics_file=args.metrics or None, render=args.render)
+    finally:
+        if lock:
+            lock.release()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,224 @@
+"""
+Lightweight latency bookkeeping.
+
+Histograms use fixed, log-spaced buckets so observe() is a short linear
+scan plus two integer increments, safe to call from any thread.
+
+MetricsRegistry collects counters and histograms under Prometheus names
+and renders them in the text exposition format (--metrics, `hyprquotes
+metrics`). It is disabled unless enable() is called before the instruments
+are created; every instrument is then the shared no-op DISABLED, so
+instrumented code costs one empty method call.
+
+StartupProfile splits the time to the first quote into phases for
+--profile-startup and bench/startup_bench.py.
+"""
+import os
+import threading
+import time
+
+# Upper bucket bounds in seconds (100 µs … 1 s); anything slower lands in +Inf
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+# For things measured in tens of milliseconds to seconds (corpus loads,
+# event-to-visible window transitions)
+SLOW_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = 0
+        for bound in self.buckets:
+            if seconds <= bound:
+                break
+            index += 1
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+
+    def snapshot(self):
+        """(per-bucket counts incl. +Inf, count, sum) read atomically."""
+        with self._lock:
+            return list(self.counts), self.count, self.total
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the *fraction* quantile."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        target = fraction * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            seen += bucket_count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def summary(self):
+        if not self.count:
+            return "no samples"
+        mean = self.total / self.count * 1000
+        p50 = self.percentile(0.5) * 1000
+        p99 = self.percentile(0.99) * 1000
+        return f"n={self.count} mean={mean:.3f}ms p50<={p50:g}ms p99<={p99:g}ms"
+
+    def format_buckets(self):
+        lines = []
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), self.counts):
+            label = "+Inf" if bound == float("inf") else f"{bound * 1000:g}ms"
+            lines.append(f"  <= {label:>8}  {bucket_count}")
+        return "\n".join(lines)
+
+
+class StartupProfile:
+    """
+    Consecutive startup phases, each ending at its mark().
+
+    Only the first mark of each phase counts, so call sites on paths that
+    run repeatedly (resyncs, later maps) need no bookkeeping of their own.
+    Phases marked counted=False (waiting for an empty workspace) are shown
+    but left out of the time to first quote.
+    """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.phases = []
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def mark(self, phase, counted=True):
+        with self._lock:
+            if phase in self._seen:
+                return False
+            now = time.perf_counter()
+            self._seen.add(phase)
+            self.phases.append((phase, now - self.last, counted))
+            self.last = now
+            return True
+
+    def __contains__(self, phase):
+        return phase in self._seen
+
+    def time_to_first_quote(self):
+        return sum(seconds for _, seconds, counted in self.phases if counted)
+
+    def format(self):
+        lines = ["Startup profile:"]
+        for phase, seconds, counted in self.phases:
+            note = "" if counted else "  (not counted)"
+            lines.append(f"  {phase:<28} {seconds * 1000:9.1f} ms{note}")
+        lines.append(f"  {'time to first quote':<28} {self.time_to_first_quote() * 1000:9.1f} ms")
+        return "\n".join(lines)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _Disabled:
+    """Every instrument while metrics are off."""
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, seconds):
+        pass
+
+
+DISABLED = _Disabled()
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._families = {}  # name -> [type, help, {label pairs: instrument}]
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help, labels, create):
+        if not self.enabled:
+            return DISABLED
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, [kind, help, {}])
+            instrument = family[2].get(key)
+            if instrument is None:
+                instrument = family[2][key] = create()
+            return instrument
+
+    def counter(self, name, help, **labels):
+        return self._get("counter", name, help, labels, Counter)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, **labels):
+        return self._get("histogram", name, help, labels,
+                         lambda: LatencyHistogram(buckets))
+
+    def register(self, name, help, histogram, **labels):
+        """Export an existing LatencyHistogram (e.g. HyprctlClient.latency)."""
+        self._get("histogram", name, help, labels, lambda: histogram)
+
+    def register_counter(self, name, help, counter, **labels):
+        """Export an existing Counter that is kept whether or not metrics are on."""
+        self._get("counter", name, help, labels, lambda: counter)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            families = sorted((name, kind, help, dict(instruments))
+                              for name, (kind, help, instruments) in self._families.items())
+        lines = []
+        for name, kind, help, instruments in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, instrument in sorted(instruments.items()):
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {instrument.value}")
+                    continue
+                counts, count, total = instrument.snapshot()
+                cumulative = 0
+                for bound, bucket_count in zip(instrument.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{_format_labels(labels, le=le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write render() to *path* atomically (node_exporter textfile style)."""
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = MetricsRegistry()
+
+
+def enable():
+    """Turn metrics on; only instruments created afterwards record anything."""
+    REGISTRY.enabled = True
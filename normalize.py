@@ -0,0 +1,127 @@
+"""
+One-time text cleanup for quote corpora.
+
+Imported collections carry HTML (<em>, <a>, <code>…), entities and
+citation-heavy attributions such as "Clay Shirky [<code>http://…</code>]".
+normalize_quotes() cleans all of that once, when a corpus is loaded,
+compiled or cached, so the overlay can hand the text straight to GTK.
+
+Author shortening is driven by rules, overridable from
+~/.config/hyprquotes/normalize.json:
+
+  max_length     authors longer than this are shortened (0 disables)
+  drop_brackets  remove "[…]" and "(…)" remarks such as source URLs
+  separators     cut the author at the first of these that makes it fit
+"""
+import html
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_RULES = {
+    "max_length": 40,
+    "drop_brackets": True,
+    "separators": [" — ", " - ", ", ", " in ", " on ", " as ", " from "],
+}
+
+# Corpora at least this large are normalized across a process pool
+PARALLEL_THRESHOLD = 20000
+CHUNK_SIZE = 5000
+
+# Only the HTML elements imported collections actually use, so "a < b and
+# c > d", "#include <iostream>" and "List<String>" survive
+HTML_ELEMENTS = ("em", "a", "code", "i", "b", "br", "p", "span")
+_TAG = re.compile(r"</?(?:%s)(?:\s[^<>]*)?/?>" % "|".join(HTML_ELEMENTS), re.IGNORECASE)
+_BRACKETS = re.compile(r"\s*(?:\[[^\]]*\]|\([^)]*\))")
+
+
+def load_rules(path):
+    """DEFAULT_RULES updated with the JSON object at *path*, if any."""
+    rules = dict(DEFAULT_RULES)
+    try:
+        with open(path, "r") as f:
+            rules.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Ignoring invalid normalization rules in {path}: {e}")
+    return rules
+
+
+def clean_text(text):
+    """
+    Strip tags, decode entities and collapse whitespace.
+
+    >>> clean_text("Use <em>#include &lt;iostream&gt;</em>,<br/> not <code>printf</code>")
+    'Use #include <iostream> , not printf'
+    >>> clean_text("Use #include <iostream> and <vector>, or a List<String>")
+    'Use #include <iostream> and <vector>, or a List<String>'
+    """
+    text = _TAG.sub(" ", text)
+    text = html.unescape(text)
+    return " ".join(text.split())
+
+
+def trim_author(author, rules=DEFAULT_RULES):
+    """
+    Clean an attribution and cut it down to the rules' max_length.
+
+    Cuts at the first separator that leaves a short enough head, otherwise
+    on a word boundary. A cut that would split a title ("Oath of Fealty")
+    goes before the title instead, and then drops it whole:
+
+    >>> trim_author("Larry Niven and Jerry Pournelle Oath of Fealty")
+    'Larry Niven and Jerry Pournelle'
+    >>> trim_author("Anonymous contributor to a mailing list discussion thread")
+    'Anonymous contributor to a mailing…'
+    """
+    author = clean_text(author)
+    if rules.get("drop_brackets"):
+        author = clean_text(_BRACKETS.sub("", author))
+    limit = rules.get("max_length") or 0
+    if not limit or len(author) <= limit:
+        return author
+    for separator in rules.get("separators", ()):
+        head = author.split(separator, 1)[0].strip()
+        if head and len(head) <= limit:
+            return head.rstrip(".")
+    # Nothing to cut at: truncate on a word boundary
+    head = author[:limit - 1].rsplit(" ", 1)[0]
+    words, rest = head.split(" "), author[len(head):].split()
+    title = False
+    # A capitalized word followed by a lowercase one ("Oath of") starts a title
+    while len(words) > 1 and rest and rest[0][:1].islower() and words[-1][:1].isupper():
+        rest.insert(0, words.pop())
+        title = True
+    head = " ".join(words).rstrip(" ,;:-—")
+    return head if title else head + "…"
+
+
+def normalize_entry(entry, rules=DEFAULT_RULES):
+    cleaned = dict(entry)
+    cleaned["quote"] = clean_text(entry["quote"])
+    cleaned["author"] = trim_author(entry["author"], rules)
+    return cleaned
+
+
+def _normalize_chunk(entries, rules):
+    return [normalize_entry(entry, rules) for entry in entries]
+
+
+def normalize_quotes(quotes, rules=DEFAULT_RULES, workers=None):
+    """
+    Return a normalized copy of *quotes*.
+
+    Large corpora are split into chunks and cleaned in a process pool
+    (*workers* processes, default one per CPU); small ones are not worth
+    the pool start-up cost.
+    """
+    if len(quotes) < PARALLEL_THRESHOLD or workers == 1:
+        return _normalize_chunk(quotes, rules)
+    chunks = [quotes[i:i + CHUNK_SIZE] for i in range(0, len(quotes), CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        cleaned = []
+        for chunk in pool.map(_normalize_chunk, chunks, [rules] * len(chunks)):
+            cleaned.extend(chunk)
+    return cleaned
@@ -0,0 +1,1338 @@
+"""
+The GTK overlay windows. Imported by hyprquotes.py only when the overlay
+itself is started, so command-line tools never load GTK.
+
+There is one QuoteOverlay window per monitor, following that monitor's
+active workspace. Everything that doesn't depend on the monitor lives
+once in OverlayApp: the corpus, the rotation scheduler, the compositor
+tracker (compositor.py, shared with --stream), the clipboard worker and
+the metrics. Adding a
+monitor costs a window and its widgets, not another copy of the quotes
+or another event connection. Windows are created the first time their
+monitor shows an empty workspace and closed when the monitor goes away.
+"""
+import gi
+gi.require_version('Gtk', '3.0')
+gi.require_version('Gdk', '3.0')
+gi.require_version('Pango', '1.0')
+from gi.repository import Gtk, Gdk, GLib, Gio, Pango
+import json
+import os
+import time
+import threading
+from collections import OrderedDict
+import cairo
+
+import config
+import control
+import corpus
+import hypripc
+import metrics
+import shared
+import tracer
+from clipboard import WL_COPY_AVAILABLE, ClipboardWriter
+from compositor import CompositorTracker
+from config import (QUOTES_DIR, QUOTES_FILE, SPECIAL_WORKSPACE, TRACE_FILE,
+                    filter_members, load_quotes, scheduler_state_path)
+from rotation import RotationTimer, display_duration
+from scheduler import History, ShuffleScheduler
+from transitions import TransitionWorker
+from workspaces import OVERLAY_TITLE_PATTERN, overlay_title
+
+# Wait this long after the last change to the quotes file before reloading
+RELOAD_DEBOUNCE_MS = 300
+
+# Quotes wrap at roughly this many average-width characters
+WRAP_CHARS = 70
+# How many upcoming quotes to measure ahead of time while idle
+PREMEASURE_AHEAD = 3
+# Length of the crossfade between two quote cards (--render card)
+CROSSFADE_MS = 250
+# Longest a new window may take to show up in `clients -j` (seconds)
+HANDSHAKE_TIMEOUT = 1.0
+# Longest a control command may wait for the GTK main loop (seconds)
+CONTROL_TIMEOUT = 1.5
+# How often --metrics FILE is rewritten (seconds)
+METRICS_INTERVAL = 15
+# Event after which rules added with `hyprctl keyword` are gone
+CONFIG_RELOADED = "configreloaded"
+
+
+def window_rules_marker():
+    """File recording that this Hyprland instance has our window rules, or None."""
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE")
+    if not signature:
+        return None
+    try:
+        return os.path.join(control.runtime_dir(), f"hyprquotes-rules-{signature}")
+    except OSError as e:
+        print(f"Not recording window rules: {e}")
+        return None
+
+
+# ── Clipboard helper ───────────────────────────────────────────────────────────
+def copy_with_gtk(text: str) -> bool:
+    """
+    Copy *text* with GTK's Gtk.Clipboard; main loop only.
+
+    Used when wl-copy is missing, fails or times out (see clipboard.py).
+    Works without wl-clipboard installed, but the content is lost once
+    hyprquotes exits.
+    """
+    try:
+        clipboard = Gtk.Clipboard.get(Gdk.SELECTION_CLIPBOARD)
+        clipboard.set_text(text, -1)
+        clipboard.store()          # persist across process lifetime
+        print("Clipboard set via GTK fallback (content lost on exit).")
+        return True
+    except Exception as e:
+        print(f"GTK clipboard fallback failed: {e}")
+        return False
+
+
+class QuoteLayoutCache:
+    """
+    Pango measurements of quote text as rendered by *label*.
+
+    measure() returns the text with line breaks inserted where Pango wraps
+    it, plus its pixel width and height. Results are cached per text and
+    thrown away whenever the label's font, the screen DPI or the scale
+    factor change, since they all move the wrap points.
+    """
+
+    def __init__(self, label, wrap_chars=None, capacity=512):
+        self.label = label
+        self.wrap_chars = wrap_chars
+        self.capacity = capacity
+        self._key = None
+        self._entries = OrderedDict()
+
+    def _current_key(self):
+        context = self.label.get_pango_context()
+        screen = self.label.get_screen()
+        return (context.get_font_description().to_string(),
+                screen.get_resolution() if screen else None,
+                self.label.get_scale_factor())
+
+    def __contains__(self, text):
+        return text in self._entries
+
+    def measure(self, text):
+        key = self._current_key()
+        if key != self._key:
+            self._key = key
+            self._entries.clear()
+        cached = self._entries.get(text)
+        if cached is not None:
+            self._entries.move_to_end(text)
+            return cached
+
+        layout = self.label.create_pango_layout(text)
+        if self.wrap_chars:
+            font_metrics = layout.get_context().get_metrics(
+                layout.get_context().get_font_description(), None
+            )
+            layout.set_width(font_metrics.get_approximate_char_width() * self.wrap_chars)
+            layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+        data = text.encode("utf-8")
+        lines = [
+            data[line.start_index:line.start_index + line.length].decode("utf-8").strip()
+            for line in layout.get_lines_readonly()
+        ]
+        width, height = layout.get_pixel_size()
+        cached = ("\n".join(lines), width, height)
+
+        self._entries[text] = cached
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        return cached
+
+
+class OverlayApp:
+    """State shared by the per-monitor windows; lives on the GTK main loop."""
+
+    def __init__(self, quote_filter=None, profile=None, render="widgets"):
+        self.profile = profile
+        self.render = render        # "widgets" (labels + CSS) or "card" (card.py)
+        self.styled = False
+        self.windows = {}           # monitor name -> QuoteOverlay
+        self.trace = tracer.TRACER  # no-op unless --trace
+
+        # State
+        self.is_paused = False
+        self.hyprctl = hypripc.HyprctlClient()
+        self.clipboard = ClipboardWriter(GLib.idle_add, self.on_copy_done,
+                                         fallback=copy_with_gtk)
+        self.copy_window = None     # where the last copy was requested
+        registry = metrics.REGISTRY
+        self.quotes_shown = registry.counter(
+            "hyprquotes_quotes_shown_total", "Quotes displayed")
+        self.visibility_latency = {
+            action: registry.histogram(
+                "hyprquotes_visibility_seconds",
+                "From the compositor event to the overlay shown/hidden",
+                buckets=metrics.SLOW_BUCKETS, action=action)
+            for action in ("show", "hide")
+        }
+        self.transition_results = {
+            (action, ok): registry.counter(
+                "hyprquotes_transitions_total", "Window transitions applied",
+                action=action, result="ok" if ok else "failed")
+            for action in ("show", "hide", "park") for ok in (True, False)
+        }
+        self.handshake_latency = registry.histogram(
+            "hyprquotes_handshake_seconds",
+            "From a window's first map to its client address being known",
+            buckets=metrics.SLOW_BUCKETS)
+        self.compositor = CompositorTracker(
+            self.on_workspace_update, on_sync=lambda: self.mark_startup("workspace sync"),
+            on_other_event=self.on_other_event, other_events={CONFIG_RELOADED},
+            hyprctl=self.hyprctl,
+        )
+        self.workspace_index = self.compositor.workspace_index
+        self.monitor_index = self.compositor.monitor_index
+        registry.register_counter(
+            "hyprquotes_compositor_events_total", "Workspace events received",
+            self.compositor.events_seen)
+        # What wakes the process up; all three stay at zero while hidden
+        # on a busy workspace (or paused) and the compositor is quiet
+        self.wakeups = dict(self.compositor.wakeups, rotation=metrics.Counter())
+        for source, counter in self.wakeups.items():
+            registry.register_counter(
+                "hyprquotes_wakeups_total", "Event reads, polls and rotation timer callbacks",
+                counter, source=source)
+
+        # Quote management
+        self.all_quotes = []
+        self.quotes_path = None
+        self.quote_filter = quote_filter
+
+        self.load_all_quotes()
+        self.members = self.filter_members(self.quotes_path, self.all_quotes)
+        self.scheduler = ShuffleScheduler.load(
+            scheduler_state_path(quote_filter), corpus.corpus_sources(self.all_quotes),
+            members=self.members,
+        )
+        self.mark_startup("corpus load")
+        self.install_window_rules()
+        self.mark_startup("window rules")
+        self.reload_timer_id = None
+        self.reload_generation = 0
+        self.watch_quotes_file()
+        self.compositor.start()
+
+    def mark_startup(self, phase, counted=True):
+        if self.profile is not None and self.profile.mark(phase, counted):
+            if phase == "address handshake":
+                print(self.profile.format())
+
+    def install_window_rules(self, force=False):
+        """
+        Have Hyprland map overlay windows straight into the scratchpad,
+        floating and without focus.
+
+        A new window therefore never appears on a real workspace, even for
+        a frame: it only shows once its client address is known and the
+        first "show" transition moves it to its monitor's workspace. The
+        rules match every overlay title; each window's own title is unique
+        (see workspaces.overlay_title) so it can find itself afterwards.
+
+        Rules added with `keyword` last until Hyprland reloads its config,
+        and adding them again adds duplicates. So they are installed once per
+        Hyprland instance, recorded by a marker file named after the
+        instance signature, and with *force* again after a config reload
+        (see on_other_event) or when a window turns up outside the
+        scratchpad (see find_window_address).
+        """
+        marker = window_rules_marker()
+        if not force and marker and os.path.exists(marker):
+            return
+        rule = f"title:{OVERLAY_TITLE_PATTERN}"
+        try:
+            self.hyprctl.keyword(
+                f"windowrulev2 float,{rule}",
+                f"windowrulev2 noinitialfocus,{rule}",
+                f"windowrulev2 workspace {SPECIAL_WORKSPACE} silent,{rule}",
+            )
+        except Exception as e:
+            print(f"Error installing window rules, new overlays may flash on screen: {e}")
+            return
+        if marker:
+            try:
+                with open(marker, "w"):
+                    pass
+            except OSError as e:
+                print(f"Could not record window rules in {marker}: {e}")
+
+    def apply_styling(self):
+        """Install the CSS once for the screen; every window shares it."""
+        if self.styled:
+            return
+        self.styled = True
+        css = """
+        #quote-label {
+            font-family: 'Sans';
+            font-size: 24px;
+            font-weight: normal;
+            font-style: italic;
+            color: rgba(255, 255, 255, 0.85);
+            padding: 15px;
+            background-color: rgba(0, 0, 0, 0.5);
+            border-radius: 10px;
+            margin: 10px;
+            text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.5);
+        }
+        #author-label {
+            font-family: 'Sans';
+            font-size: 20px;
+            font-weight: bold;
+            color: rgba(255, 255, 255, 0.9);
+            padding: 8px 12px;
+            background-color: rgba(40, 40, 60, 0.7);
+            border-radius: 6px;
+            margin-top: 10px;
+            text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.5);
+        }
+        #prev-button, #pause-button, #next-button, #copy-button {
+            font-family: 'Sans';
+            font-size: 24px;
+            font-weight: bold;
+            color: rgba(255, 255, 255, 0.95);
+            border: 2px solid rgba(255, 255, 255, 0.4);
+            border-radius: 50%;
+            padding: 8px;
+            box-shadow: 0px 3px 10px rgba(0, 0, 0, 0.5);
+            transition: all 0.2s ease;
+        }
+        #prev-button, #next-button {
+            background-color: rgba(33, 150, 243, 0.85);
+        }
+        #pause-button {
+            background-color: rgba(255, 193, 7, 0.85);
+        }
+        #copy-button {
+            background-color: rgba(76, 175, 80, 0.85);
+        }
+        #prev-button:hover, #pause-button:hover, #next-button:hover, #copy-button:hover {
+            border-color: rgba(255, 255, 255, 0.6);
+            box-shadow: 0px 4px 12px rgba(0, 0, 0, 0.6);
+            transform: scale(1.08);
+        }
+        #prev-button:active, #pause-button:active, #next-button:active, #copy-button:active {
+            transform: scale(0.95);
+        }
+        #prev-button:disabled, #next-button:disabled,
+        #copy-button:disabled {
+            background-color: rgba(100, 100, 100, 0.4);
+            color: rgba(255, 255, 255, 0.4);
+            border-color: rgba(255, 255, 255, 0.2);
+        }
+        window {
+            background-color: transparent;
+        }
+        """
+        css_provider = Gtk.CssProvider()
+        try:
+            css_provider.load_from_data(css.encode())
+        except Exception as e:
+            print(f"CSS loading error: {e}")
+            return
+        screen = Gdk.Screen.get_default()
+        style_context = Gtk.StyleContext()
+        style_context.add_provider_for_screen(
+            screen, css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+        )
+
+    # ── Quotes ───────────────────────────────────────────────────────────────
+    def load_all_quotes(self):
+        # A compiled corpus is mmap'd and decoded lazily, one quote at a time
+        try:
+            path, self.all_quotes = load_quotes()
+            self.quotes_path = path
+            if self.all_quotes:
+                print(f"Loaded {len(self.all_quotes)} quotes from {path}")
+            else:
+                print("No quotes found in file, using defaults")
+                self._use_default_quotes()
+        except Exception as e:
+            print(f"Error loading quotes: {e}")
+            self._use_default_quotes()
+
+    def filter_members(self, path, quotes):
+        """Indices matching --filter, or None to rotate through everything."""
+        return filter_members(self.quote_filter, path, quotes)
+
+    def watch_quotes_file(self):
+        """
+        Reload the corpus when the quotes file (or its compiled .hqc),
+        anything in quotes.d/ or the published shared corpus changes.
+
+        Directories are watched rather than files so editors that save by
+        writing a temp file and renaming it over the original are seen.
+        """
+        self.watched_names = {
+            os.path.basename(QUOTES_FILE),
+            os.path.basename(corpus.compiled_path_for(QUOTES_FILE)),
+        }
+        directories = [os.path.dirname(QUOTES_FILE), QUOTES_DIR]
+        if config.SHARED_CORPUS:
+            # A publish renames a new symlink over `current`
+            self.watched_names.add(shared.CURRENT)
+            directories.append(config.SHARED_CORPUS)
+        self.quotes_monitors = []
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            try:
+                monitor = Gio.File.new_for_path(directory).monitor_directory(
+                    Gio.FileMonitorFlags.WATCH_MOVES, None
+                )
+            except GLib.Error as e:
+                print(f"Not watching {directory} for changes: {e.message}")
+                continue
+            monitor.connect("changed", self.on_quotes_dir_changed)
+            self.quotes_monitors.append(monitor)
+
+    def _is_quotes_source(self, file):
+        if file.get_parent() and file.get_parent().get_path() == QUOTES_DIR:
+            return file.get_basename().endswith(corpus.SOURCE_SUFFIXES)
+        return file.get_basename() in self.watched_names
+
+    def on_quotes_dir_changed(self, monitor, file, other_file, event_type):
+        if event_type in (Gio.FileMonitorEvent.ATTRIBUTE_CHANGED,
+                          Gio.FileMonitorEvent.PRE_UNMOUNT,
+                          Gio.FileMonitorEvent.UNMOUNTED):
+            return
+        if not any(self._is_quotes_source(f) for f in (file, other_file) if f is not None):
+            return
+        # Debounce: editors typically emit several events per save
+        if self.reload_timer_id:
+            GLib.source_remove(self.reload_timer_id)
+        self.reload_timer_id = GLib.timeout_add(RELOAD_DEBOUNCE_MS, self.reload_quotes)
+
+    def reload_quotes(self):
+        """Parse the quotes file on a worker thread, then swap it in."""
+        self.reload_timer_id = None
+        self.reload_generation += 1
+        threading.Thread(
+            target=self._parse_quotes_for_reload,
+            args=(self.reload_generation, self.all_quotes), daemon=True,
+        ).start()
+        return False
+
+    def _parse_quotes_for_reload(self, generation, old_quotes):
+        try:
+            path, quotes = load_quotes()
+        except Exception as e:
+            # Usually a half-written file; the next change event retries
+            print(f"Error reloading quotes, keeping the previous set: {e}")
+            return
+        if not quotes:
+            print("Reloaded quotes file is empty, keeping the previous set")
+            return
+        remap = corpus.diff_quotes(old_quotes, quotes)
+        GLib.idle_add(self._apply_reloaded_quotes, generation, path, quotes,
+                      remap, self.filter_members(path, quotes))
+
+    def _apply_reloaded_quotes(self, generation, path, quotes, remap, members):
+        """
+        Swap in a reloaded corpus, keeping what did not change: every
+        window stays on its quote and the rotation carries on with the
+        same round (see ShuffleScheduler.update).
+        """
+        if generation != self.reload_generation:
+            return False  # a newer reload is already on its way
+        removed = remap.count(-1)
+        added = len(quotes) - (len(remap) - removed)
+        sources = corpus.corpus_sources(quotes)
+        self.quotes_path = path
+        if (not added and not removed and all(remap[i] == i for i in range(len(remap)))
+                and sources == self.scheduler.sources and members == self.members):
+            print(f"Reloaded {path}: no quotes changed")
+            return False
+        self.all_quotes = quotes
+        self.members = members
+        for window in self.windows.values():
+            index = window.current_quote_index
+            new_index = remap[index] if 0 <= index < len(remap) else -1
+            if new_index < 0:
+                # The displayed quote was removed or edited: keep showing it and
+                # continue rotation from roughly the same position
+                new_index = min(index, len(quotes) - 1)
+            window.current_quote_index = new_index
+        self.scheduler.update(sources, remap, members)
+        for window in self.windows.values():
+            if window.history is not self.scheduler.history:
+                window.history.remap(remap)
+        for window in self.windows.values():
+            window.update_buttons()
+        print(f"Reloaded {len(quotes)} quotes from {path} ({added} new, {removed} removed)")
+        return False
+
+    def _use_default_quotes(self):
+        self.all_quotes = [
+            {"author": "System", "quote": "Add quotes to your JSON file"},
+            {"author": "Unknown", "quote": "The only way to learn a new programming language is by writing programs in it."}
+        ]
+
+    def set_paused(self, paused):
+        """Pause or resume rotation on every monitor."""
+        if paused == self.is_paused:
+            return
+        self.is_paused = paused
+        self.trace.record(tracer.PAUSE, paused)
+        for window in self.windows.values():
+            window.apply_pause(paused)
+
+    def save_rotation_state(self):
+        try:
+            self.scheduler.save(scheduler_state_path(self.quote_filter))
+        except OSError as e:
+            print(f"Error saving rotation state: {e}")
+
+    # ── Clipboard ────────────────────────────────────────────────────────────
+    def copy(self, window, text):
+        # Returns at once; on_copy_done() shows the result
+        self.copy_window = window
+        self.clipboard.submit(text)
+
+    def on_copy_done(self, job, success, method):
+        window = self.copy_window
+        if window is not None and self.windows.get(window.monitor) is window:
+            window.show_copy_result(success)
+
+    # ── Windows ──────────────────────────────────────────────────────────────
+    def window_for(self, monitor):
+        """The overlay on *monitor*, created on first use; None if unknown."""
+        window = self.windows.get(monitor)
+        if window is None and monitor in self.monitor_index:
+            window = self.windows[monitor] = QuoteOverlay(self, monitor)
+        return window
+
+    def focused_window(self):
+        return self.window_for(self.monitor_index.focused)
+
+    def remove_window(self, monitor):
+        """Main loop: the monitor was unplugged; close its overlay."""
+        window = self.windows.pop(monitor, None)
+        if window is not None:
+            print(f"Monitor {monitor} removed, closing its overlay")
+            window.close_overlay()
+        return False
+
+    def update_visibility(self, monitor, should_show, since=None):
+        """Main loop: show or hide the overlay on *monitor*."""
+        window = self.window_for(monitor) if should_show else self.windows.get(monitor)
+        if window is not None:
+            window.update_visibility(should_show, since)
+        return False
+
+    # ── Compositor state ─────────────────────────────────────────────────────
+    def on_workspace_update(self, changed, removed, since):
+        """
+        Tracker thread: post a visibility change for every monitor whose
+        workspace or its occupancy changed, and close the overlays of
+        monitors that are gone. Monitors that never synced stay hidden.
+        """
+        for monitor, should_show in changed.items():
+            GLib.idle_add(self.update_visibility, monitor, should_show, since)
+        for monitor in removed:
+            GLib.idle_add(self.remove_window, monitor)
+
+    def on_other_event(self, name, data):
+        if name == CONFIG_RELOADED:
+            # A config reload drops every rule added with `keyword`
+            self.install_window_rules(force=True)
+
+    def dump_debug_state(self):
+        """SIGUSR1 handler: print the indexes (checked against hyprctl) and transition counters."""
+        for monitor, window in sorted(self.windows.items()):
+            print(f"Transitions on {monitor}: {window.transitions.format_stats()}")
+            if window.cards is not None:
+                print(f"Cards on {monitor}: {window.cards.format_stats()}")
+        print(f"Clipboard: {self.clipboard.format_stats()}")
+        print(self.monitor_index.dump())
+        print(self.workspace_index.dump())
+        try:
+            problems = self.workspace_index.diff(self.hyprctl.query("clients"))
+            print("\n".join(problems) if problems else "Index matches hyprctl clients.")
+        except Exception as e:
+            print(f"Error comparing workspace index: {e}")
+        return True
+
+    # ── Control socket ───────────────────────────────────────────────────────
+    def on_control_command(self, command, args):
+        """Control socket thread: run *command* on the main loop and wait for it."""
+        done = threading.Event()
+        reply = {}
+
+        def run():
+            try:
+                reply.update(self.handle_control(command, args))
+            except Exception as e:
+                reply.update(ok=False, error=str(e))
+            done.set()
+            return False
+
+        GLib.idle_add(run)
+        if not done.wait(CONTROL_TIMEOUT):
+            return {"ok": False, "error": "overlay did not respond in time"}
+        return reply
+
+    def handle_control(self, command, args):
+        """next/prev act on the focused monitor's overlay; the rest on all of them."""
+        self.trace.record(tracer.CONTROL, command)
+        if command in ("next", "prev"):
+            window = self.focused_window()
+            if window is None:
+                return {"ok": False, "error": "no monitor known yet"}
+            if command == "next" and not window.show_next_quote():
+                return {"ok": False, "error": "no quote to show"}
+            if command == "prev" and not window.show_prev_quote():
+                return {"ok": False, "error": "already at the oldest quote"}
+            window.reset_quote_timer()
+        elif command in ("pause", "resume", "toggle"):
+            self.set_paused(not self.is_paused if command == "toggle" else command == "pause")
+        elif command == "reload":
+            if self.reload_timer_id:
+                GLib.source_remove(self.reload_timer_id)
+            self.reload_quotes()
+        elif command == "metrics":
+            if not metrics.REGISTRY.enabled:
+                return {"ok": False, "error": "metrics are off (start hyprquotes with --metrics)"}
+            return {"ok": True, "text": metrics.REGISTRY.render()}
+        elif command == "status":
+            return self.status()
+        elif command == "trace":
+            count = self.trace.dump(TRACE_FILE)
+            return {"ok": True, "text": f"Wrote {count} trace records to {TRACE_FILE}\n"}
+        return {"ok": True}
+
+    def status(self):
+        """Top-level fields describe the focused monitor, "monitors" all of them."""
+        focused = self.monitor_index.focused
+        monitors = {}
+        for name, workspace in self.monitor_index.active_workspaces().items():
+            window = self.windows.get(name)
+            monitors[name] = {
+                "workspace": workspace,
+                "visible": bool(window and window.is_visible),
+                "index": window.current_quote_index if window else -1,
+                "quote": window.current_quote if window else "",
+                "author": window.current_author if window else "",
+            }
+        transitions = {}
+        for window in self.windows.values():
+            for key, value in window.transitions.stats.items():
+                transitions[key] = transitions.get(key, 0) + value
+        status = {
+            "ok": True,
+            "visible": any(w.is_visible for w in self.windows.values()),
+            "paused": self.is_paused,
+            "workspace": None,
+            "quotes": len(self.all_quotes),
+            "source": self.quotes_path,
+            "filter": self.quote_filter,
+            "index": -1,
+            "quote": "",
+            "author": "",
+            "transitions": transitions,
+            "wakeups": {source: counter.value for source, counter in self.wakeups.items()},
+            "monitor": focused,
+            "monitors": monitors,
+        }
+        if focused in monitors:
+            status.update((key, monitors[focused][key])
+                          for key in ("workspace", "index", "quote", "author"))
+        return status
+
+    def cleanup(self):
+        self.save_rotation_state()
+        self.compositor.stop()
+        self.clipboard.stop()
+        for monitor in self.quotes_monitors:
+            monitor.cancel()
+        for window in self.windows.values():
+            window.stop_timers()
+            window.transitions.stop()
+
+
+class QuoteOverlay(Gtk.Window):
+    """The overlay on one monitor; quotes, rotation and IPC come from *app*."""
+
+    def __init__(self, app, monitor):
+        # Unique per process and monitor: the handshake looks it up
+        self.title_token = overlay_title(os.getpid(), monitor)
+        super().__init__(title=self.title_token)
+
+        # Window properties for overlay
+        self.set_decorated(False)
+        self.set_keep_above(True)
+        self.set_skip_taskbar_hint(True)
+        self.set_skip_pager_hint(True)
+        self.set_type_hint(Gdk.WindowTypeHint.DOCK)
+        self.set_accept_focus(False)
+        self.set_resizable(False)
+
+        self.app = app
+        self.monitor = monitor
+        self.widgets_built = False
+        self.premeasure_id = None
+
+        # --render card: cached surfaces, and the card fading out if any
+        self.cards = None
+        self.card_area = None
+        self.card = None
+        self.previous_card = None
+        self.fade_start = 0
+        self.fade_id = None
+
+        # State
+        self.is_visible = False
+        self.rotation = RotationTimer(GLib.timeout_add_seconds, GLib.source_remove,
+                                      self.on_rotation_due, wakeups=app.wakeups["rotation"])
+        self.transitions = TransitionWorker(
+            self.perform_transition, GLib.idle_add, self.on_transition_done
+        )
+        self.copy_feedback_id = None
+        self.visibility_since = None
+        self.window_address = None
+        self.handshake_started = None
+
+        # Quote shown on this monitor
+        self.current_quote_index = -1
+        # Shared bag, own ◀ / ▶ history; the first window takes the saved one
+        self.history = app.scheduler.history if not app.windows else History()
+        self.current_quote = ""
+        self.current_author = ""
+
+        self.hide()
+        self.connect("map-event", self.on_window_mapped)
+        self.connect("unmap-event", self.on_window_unmapped)
+
+    def build_widgets(self):
+        """
+        Create the widget tree and styling.
+
+        Deferred until the overlay is first shown: a session that starts on
+        a busy workspace doesn't pay for it until there is something to show.
+        """
+        if self.widgets_built:
+            return
+        self.widgets_built = True
+        screen = self.get_screen()
+
+        # Make fully transparent
+        visual = screen.get_rgba_visual()
+        if visual:
+            self.set_visual(visual)
+
+        self.set_app_paintable(True)
+        self.connect("draw", self.on_draw)
+
+        # Set window size with more space for buttons
+        self.set_default_size(700, 250)
+
+        # Position in bottom-right corner
+        x, y, width, height = self.monitor_geometry()
+        self.move(x + width - 750, y + height - 300)
+
+        # Create main box that fills the window
+        self.main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+
+        # Create header box for buttons (fixed height)
+        self.header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
+        self.header_box.set_size_request(-1, 70)
+        self.header_box.set_margin_top(10)
+        self.header_box.set_margin_end(20)
+
+        self.header_spacer = Gtk.Box()
+        self.header_box.pack_start(self.header_spacer, True, True, 0)
+
+        self.button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+
+        # Previous quote button
+        self.prev_button = Gtk.Button()
+        self.prev_button.set_label("◀")
+        self.prev_button.set_name("prev-button")
+        self.prev_button.connect("clicked", self.on_prev_clicked)
+        self.prev_button.set_tooltip_text("Previous quote")
+        self.prev_button.set_sensitive(False)
+        self.prev_button.set_can_focus(False)
+        self.prev_button.set_halign(Gtk.Align.CENTER)
+        self.prev_button.set_valign(Gtk.Align.CENTER)
+
+        # Pause/Play button
+        self.pause_button = Gtk.Button()
+        self.pause_button.set_label("⏸")
+        self.pause_button.set_name("pause-button")
+        self.pause_button.connect("clicked", self.on_pause_clicked)
+        self.pause_button.set_tooltip_text("Pause/Resume auto-rotation")
+        self.pause_button.set_can_focus(False)
+        self.pause_button.set_halign(Gtk.Align.CENTER)
+        self.pause_button.set_valign(Gtk.Align.CENTER)
+
+        # Next quote button
+        self.next_button = Gtk.Button()
+        self.next_button.set_label("▶")
+        self.next_button.set_name("next-button")
+        self.next_button.connect("clicked", self.on_next_clicked)
+        self.next_button.set_tooltip_text("Next quote")
+        self.next_button.set_sensitive(False)
+        self.next_button.set_can_focus(False)
+        self.next_button.set_halign(Gtk.Align.CENTER)
+        self.next_button.set_valign(Gtk.Align.CENTER)
+
+        # Copy button — label reflects wl-copy availability
+        self.copy_button = Gtk.Button()
+        self.copy_button.set_label("📋")
+        self.copy_button.set_name("copy-button")
+        self.copy_button.connect("clicked", self.on_copy_clicked)
+        self.copy_button.set_sensitive(False)
+        _copy_tip = "Copy quote to clipboard"
+        if not WL_COPY_AVAILABLE:
+            _copy_tip += " (wl-copy missing — using GTK fallback, content lost on exit)"
+        self.copy_button.set_tooltip_text(_copy_tip)
+        self.copy_button.set_can_focus(False)
+        self.copy_button.set_halign(Gtk.Align.CENTER)
+        self.copy_button.set_valign(Gtk.Align.CENTER)
+
+        self.button_box.pack_start(self.prev_button, False, False, 0)
+        self.button_box.pack_start(self.pause_button, False, False, 0)
+        self.button_box.pack_start(self.next_button, False, False, 0)
+        self.button_box.pack_start(self.copy_button, False, False, 0)
+
+        self.header_box.pack_end(self.button_box, False, False, 0)
+
+        # Content box
+        self.content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        self.content_box.set_halign(Gtk.Align.CENTER)
+        self.content_box.set_valign(Gtk.Align.CENTER)
+        self.content_box.set_margin_start(40)
+        self.content_box.set_margin_end(40)
+        self.content_box.set_margin_top(20)
+        self.content_box.set_margin_bottom(20)
+
+        # Wrapping is done up front by QuoteLayoutCache, so the label never
+        # has to negotiate height-for-width with the window
+        self.quote_label = Gtk.Label()
+        self.quote_label.set_justify(Gtk.Justification.CENTER)
+        self.quote_label.set_selectable(False)
+        self.quote_label.set_name("quote-label")
+
+        self.author_label = Gtk.Label()
+        self.author_label.set_justify(Gtk.Justification.CENTER)
+        self.author_label.set_name("author-label")
+
+        self.content_box.pack_start(self.quote_label, True, True, 0)
+        self.content_box.pack_start(self.author_label, False, False, 0)
+
+        self.main_box.pack_start(self.header_box, False, False, 0)
+        if self.app.render == "card":
+            from card import CardRenderer
+
+            # The labels above are never packed: the card is painted here
+            self.cards = CardRenderer(wrap_chars=WRAP_CHARS)
+            self.card_area = Gtk.DrawingArea()
+            self.card_area.set_margin_start(40)
+            self.card_area.set_margin_end(40)
+            self.card_area.set_margin_top(20)
+            self.card_area.set_margin_bottom(20)
+            self.card_area.connect("draw", self.on_card_draw)
+            self.main_box.pack_start(self.card_area, True, True, 0)
+        else:
+            self.main_box.pack_start(self.content_box, True, True, 0)
+
+        self.add(self.main_box)
+
+        self.app.apply_styling()
+        if self.app.is_paused:
+            self.apply_pause(True)
+        self.quote_layouts = QuoteLayoutCache(self.quote_label, wrap_chars=WRAP_CHARS)
+        self.author_layouts = QuoteLayoutCache(self.author_label)
+
+    def on_window_mapped(self, widget, event):
+        # The window rules have put it in the scratchpad already
+        self.app.mark_startup("first map")
+        self.start_handshake()
+
+    def on_window_unmapped(self, widget, event):
+        # The window is only unmapped if something else did it (hiding just
+        # parks it); mapping it again makes a new client with a new address
+        self.window_address = None
+
+    def start_handshake(self):
+        if not self.window_address and self.handshake_started is None:
+            self.handshake_started = time.perf_counter()
+            threading.Thread(target=self.find_window_address, daemon=True).start()
+
+    def find_window_address(self):
+        """
+        Worker thread: find this window's Hyprland address by its title.
+
+        Works the same under XWayland and native Wayland GDK (there is no
+        XID to ask for there). Normally one `clients -j` query; if the
+        compositor hasn't listed the window yet, retry with back-off for
+        up to HANDSHAKE_TIMEOUT.
+        """
+        deadline = time.monotonic() + HANDSHAKE_TIMEOUT
+        delay = 0.01
+        address = None
+        while True:
+            try:
+                for client in self.app.hyprctl.query("clients"):
+                    if client.get("title") == self.title_token:
+                        address = client["address"]
+                        if client["workspace"]["name"] != SPECIAL_WORKSPACE:
+                            print("Overlay window was not mapped into the scratchpad, "
+                                  "installing the window rules again")
+                            self.app.install_window_rules(force=True)
+                        break
+            except Exception as e:
+                print(f"Error looking up the overlay window: {e}")
+            if address or time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+            delay *= 2
+        GLib.idle_add(self.on_address_found, address)
+
+    def on_address_found(self, address):
+        elapsed = time.perf_counter() - self.handshake_started
+        self.app.handshake_latency.observe(elapsed)
+        if address is None:
+            # Stays in the scratchpad; the next show tries again
+            print(f"Overlay window on {self.monitor} not found in {HANDSHAKE_TIMEOUT:g}s")
+            self.handshake_started = None
+        else:
+            self.window_address = address
+            print(f"Window address obtained on {self.monitor}: {address} "
+                  f"({elapsed * 1000:.1f} ms after map)")
+            # Still wanted on screen: this also moves it to its monitor
+            if self.is_visible:
+                self.submit_transition("show")
+            else:
+                self.move_to_special_workspace()
+        self.app.mark_startup("address handshake")
+        return False
+
+    def on_draw(self, widget, cr):
+        cr.set_source_rgba(0, 0, 0, 0)
+        cr.set_operator(cairo.OPERATOR_SOURCE)
+        cr.paint()
+        return False
+
+    def show_quote_at_index(self, index):
+        all_quotes = self.app.all_quotes
+        if not all_quotes or index < 0 or index >= len(all_quotes):
+            return False
+
+        self.build_widgets()
+        quote_data = all_quotes[index]
+        self.current_quote_index = index
+        self.current_quote = quote_data["quote"]
+        self.current_author = quote_data["author"]
+        self.app.quotes_shown.inc()
+        self.app.trace.record(tracer.QUOTE, self.monitor, index)
+
+        if self.cards is not None:
+            self.show_card(self.cards.card(self.current_quote, self.current_author,
+                                           self.get_scale_factor()))
+            self.schedule_premeasure()
+            self.update_buttons()
+            return True
+
+        author = f"— {self.current_author}"
+        wrapped_quote, quote_width, quote_height = self.quote_layouts.measure(self.current_quote)
+        _, author_width, author_height = self.author_layouts.measure(author)
+
+        self.quote_label.set_text(wrapped_quote)
+        self.quote_label.set_size_request(quote_width, quote_height)
+        self.author_label.set_text(author)
+        self.fit_window(quote_width, quote_height, author_width, author_height)
+        self.schedule_premeasure()
+        self.update_buttons()
+
+        return True
+
+    def update_buttons(self):
+        if not self.current_quote:
+            return
+        self.prev_button.set_sensitive(self.history.can_go_back())
+        self.next_button.set_sensitive(len(self.app.all_quotes) > 1)
+        self.copy_button.set_sensitive(True)
+
+    # Space around the two labels, from apply_styling() and the box margins
+    HEADER_HEIGHT = 70 + 10
+    CONTENT_MARGIN_X, CONTENT_MARGIN_Y = 2 * 40, 2 * 20
+    QUOTE_CHROME = 2 * (15 + 10)        # padding + margin, each axis
+    AUTHOR_CHROME_X, AUTHOR_CHROME_Y = 2 * 12, 2 * 8 + 10
+    SCREEN_MARGIN = 50
+
+    def monitor_geometry(self):
+        """(x, y, width, height) of this window's monitor in layout pixels."""
+        monitor = self.app.monitor_index.get(self.monitor)
+        if monitor is not None:
+            return monitor.x, monitor.y, monitor.width, monitor.height
+        screen = self.get_screen()
+        return 0, 0, screen.get_width(), screen.get_height()
+
+    def fit_window(self, quote_width, quote_height, author_width, author_height):
+        """
+        Size the window for the measured labels in a single resize.
+
+        GTK keeps the larger of this and the widgets' minimum size, so an
+        estimate that is slightly too small can never clip the quote; it
+        just lets the window shrink back after a long quote.
+        """
+        width = self.CONTENT_MARGIN_X + max(quote_width + self.QUOTE_CHROME,
+                                            author_width + self.AUTHOR_CHROME_X)
+        height = (self.HEADER_HEIGHT + self.CONTENT_MARGIN_Y
+                  + quote_height + self.QUOTE_CHROME
+                  + self.content_box.get_spacing()
+                  + author_height + self.AUTHOR_CHROME_Y)
+        self.place_window(width, height)
+
+    def place_window(self, width, height):
+        """Resize to *width* x *height* in the bottom-right corner of the monitor."""
+        self.resize(width, height)
+        x, y, monitor_width, monitor_height = self.monitor_geometry()
+        self.move(x + monitor_width - width - self.SCREEN_MARGIN,
+                  y + monitor_height - height - self.SCREEN_MARGIN)
+
+    # ── Card rendering (--render card) ───────────────────────────────────────
+    def show_card(self, card):
+        """Switch to *card*, crossfading from the current one while visible."""
+        if self.card is not None and self.is_visible and card is not self.card:
+            self.previous_card = self.card
+            self.fade_start = time.monotonic()
+            if self.fade_id is None:
+                # Frame-clock ticks only while the fade runs: no idle wakeups
+                self.fade_id = self.card_area.add_tick_callback(self.on_fade_tick)
+        self.card = card
+        self.fit_card()
+        self.card_area.queue_draw()
+
+    def fit_card(self):
+        cards = [c for c in (self.card, self.previous_card) if c is not None]
+        width = max(c.width for c in cards)
+        height = max(c.height for c in cards)
+        self.card_area.set_size_request(width, height)
+        self.place_window(self.CONTENT_MARGIN_X + width,
+                          self.HEADER_HEIGHT + self.CONTENT_MARGIN_Y + height)
+
+    def fade_progress(self):
+        if self.previous_card is None:
+            return 1.0
+        return min(1.0, (time.monotonic() - self.fade_start) * 1000 / CROSSFADE_MS)
+
+    def on_fade_tick(self, widget, frame_clock):
+        self.card_area.queue_draw()
+        if self.fade_progress() < 1.0:
+            return True
+        self.fade_id = None
+        self.previous_card = None
+        # Shrink back if the outgoing card was the larger one
+        self.fit_card()
+        return False
+
+    def on_card_draw(self, widget, cr):
+        if self.card is None:
+            return False
+        width, height = widget.get_allocated_width(), widget.get_allocated_height()
+        progress = self.fade_progress()
+        layers = [(self.card, progress)]
+        if self.previous_card is not None:
+            layers.insert(0, (self.previous_card, 1.0 - progress))
+        for card, alpha in layers:
+            # Centred horizontally and bottom-aligned, like the label layout
+            cr.set_source_surface(card.surface, (width - card.width) / 2,
+                                  height - card.height)
+            cr.paint_with_alpha(alpha)
+        return False
+
+    def schedule_premeasure(self):
+        if self.premeasure_id is None:
+            self.premeasure_id = GLib.idle_add(self.premeasure_upcoming,
+                                               priority=GLib.PRIORITY_LOW)
+
+    def premeasure_upcoming(self):
+        """Idle handler: measure (or render) the next quotes in rotation, one per call."""
+        for index in self.app.scheduler.upcoming(PREMEASURE_AHEAD, self.history):
+            quote_data = self.app.all_quotes[index]
+            text = quote_data["quote"]
+            if self.cards is not None:
+                if (text, quote_data["author"]) not in self.cards:
+                    self.cards.card(text, quote_data["author"], self.get_scale_factor())
+                    return True
+            elif text not in self.quote_layouts:
+                self.quote_layouts.measure(text)
+                self.author_layouts.measure(f"— {quote_data['author']}")
+                return True
+        self.premeasure_id = None
+        return False
+
+    def show_next_quote(self):
+        if not self.app.all_quotes:
+            return False
+        next_index = self.app.scheduler.next(self.history)
+        if next_index is None:
+            return False
+        return self.show_quote_at_index(next_index)
+
+    def show_prev_quote(self):
+        if not self.app.all_quotes:
+            return False
+        prev_index = self.history.prev()
+        if prev_index is None:
+            return False
+        return self.show_quote_at_index(prev_index)
+
+    def on_prev_clicked(self, button):
+        if self.show_prev_quote():
+            self.reset_quote_timer()
+
+    def on_next_clicked(self, button):
+        if self.show_next_quote():
+            self.reset_quote_timer()
+
+    def on_pause_clicked(self, button):
+        self.app.set_paused(not self.app.is_paused)
+
+    def apply_pause(self, paused):
+        """Called by OverlayApp.set_paused() for every window."""
+        if paused:
+            self.rotation.pause()
+        elif self.is_visible and self.current_quote:
+            # Picks up where the pause left off
+            self.rotation.resume(display_duration(self.current_quote))
+        if not self.widgets_built:
+            return
+        if paused:
+            self.pause_button.set_label("▶")
+            self.pause_button.set_tooltip_text("Resume auto-rotation")
+        else:
+            self.pause_button.set_label("⏸")
+            self.pause_button.set_tooltip_text("Pause auto-rotation")
+
+    def reset_quote_timer(self):
+        """Give the quote just shown its full display time (none while hidden or paused)."""
+        if self.is_visible and not self.app.is_paused and self.app.all_quotes:
+            self.rotation.start(display_duration(self.current_quote))
+        else:
+            self.rotation.stop()
+
+    def on_copy_clicked(self, button):
+        """Copy current quote to clipboard using wl-copy or GTK fallback."""
+        if not self.current_quote:
+            return
+
+        full_text = f'"{self.current_quote}"\n\n— {self.current_author}'
+        self.app.copy(self, full_text)
+
+    def show_copy_result(self, success):
+        if self.copy_feedback_id:
+            GLib.source_remove(self.copy_feedback_id)
+        self.copy_button.set_label("✓" if success else "✗")
+        self.copy_feedback_id = GLib.timeout_add(
+            1000 if success else 2000, self.reset_button_label, self.copy_button, "📋"
+        )
+
+    def reset_button_label(self, button, label):
+        self.copy_feedback_id = None
+        button.set_label(label)
+        return False
+
+    def on_rotation_due(self):
+        if self.is_visible and not self.app.is_paused and self.show_next_quote():
+            self.reset_quote_timer()
+
+    def stop_timers(self):
+        self.rotation.stop()
+        for attribute in ("copy_feedback_id", "premeasure_id"):
+            source = getattr(self, attribute)
+            if source:
+                GLib.source_remove(source)
+                setattr(self, attribute, None)
+        if self.fade_id is not None:
+            self.card_area.remove_tick_callback(self.fade_id)
+            self.fade_id = None
+
+    def get_active_workspace(self):
+        """Dispatcher argument for the workspace this monitor is showing."""
+        monitor = self.app.monitor_index.get(self.monitor)
+        if monitor is not None:
+            return hypripc.workspace_argument(monitor.workspace)
+        try:
+            return self.app.hyprctl.query("activeworkspace")["id"]
+        except Exception as e:
+            print(f"Error getting active workspace: {e}")
+        return 1
+
+    def move_to_special_workspace(self):
+        if not self.window_address:
+            return
+        self.submit_transition("park")
+
+    def submit_transition(self, action):
+        self.app.trace.record(tracer.TRANSITION, self.monitor, action)
+        self.transitions.submit(action, self.window_address)
+
+    def is_pinned(self, address):
+        """Whether Hyprland has the window at *address* pinned (`clients -j`)."""
+        for client in self.app.hyprctl.query("clients"):
+            if client.get("address") == address:
+                return client.get("pinned", False)
+        return False
+
+    def perform_transition(self, transition):
+        """
+        Runs on the transition worker thread; may block on the compositor.
+
+        The `pin` dispatcher toggles, and the window stays mapped between
+        quotes, so the pin state is read back rather than assumed: a shown
+        overlay is pinned to follow workspace switches, and it is unpinned
+        before it goes to the scratchpad, which Hyprland won't move a
+        pinned window into.
+        """
+        address = transition.address
+        if not address:
+            return
+        hyprctl = self.app.hyprctl
+        pinned = self.is_pinned(address)
+        if transition.action == "show":
+            current_workspace = self.get_active_workspace()
+            dispatches = [f"movetoworkspacesilent {current_workspace},address:{address}"]
+            if not pinned:
+                dispatches.append(f"pin address:{address}")
+        else:
+            dispatches = [f"pin address:{address}"] if pinned else []
+            dispatches.append(f"movetoworkspacesilent {SPECIAL_WORKSPACE},address:{address}")
+        hyprctl.dispatch(*dispatches)
+
+    def on_transition_done(self, transition, ok):
+        if transition.address is None:
+            # Submitted before the address handshake, so nothing moved: the
+            # handshake submits the real one, and visibility_since waits for it
+            return False
+        self.app.transition_results[transition.action, ok].inc()
+        self.app.trace.record(tracer.APPLIED, self.monitor, transition.action, ok)
+        # A newer transition owns the window now; let it finish the job
+        if not self.transitions.is_current(transition.serial):
+            return False
+        if ok and self.visibility_since is not None and transition.action != "park":
+            self.app.visibility_latency[transition.action].observe(
+                time.perf_counter() - self.visibility_since)
+            self.visibility_since = None
+        return False
+
+    def update_visibility(self, should_show, since=None):
+        if should_show and not self.is_visible:
+            self.app.mark_startup("waiting for empty workspace", counted=False)
+            if self.show_next_quote():
+                # Maps the window the first time; afterwards it stays mapped
+                # and only moves between the scratchpad and the workspace
+                self.show_all()
+                self.app.mark_startup("window creation")
+                self.is_visible = True
+                self.visibility_since = since
+                if self.get_mapped():
+                    self.start_handshake()   # a failed one is retried here
+                self.submit_transition("show")
+                self.reset_quote_timer()
+
+        elif not should_show and self.is_visible:
+            self.rotation.stop()
+            self.is_visible = False
+            self.app.save_rotation_state()
+            self.visibility_since = since
+            # Parked, not unmapped: a new map would mean a new client address
+            self.submit_transition("hide")
+
+    def close_overlay(self):
+        """The monitor is gone: stop this window's timers and worker and destroy it."""
+        self.is_visible = False
+        self.stop_timers()
+        self.transitions.stop()
+        self.destroy()
+
+
+def run(quote_filter=None, profile=None, metrics_file=None, render="widgets"):
+    """
+    Create the overlay app and its control socket and run the GTK main loop.
+
+    *profile* is a metrics.StartupProfile to report on once the first
+    quote is on screen (--profile-startup). With *metrics_file*, the
+    Prometheus metrics are written there every METRICS_INTERVAL seconds.
+    *render* picks how quotes are drawn: "widgets" or "card".
+    """
+    if not WL_COPY_AVAILABLE:
+        print("Warning: wl-copy not found — clipboard will use GTK fallback.")
+        print("         Install wl-clipboard for persistent clipboard support:")
+        print("         sudo pacman -S wl-clipboard")
+
+    if not os.path.exists(QUOTES_FILE):
+        print(f"Quotes file not found at {QUOTES_FILE}")
+        print("Creating sample quotes file...")
+        sample_quotes = [
+            {"author": "Jason Gorman", "quote": "Refuctoring - the process of taking a well-designed piece of code and, through a series of small, reversible changes, making it completely unmaintainable by anyone except yourself."},
+            {"author": "E. W. Dijkstra", "quote": "If debugging is the process of removing software bugs, then programming must be the process of putting them in."},
+            {"author": "Alan Kay", "quote": "The best way to predict the future is to invent it."},
+            {"author": "Linus Torvalds", "quote": "Talk is cheap. Show me the code."}
+        ]
+        os.makedirs(os.path.dirname(QUOTES_FILE), exist_ok=True)
+        with open(QUOTES_FILE, 'w') as f:
+            json.dump(sample_quotes, f, indent=2)
+
+    app = OverlayApp(quote_filter=quote_filter, profile=profile, render=render)
+    server = control.ControlServer(app.on_control_command)
+    try:
+        server.start()
+    except OSError as e:
+        print(f"Control socket unavailable, `hyprquotes next` etc. won't work: {e}")
+
+    def write_metrics():
+        try:
+            metrics.REGISTRY.write(metrics_file)
+        except OSError as e:
+            print(f"Error writing metrics to {metrics_file}: {e}")
+        return True
+
+    if metrics_file:
+        GLib.timeout_add_seconds(METRICS_INTERVAL, write_metrics)
+
+    def shutdown():
+        server.stop()
+        app.cleanup()
+        if metrics_file:
+            write_metrics()
+        Gtk.main_quit()
+        return False
+
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # `pkill -USR1 -f hyprquotes.py` dumps internal state for debugging
+    GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR1,
+                         app.dump_debug_state)
+    # Session logout sends SIGTERM: shut down cleanly so rotation state is saved
+    GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGTERM, shutdown)
+
+    if app.trace.enabled:
+        def dump_trace():
+            try:
+                print(f"Wrote {app.trace.dump(TRACE_FILE)} trace records to {TRACE_FILE}")
+            except OSError as e:
+                print(f"Error writing trace to {TRACE_FILE}: {e}")
+            return True
+
+        # `pkill -USR2 -f hyprquotes.py` (or `hyprquotes trace`) writes the trace
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR2, dump_trace)
+        tracer.dump_on_crash(TRACE_FILE)
+
+    try:
+        print(f"hyprquotes started. Quotes loaded from: {QUOTES_FILE}")
+        Gtk.main()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+        server.stop()
+        app.cleanup()
+        Gtk.main_quit()
@@ -0,0 +1,103 @@
+"""
+When to show the next quote.
+
+Each quote gets a display time from its length (display_duration) and the
+countdown runs on the monotonic clock, so suspend/resume or an NTP step
+can't shorten or stretch it the way wall-clock arithmetic did.
+
+RotationTimer only holds a main-loop source while the countdown actually
+runs. Hiding or pausing removes it, so an overlay sitting behind windows
+or paused costs no wakeups at all. While it runs, it uses whole-second
+timers (GLib.timeout_add_seconds in the overlay): GLib fires all of those
+on the same second boundary, so the process wakes once for everything due
+rather than at arbitrary millisecond offsets. The price is up to a second
+of jitter on a quote that stays up for 6-30 seconds.
+"""
+import time
+
+import metrics
+
+# Seconds a quote stays up: a fixed pause plus reading time, clamped
+MIN_DISPLAY = 6
+MAX_DISPLAY = 30
+BASE_DISPLAY = 4
+READING_SPEED = 15      # characters per second
+
+# A whole-second timer may fire this much before the deadline
+EARLY_TOLERANCE = 1.0
+
+
+def display_duration(text):
+    """Seconds to show *text* for; about 10 s for a typical 100-character quote."""
+    return min(MAX_DISPLAY, max(MIN_DISPLAY, BASE_DISPLAY + len(text) / READING_SPEED))
+
+
+class RotationTimer:
+    def __init__(self, schedule, cancel, on_expire, clock=time.monotonic, wakeups=None):
+        """
+        *schedule(seconds, callback)* and *cancel(source)* behave like
+        GLib.timeout_add_seconds and GLib.source_remove. *on_expire()* runs
+        when the countdown ends; *wakeups* is a metrics.Counter bumped on
+        every timer callback.
+        """
+        self.schedule = schedule
+        self.cancel = cancel
+        self.on_expire = on_expire
+        self.clock = clock
+        self.wakeups = wakeups if wakeups is not None else metrics.Counter()
+        self.deadline = None    # monotonic time the countdown ends, while running
+        self.remaining = None   # seconds left, while paused
+        self._source = None
+
+    @property
+    def running(self):
+        return self._source is not None
+
+    def start(self, duration):
+        """Start a fresh countdown of *duration* seconds."""
+        self.stop()
+        self.deadline = self.clock() + duration
+        self._arm()
+
+    def pause(self):
+        """Stop the countdown but remember how much of it was left."""
+        if self.deadline is not None:
+            self.remaining = max(0.0, self.deadline - self.clock())
+            self.deadline = None
+        self._disarm()
+
+    def resume(self, duration):
+        """Continue a paused countdown, or start one of *duration* seconds."""
+        if self.running:
+            return
+        remaining = self.remaining if self.remaining is not None else duration
+        self.remaining = None
+        self.deadline = self.clock() + remaining
+        self._arm()
+
+    def stop(self):
+        self._disarm()
+        self.deadline = None
+        self.remaining = None
+
+    def _arm(self):
+        self._disarm()
+        seconds = max(1, int(self.deadline - self.clock()))
+        self._source = self.schedule(seconds, self._fire)
+
+    def _disarm(self):
+        if self._source is not None:
+            self.cancel(self._source)
+            self._source = None
+
+    def _fire(self):
+        self._source = None
+        self.wakeups.inc()
+        if self.deadline is None:
+            return False
+        if self.clock() < self.deadline - EARLY_TOLERANCE:
+            self._arm()
+            return False
+        self.deadline = None
+        self.on_expire()
+        return False
@@ -0,0 +1,312 @@
+"""
+Shuffle-bag quote rotation.
+
+Every quote is drawn exactly once per round, in random order, before any
+quote repeats; the last quote of a round is never the first of the next. The bag is an array of corpus positions split into one
+segment per source; drawing is an O(1) swap-remove inside the chosen
+segment (an incremental Fisher-Yates shuffle). Sources are chosen with
+probability weight x quotes left, so equal weights give a uniform
+permutation of the whole corpus and a heavier source just comes up
+earlier in the round.
+
+The bag can also be restricted to a sorted subset of the corpus (search
+matches, see search.py); each source segment then holds just its members.
+
+Shown quotes go into a fixed-size History ring that backs the ◀ / ▶
+buttons. Several consumers (one overlay window per monitor) share one bag
+but each navigates its own History, so ◀ on one monitor never walks into
+quotes shown on another. The scheduler's own history serves the first
+consumer and is saved with the bag in a compact binary file, so rotation
+resumes where it left off after a logout.
+"""
+import os
+import random
+import struct
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+HISTORY_SIZE = 64
+
+_MAGIC = b"HQS1"
+# magic, bag size, source count, history length, steps back, lookahead length
+_HEADER = struct.Struct("<4sIIIII")
+
+
+class History:
+    """The quotes one consumer has shown, and how far ◀ has walked back."""
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.shown = deque(maxlen=size)
+        self.back = 0
+
+    def __len__(self):
+        return len(self.shown)
+
+    def current(self):
+        if not self.shown:
+            return None
+        return self.shown[len(self.shown) - 1 - self.back]
+
+    def can_go_back(self):
+        return self.back < len(self.shown) - 1
+
+    def prev(self):
+        """The previously *shown* quote, or None at the start of history."""
+        if not self.can_go_back():
+            return None
+        self.back += 1
+        return self.current()
+
+    def forward(self):
+        """Step towards the newest quote; None if already there."""
+        if not self.back:
+            return None
+        self.back -= 1
+        return self.current()
+
+    def replay(self):
+        """What forward() will step through, oldest first."""
+        return list(self.shown)[len(self.shown) - self.back:]
+
+    def push(self, index):
+        self.back = 0
+        self.shown.append(index)
+
+    def remap(self, remap):
+        """Follow a corpus change (see ShuffleScheduler.update)."""
+        # Keep ◀ on the same quote, or the closest earlier one still there
+        current = len(self.shown) - 1 - self.back
+        kept = [(position > current, remap[index])
+                for position, index in enumerate(self.shown) if remap[index] >= 0]
+        self.shown.clear()
+        self.shown.extend(index for _, index in kept)
+        self.back = min(sum(after for after, _ in kept), max(len(self.shown) - 1, 0))
+
+
+class ShuffleScheduler:
+    def __init__(self, sources, history_size=HISTORY_SIZE, rng=None, members=None):
+        """
+        *sources* is a list of corpus.Source ranges covering the corpus.
+        *members*, if given, is the sorted list of corpus indices to rotate
+        through instead of the whole corpus.
+        """
+        self.sources = list(sources)
+        if members is None:
+            self.order = array("I", range(self.sources[-1].stop if self.sources else 0))
+            self.segments = [(s.start, s.stop) for s in self.sources]
+        else:
+            self.order = array("I", members)
+            self.segments = [(bisect_left(members, s.start), bisect_left(members, s.stop))
+                             for s in self.sources]
+        self.size = len(self.order)
+        self.rng = rng or random.Random()
+        self.remaining = [stop - start for start, stop in self.segments]
+        self.history = History(history_size)
+        self._ahead = deque()  # drawn but not yet shown, see upcoming()
+        self._last = None      # drawn most recently, by any consumer
+
+    # ── Drawing ──────────────────────────────────────────────────────────────
+    def _refill(self):
+        self.remaining = [stop - start for start, stop in self.segments]
+
+    def _draw(self):
+        if not self.size:
+            return None
+        weights = [s.weight * left for s, left in zip(self.sources, self.remaining)]
+        total = sum(weights)
+        aside = None
+        if total <= 0:
+            # Round complete: every quote with a non-zero weight was shown
+            self._refill()
+            aside = self._set_aside_last()
+            weights = [s.weight * left for s, left in zip(self.sources, self.remaining)]
+            total = sum(weights)
+            if total <= 0 and aside is not None:
+                # It is the only quote there is: it may repeat
+                self.remaining[aside] += 1
+                aside = None
+                weights = [s.weight * left for s, left in zip(self.sources, self.remaining)]
+                total = sum(weights)
+            if total <= 0:
+                return None
+        pick = self.rng.random() * total
+        for number, weight in enumerate(weights):
+            pick -= weight
+            if pick < 0 and weight > 0:
+                break
+        else:
+            number = max(range(len(weights)), key=weights.__getitem__)
+
+        start = self.segments[number][0]
+        left = self.remaining[number]
+        slot = start + self.rng.randrange(left)
+        last = start + left - 1
+        order = self.order
+        order[slot], order[last] = order[last], order[slot]
+        self.remaining[number] = left - 1
+        index = self._last = order[last]
+        if aside is not None:
+            # Put the set-aside quote back at the end of its bag
+            start = self.segments[aside][0]
+            left = self.remaining[aside]
+            if number == aside:
+                # This draw's pick went where it was; it sits one further now
+                order[start + left], order[start + left + 1] = \
+                    order[start + left + 1], order[start + left]
+            self.remaining[aside] = left + 1
+        return index
+
+    def _set_aside_last(self):
+        """
+        Keep the quote drawn last out of the first draw of a new round, so a
+        round boundary never shows the same quote twice in a row: move it
+        to the end of its segment's bag and shrink the bag by one. Returns
+        the segment number, or None if there is nothing to set aside.
+        """
+        try:
+            slot = self.order.index(self._last) if self._last is not None else -1
+        except ValueError:
+            return None     # not in the rotation (any more)
+        for number, (start, stop) in enumerate(self.segments):
+            if start <= slot < stop:
+                end = start + self.remaining[number] - 1
+                self.order[slot], self.order[end] = self.order[end], self.order[slot]
+                self.remaining[number] -= 1
+                return number
+        return None
+
+    def upcoming(self, count, history=None):
+        """The next *count* quotes ▶ will show, drawing them if needed."""
+        history = self.history if history is None else history
+        if history.back:
+            return (history.replay() + list(self._ahead))[:count]
+        while len(self._ahead) < count:
+            index = self._draw()
+            if index is None:
+                break
+            self._ahead.append(index)
+        return list(self._ahead)[:count]
+
+    # ── Navigation ───────────────────────────────────────────────────────────
+    def next(self, history=None):
+        """
+        Step forward through *history* (by default the scheduler's own), or
+        draw a new quote from the shared bag at its end.
+        """
+        history = self.history if history is None else history
+        if history.back:
+            return history.forward()
+        index = self._ahead.popleft() if self._ahead else self._draw()
+        if index is not None:
+            history.push(index)
+        return index
+
+    # ── Corpus changes ───────────────────────────────────────────────────────
+    def update(self, sources, remap, members=None):
+        """
+        Carry the round over to a changed corpus instead of starting anew.
+
+        *remap* gives the new index of every old corpus index, or -1 if the
+        quote is gone (see corpus.diff_quotes). *sources* and *members* are
+        as for the constructor. Quotes already shown this round stay drawn,
+        the rest (including ones drawn ahead but not shown yet) are in the
+        bag, and quotes new to the rotation join it. The scheduler's own
+        history is remapped and loses only the quotes that were removed;
+        other consumers remap theirs with History.remap().
+        """
+        drawn = bytearray(sources[-1].stop if sources else 0)
+        ahead = set(self._ahead)
+        self._ahead.clear()
+        for (start, stop), left in zip(self.segments, self.remaining):
+            for slot in range(start + left, stop):
+                index = self.order[slot]
+                if remap[index] >= 0 and index not in ahead:
+                    drawn[remap[index]] = 1
+
+        self.sources = list(sources)
+        if members is None:
+            members = range(len(drawn))
+            self.segments = [(s.start, s.stop) for s in self.sources]
+        else:
+            self.segments = [(bisect_left(members, s.start), bisect_left(members, s.stop))
+                             for s in self.sources]
+        self.order = array("I")
+        self.remaining = []
+        for start, stop in self.segments:
+            segment = members[start:stop]
+            bag = [index for index in segment if not drawn[index]]
+            self.order.extend(bag)
+            self.order.extend(index for index in segment if drawn[index])
+            self.remaining.append(len(bag))
+        self.size = len(self.order)
+
+        self.history.remap(remap)
+        if self._last is not None:
+            self._last = remap[self._last] if remap[self._last] >= 0 else None
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+    def save(self, path):
+        history = array("I", self.history.shown)
+        ahead = array("I", self._ahead)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.size, len(self.sources),
+                                 len(history), self.history.back, len(ahead)))
+            f.write(array("I", [n for segment in self.segments for n in segment]).tobytes())
+            f.write(array("I", self.remaining).tobytes())
+            f.write(history.tobytes())
+            f.write(ahead.tobytes())
+            f.write(self.order.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, sources, history_size=HISTORY_SIZE, members=None):
+        """
+        Restore the state saved at *path* if it belongs to a corpus with the
+        same source layout, otherwise start a fresh round.
+        """
+        scheduler = cls(sources, history_size, members=members)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return scheduler
+        except OSError as e:
+            print(f"Could not read rotation state {path}: {e}")
+            return scheduler
+        try:
+            scheduler._restore(data)
+        except (ValueError, struct.error) as e:
+            print(f"Discarding rotation state ({e})")
+            return cls(sources, history_size, members=members)
+        return scheduler
+
+    def _restore(self, data):
+        magic, size, source_count, history_len, back, ahead_len = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("not a rotation state file")
+        ranges = array("I")
+        ranges.frombytes(data[_HEADER.size:_HEADER.size + 8 * source_count])
+        if (size != self.size
+                or list(ranges) != [n for segment in self.segments for n in segment]):
+            raise ValueError("quote collection changed")
+        offset = _HEADER.size + 8 * source_count
+
+        def take(count):
+            nonlocal offset
+            values = array("I")
+            values.frombytes(data[offset:offset + 4 * count])
+            if len(values) != count:
+                raise ValueError("truncated rotation state")
+            offset += 4 * count
+            return values
+
+        self.remaining = list(take(source_count))
+        self.history.shown.extend(take(history_len))
+        self.history.back = min(back, max(len(self.history) - 1, 0))
+        self._ahead.extend(take(ahead_len))
+        self.order = take(size)
+        if self._ahead or self.history:
+            self._last = self._ahead[-1] if self._ahead else self.history.shown[-1]
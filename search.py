@@ -0,0 +1,175 @@
+"""
+Inverted index over a quote corpus.
+
+Every quote is tokenized once into three fields:
+
+  w   words of the quote and its author (plain query terms)
+  a   words of the author only           (author:dijkstra)
+  g   tags, if the entry has a "tags" list (tag:humor)
+
+The index is written to a single file and mmap'd: a sorted term table is
+binary-searched and posting lists (sorted uint32 quote indices) are read
+in place, so a lookup touches a handful of pages no matter how large the
+corpus is. Multi-term queries are ANDed, starting from the shortest
+posting list and probing the others by bisection.
+
+  header   "<4sIIII"  magic b"HQI1", version, quote count, term count,
+                      fingerprint length; then the fingerprint, padded to 8
+  terms    "<QIQI"    per term: key offset, key length, postings offset, count
+  keys              "field\\0token" UTF-8 strings, padded to 4
+  postings          uint32 arrays
+"""
+import mmap
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_left
+
+MAGIC = b"HQI1"
+FORMAT_VERSION = 1
+FIELDS = {"": "w", "author": "a", "tag": "g"}
+
+_HEADER = struct.Struct("<4sIIII")
+_TERM = struct.Struct("<QIQI")
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return {t for t in _WORD.findall(text.casefold()) if len(t) > 1}
+
+
+def _key(field, token):
+    return f"{field}\0{token}".encode("utf-8")
+
+
+def parse_query(query):
+    """
+    Turn ``author:knuth premature optimization`` into index keys.
+
+    Unknown ``field:`` prefixes are treated as plain words.
+    """
+    keys = []
+    for part in query.split():
+        field, sep, value = part.partition(":")
+        if sep and field.casefold() in FIELDS and value:
+            code = FIELDS[field.casefold()]
+        else:
+            code, value = "w", part
+        keys.extend(_key(code, token) for token in sorted(tokenize(value)))
+    return keys
+
+
+def build_index(quotes, path, fingerprint=""):
+    """Index *quotes* (a sequence of quote dicts) into the file at *path*."""
+    postings = {}
+    for index, entry in enumerate(quotes):
+        author = tokenize(entry["author"])
+        for token in tokenize(entry["quote"]) | author:
+            postings.setdefault(_key("w", token), array("I")).append(index)
+        for token in author:
+            postings.setdefault(_key("a", token), array("I")).append(index)
+        for tag in entry.get("tags") or ():
+            for token in tokenize(tag):
+                postings.setdefault(_key("g", token), array("I")).append(index)
+
+    keys = sorted(postings)
+    fp = fingerprint.encode("utf-8")
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(quotes), len(keys), len(fp)) + fp
+    header += b"\0" * (-len(header) % 8)
+    keys_at = len(header) + len(keys) * _TERM.size
+    key_blob = b"".join(keys)
+    postings_at = keys_at + len(key_blob) + (-len(key_blob) % 4)
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        key_offset, posting_offset = keys_at, postings_at
+        for key in keys:
+            f.write(_TERM.pack(key_offset, len(key), posting_offset, len(postings[key])))
+            key_offset += len(key)
+            posting_offset += 4 * len(postings[key])
+        f.write(key_blob)
+        f.write(b"\0" * (-len(key_blob) % 4))
+        for key in keys:
+            f.write(postings[key].tobytes())
+    os.replace(tmp_path, path)
+
+
+class SearchIndex:
+    def __init__(self, path, fd=None):
+        """*fd*, if given, is an open descriptor of *path* to map instead."""
+        self.path = path
+        if fd is not None:
+            self._map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        else:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.size, self._terms, fp_len = _HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = version = None
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a version {FORMAT_VERSION} search index")
+        self.fingerprint = self._map[_HEADER.size:_HEADER.size + fp_len].decode("utf-8")
+        self._table_at = _HEADER.size + fp_len + (-(_HEADER.size + fp_len) % 8)
+        self._view = memoryview(self._map)
+
+    def close(self):
+        self._view = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def postings(self, key):
+        """Sorted quote indices for an encoded key; empty if absent."""
+        lo, hi = 0, self._terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_offset, key_len, posting_offset, count = _TERM.unpack_from(
+                self._map, self._table_at + mid * _TERM.size
+            )
+            candidate = self._map[key_offset:key_offset + key_len]
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return self._view[posting_offset:posting_offset + 4 * count].cast("I")
+        return ()
+
+    def search(self, query, limit=None):
+        """Indices of quotes matching every term of *query*, in corpus order."""
+        keys = parse_query(query)
+        if not keys:
+            return []
+        lists = sorted((self.postings(k) for k in keys), key=len)
+        if not lists[0]:
+            return []
+        shortest, others = lists[0], lists[1:]
+        matches = []
+        for index in shortest:
+            for other in others:
+                position = bisect_left(other, index)
+                if position == len(other) or other[position] != index:
+                    break
+            else:
+                matches.append(index)
+                if limit is not None and len(matches) >= limit:
+                    break
+        return matches
+
+
+def open_index(path, quotes, fingerprint):
+    """Open the index at *path*, rebuilding it if it belongs to another corpus."""
+    try:
+        index = SearchIndex(path)
+        if index.fingerprint == fingerprint and index.size == len(quotes):
+            return index
+        index.close()
+    except (OSError, ValueError):
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    build_index(quotes, path, fingerprint)
+    return SearchIndex(path)
@@ -0,0 +1,227 @@
+"""
+One compiled corpus and search index for every session on the host.
+
+On a multi-seat machine each user's hyprquotes would otherwise load (or
+compile and index) the same quotes on its own. With `--shared-corpus`
+sessions instead map the files published in a shared directory, by
+default /dev/shm/hyprquotes: the .hqc corpus and .idx index are only
+ever mmap'd read-only, so the kernel backs every session with the same
+pages and memory stays flat as users log in.
+
+  hyprquotes --publish-shared quotes.json      # as the corpus owner
+  hyprquotes --shared-corpus                   # in every session
+
+Published files are immutable and named after a hash of their content:
+
+  corpus-<version>.hqc    compiled corpus, mode 0444
+  corpus-<version>.idx    its search index, fingerprinted with <version>
+  current                 symlink to the live corpus-<version>.hqc
+
+Publishing writes the new version next to the old one and then renames a
+fresh symlink over `current`, so a reader resolves either the old or the
+new version, never a half-written file. Running overlays watch the
+directory and reload through the usual path; until they do they keep
+their mapping of the old version, which stays valid after it is unlinked.
+The previous version is kept on disk for sessions that resolved `current`
+just before the swap and have not opened the file yet.
+
+Only the publisher may write to the directory. Sessions refuse (and fall
+back to their own quotes) a directory or corpus file that is group- or
+world-writable, or owned by someone other than root, the session's own
+user or the user named in $HYPRQUOTES_SHARED_OWNER (the publisher, when
+that is a separate account). A published corpus is also checked entry by
+entry when it is opened, so a damaged file is refused up front.
+"""
+import errno
+import hashlib
+import os
+import pwd
+import stat
+
+import corpus
+import search
+from normalize import DEFAULT_RULES
+
+SHARED_DIR = os.environ.get("HYPRQUOTES_SHARED_DIR") or "/dev/shm/hyprquotes"
+# User name or uid of the account that publishes, if not root or yourself
+SHARED_OWNER = os.environ.get("HYPRQUOTES_SHARED_OWNER")
+CURRENT = "current"
+PREFIX = "corpus-"
+INDEX_SUFFIX = ".idx"
+# Versions kept on disk: the live one and the one it replaced
+KEEP_VERSIONS = 2
+
+
+class SharedCorpusError(corpus.CorpusError):
+    pass
+
+
+def index_path_for(corpus_path):
+    return os.path.splitext(corpus_path)[0] + INDEX_SUFFIX
+
+
+def version_of(corpus_path):
+    """The version a published corpus file name carries."""
+    return os.path.splitext(os.path.basename(corpus_path))[0][len(PREFIX):]
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def trusted_owners():
+    """Uids whose shared files we use: root, ourselves and SHARED_OWNER."""
+    owners = {0, os.getuid()}
+    if SHARED_OWNER:
+        try:
+            owners.add(int(SHARED_OWNER) if SHARED_OWNER.isdigit()
+                       else pwd.getpwnam(SHARED_OWNER).pw_uid)
+        except KeyError:
+            raise SharedCorpusError(f"HYPRQUOTES_SHARED_OWNER: no user {SHARED_OWNER!r}") from None
+    return owners
+
+
+def _check_owner(path, st, owners):
+    if st.st_uid not in owners:
+        raise SharedCorpusError(f"{path}: owned by uid {st.st_uid}, not using it")
+    if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise SharedCorpusError(f"{path}: writable by other users, not using it")
+
+
+def _check_directory(directory):
+    st = os.stat(directory)
+    if not stat.S_ISDIR(st.st_mode):
+        raise SharedCorpusError(f"{directory}: not a directory")
+    _check_owner(directory, st, trusted_owners())
+    return st
+
+
+def _open_file(path, directory_st):
+    """
+    Open a published file for mapping; it must be a regular file of the
+    directory's owner (or root). The checks are made on the descriptor
+    that gets mapped, so the file cannot be swapped in between.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW | os.O_CLOEXEC)
+    except OSError as e:
+        if e.errno == errno.ELOOP:
+            raise SharedCorpusError(f"{path}: is a symlink, not using it") from None
+        raise
+    try:
+        st = os.fstat(fd)
+        if not stat.S_ISREG(st.st_mode):
+            raise SharedCorpusError(f"{path}: not a regular file")
+        _check_owner(path, st, {0, directory_st.st_uid})
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def publish(source, directory=SHARED_DIR, rules=DEFAULT_RULES):
+    """
+    Compile *source* (.json, .jsonl or .hqc) and its search index into
+    *directory* and make it the current version. Returns (version, count);
+    publishing an unchanged corpus again is a no-op.
+    """
+    if corpus.is_compiled(source):
+        compiled = corpus.CompiledCorpus(source)
+        quotes = list(compiled)
+        compiled.close()
+    else:
+        quotes = corpus.normalize_quotes(corpus.read_source(source), rules)
+
+    os.makedirs(directory, mode=0o755, exist_ok=True)
+    _check_directory(directory)
+    staging = os.path.join(directory, f".staging{os.getpid()}{corpus.COMPILED_SUFFIX}")
+    corpus.write_compiled(quotes, staging)
+    version = _file_digest(staging)
+    path = os.path.join(directory, PREFIX + version + corpus.COMPILED_SUFFIX)
+    if os.path.exists(path):
+        os.remove(staging)
+    else:
+        os.chmod(staging, 0o444)
+        os.replace(staging, path)
+    index = index_path_for(path)
+    if not os.path.exists(index):
+        search.build_index(quotes, index, version)
+        os.chmod(index, 0o444)
+
+    if current_path(directory) == path:
+        return version, len(quotes)
+    # Swap the pointer: a new symlink renamed over the old one is atomic
+    link = os.path.join(directory, f".{CURRENT}.tmp{os.getpid()}")
+    os.symlink(os.path.basename(path), link)
+    os.replace(link, os.path.join(directory, CURRENT))
+    _prune(directory, os.path.basename(path))
+    return version, len(quotes)
+
+
+def _prune(directory, current):
+    """Remove all but the newest KEEP_VERSIONS corpora (and their indexes)."""
+    published = []
+    for name in os.listdir(directory):
+        if name.startswith(PREFIX) and name.endswith(corpus.COMPILED_SUFFIX):
+            path = os.path.join(directory, name)
+            try:
+                published.append((name == current, os.stat(path).st_mtime_ns, path))
+            except OSError:
+                pass
+    published.sort(reverse=True)
+    for _, _, path in published[KEEP_VERSIONS:]:
+        for stale in (path, index_path_for(path)):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def current_path(directory=SHARED_DIR):
+    """Path of the live published corpus, or None if nothing is published."""
+    try:
+        target = os.readlink(os.path.join(directory, CURRENT))
+    except OSError:
+        return None
+    return os.path.join(directory, os.path.basename(target))
+
+
+def open_shared(directory=SHARED_DIR):
+    """
+    Map the current shared corpus. Returns a CompiledCorpus with a
+    .version attribute, or None if nothing has been published.
+    """
+    directory_st = _check_directory(directory)
+    for _ in range(3):
+        path = current_path(directory)
+        if path is None:
+            return None
+        try:
+            fd = _open_file(path, directory_st)
+        except FileNotFoundError:
+            continue    # swapped and pruned between readlink and open
+        try:
+            quotes = corpus.CompiledCorpus(path, verify=True, fd=fd)
+        finally:
+            os.close(fd)
+        quotes.version = version_of(path)
+        return quotes
+    raise SharedCorpusError(f"{directory}: corpus keeps changing, try again")
+
+
+def open_index(quotes):
+    """The published search index of a shared corpus from open_shared()."""
+    path = index_path_for(quotes.path)
+    fd = _open_file(path, _check_directory(os.path.dirname(path)))
+    try:
+        index = search.SearchIndex(path, fd=fd)
+    finally:
+        os.close(fd)
+    if index.fingerprint != quotes.version or index.size != len(quotes):
+        index.close()
+        raise SharedCorpusError(f"{index.path}: does not match {quotes.path}")
+    return index
@@ -0,0 +1,164 @@
+"""
+Rotating quotes as newline-delimited JSON for status bars.
+
+`hyprquotes --stream` prints one line per change, in the format waybar's
+custom modules read with "return-type": "json" (eww's deflisten and most
+other bars can consume it too):
+
+  {"text": "Talk is cheap. Show me the code.", "tooltip": "...", "class": "quote"}
+
+It shares the corpus loader, --filter, the shuffle rotation, per-quote
+display times and the empty-workspace detection (compositor.py) with the
+overlay, but nothing here imports gi, Gtk or cairo: the cost is a Python
+process with the corpus mapped instead of a toolkit, a display connection
+and a window per monitor.
+
+Like the overlay, a quote is only shown while the followed workspace is
+empty; otherwise the line is empty with class "hidden" and rotation
+stops. Between changes the main thread sleeps on a condition until the
+current quote's deadline, or indefinitely while hidden, and the tracker
+thread only wakes for compositor events. SIGUSR1 skips to the next quote
+(e.g. waybar's "on-click").
+"""
+import html
+import json
+import signal
+import sys
+import threading
+import time
+
+import config
+import corpus
+from compositor import CompositorTracker
+from rotation import display_duration
+from scheduler import ShuffleScheduler
+
+# Longest text put in the bar; the tooltip always has the whole quote
+TEXT_LIMIT = 120
+
+
+def quote_line(quote, author):
+    """The JSON object for one quote. Bars parse text and tooltip as Pango markup."""
+    text = quote if len(quote) <= TEXT_LIMIT else quote[:TEXT_LIMIT - 1].rstrip() + "…"
+    return {
+        "text": html.escape(text, quote=False),
+        "tooltip": html.escape(f"{quote}\n— {author}", quote=False),
+        "class": "quote",
+    }
+
+
+HIDDEN_LINE = {"text": "", "tooltip": "", "class": "hidden"}
+
+
+class QuoteStream:
+    def __init__(self, quote_filter=None, monitor=None, out=None):
+        """
+        *monitor* names the output whose workspace decides visibility
+        (one bar per output); by default the focused monitor is followed.
+        """
+        self.out = out or sys.stdout
+        self.monitor = monitor
+        self.quote_filter = quote_filter
+        self.compositor = CompositorTracker(self.on_workspace_update)
+        self.cond = threading.Condition()
+        self.empty = None       # followed workspace empty? None until synced
+        self.skip = False
+
+        path, self.quotes = config.load_quotes()
+        self.scheduler = ShuffleScheduler.load(
+            config.scheduler_state_path(quote_filter, "stream"),
+            corpus.corpus_sources(self.quotes),
+            members=config.filter_members(quote_filter, path, self.quotes),
+        )
+
+    # ── Compositor state (tracker thread) ────────────────────────────────────
+    def _followed_workspace_empty(self):
+        monitor_index = self.compositor.monitor_index
+        monitor = monitor_index.get(self.monitor or monitor_index.focused)
+        if monitor is None:
+            return None
+        return not self.compositor.workspace_index.occupied(monitor.workspace)
+
+    def on_workspace_update(self, changed, removed, since):
+        # Checked on every update, not just changes: focus may have moved
+        # to another monitor
+        empty = self._followed_workspace_empty()
+        with self.cond:
+            if empty != self.empty:
+                self.empty = empty
+                self.cond.notify()
+
+    # ── Output (main thread) ─────────────────────────────────────────────────
+    def emit(self, line):
+        self.out.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self.out.flush()
+
+    def next_quote(self):
+        """Emit the next quote; returns its deadline on the monotonic clock."""
+        index = self.scheduler.next()
+        if index is None:
+            self.emit(HIDDEN_LINE)
+            return None
+        entry = self.quotes[index]
+        self.emit(quote_line(entry["quote"], entry["author"]))
+        return time.monotonic() + display_duration(entry["quote"])
+
+    def request_next(self, *_):
+        """SIGUSR1: show the next quote now (if one is showing)."""
+        with self.cond:
+            self.skip = True
+            self.cond.notify()
+
+    def run(self):
+        self.compositor.start()
+        showing = None          # what was last emitted: True quote, False hidden
+        deadline = None
+        while True:
+            with self.cond:
+                while True:
+                    empty, skip = self.empty, self.skip
+                    if empty is not None and bool(empty) != showing:
+                        break   # workspace became empty or busy
+                    if showing and (skip or time.monotonic() >= deadline):
+                        break   # quote is due
+                    self.cond.wait(deadline - time.monotonic() if showing else None)
+                self.skip = False
+            if empty:
+                deadline = self.next_quote()
+                showing = deadline is not None
+                if not showing:
+                    return  # no quote to rotate through
+            else:
+                self.emit(HIDDEN_LINE)
+                showing = False
+
+    def stop(self):
+        self.compositor.stop()
+        try:
+            self.scheduler.save(config.scheduler_state_path(self.quote_filter, "stream"))
+        except OSError as e:
+            print(f"Error saving rotation state: {e}")
+
+
+def run(quote_filter=None, monitor=None):
+    """`hyprquotes --stream`: NDJSON on stdout until the bar closes it."""
+    # stdout is the data channel: every diagnostic print() goes to stderr
+    out, sys.stdout = sys.stdout, sys.stderr
+    try:
+        stream = QuoteStream(quote_filter=quote_filter, monitor=monitor, out=out)
+    except Exception as e:
+        print(f"Error loading quotes: {e}")
+        return 1
+    if not len(stream.quotes):
+        print("No quotes to stream")
+        return 1
+    # Bars stop their modules with SIGTERM: exit through stop() to save state
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGUSR1, stream.request_next)
+    try:
+        stream.run()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass    # the bar went away
+    finally:
+        stream.stop()
+    return 0
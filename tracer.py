@@ -0,0 +1,322 @@
+"""
+Flight recorder for the overlay's decision path (--trace).
+
+"The quote flickered" or "it appeared late" depends on the order and
+timing of compositor events, index resyncs, visibility decisions and the
+dispatches that carry them out. With --trace the overlay records those as
+they happen into a bounded in-memory ring buffer (TRACE_CAPACITY records;
+the oldest fall off), at the cost of one deque append per record. Without
+it every record() call goes to the no-op DISABLED.
+
+The buffer is written to a file on SIGUSR2, on `hyprquotes trace`, and
+when an exception goes unhandled. The file is gzipped JSON lines: a header
+object, then one array per record:
+
+  [sequence, microseconds since the first record, kind, *fields]
+
+  event       name, data, resynced   socket2 event (resynced: answered with
+                                     a full resync instead of a patch)
+  sync        clients, monitors,     `clients -j` / `monitors -j` as the
+              states                 indexes read them, plus the per-monitor
+                                     (workspace, occupied) decided before it
+  decide      monitor, show          visibility decision
+  remove      monitor                monitor gone
+  transition  monitor, action        show/hide/park handed to the worker
+  applied     monitor, action, ok    ... and finished, back on the main loop
+  dispatch    commands, ok, µs       one hyprctl dispatch (or batch)
+  quote       monitor, index         quote shown
+  pause       paused
+  control     command                control socket command
+
+`hyprquotes --replay FILE` feeds the recorded events and syncs through the
+same indexes and workspaces.visibility_changes() the overlay uses, with
+no compositor and no GTK. It prints a timeline, checks the decisions it
+reaches against the recorded ones and summarizes flicker, event-to-screen
+latency and the cost of the decision path. --replay-speed paces the
+replay at a multiple of real time; by default it runs as fast as it can.
+"""
+import gzip
+import itertools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+
+from workspaces import (MONITOR_RESYNC_EVENTS, MonitorIndex, WorkspaceIndex,
+                        visibility_changes)
+
+TRACE_CAPACITY = 50000
+FORMAT = "hyprquotes-trace"
+FORMAT_VERSION = 1
+# A show and hide (or hide and show) this close together count as flicker
+FLICKER_WINDOW = 1.0
+
+# Record kinds
+EVENT = "event"
+SYNC = "sync"
+DECIDE = "decide"
+REMOVE = "remove"
+TRANSITION = "transition"
+APPLIED = "applied"
+DISPATCH = "dispatch"
+QUOTE = "quote"
+PAUSE = "pause"
+CONTROL = "control"
+
+# What the indexes read from `clients -j` and `monitors -j`
+_CLIENT_FIELDS = ("address", "class", "title", "mapped")
+_MONITOR_FIELDS = ("name", "x", "y", "width", "height", "scale", "transform", "focused")
+
+
+class TraceError(ValueError):
+    pass
+
+
+class Tracer:
+    enabled = True
+
+    def __init__(self, capacity=TRACE_CAPACITY, clock=time.monotonic_ns):
+        self.capacity = capacity
+        self._clock = clock
+        self._ring = deque(maxlen=capacity)
+        # next() on a count and deque.append are atomic, so record() is
+        # safe from any thread without a lock
+        self._sequence = itertools.count()
+
+    def record(self, kind, *fields):
+        self._ring.append((next(self._sequence), self._clock(), kind, fields))
+
+    def dump(self, path):
+        """Write the buffer to *path*; returns the number of records written."""
+        records = sorted(self._ring.copy())
+        origin = records[0][1] if records else 0
+        header = {
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "pid": os.getpid(),
+            "dumped": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "capacity": self.capacity,
+            # Sequence numbers start at 0: anything before the first was overwritten
+            "dropped": records[0][0] if records else 0,
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            for sequence, timestamp, kind, fields in records:
+                line = [sequence, (timestamp - origin) // 1000, kind, *fields]
+                f.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, path)
+        return len(records)
+
+
+class _Disabled:
+    """The tracer while --trace is off."""
+    enabled = False
+
+    def record(self, kind, *fields):
+        pass
+
+    def dump(self, path):
+        raise TraceError("tracing is off (start hyprquotes with --trace)")
+
+
+DISABLED = _Disabled()
+TRACER = DISABLED
+
+
+def enable(capacity=TRACE_CAPACITY):
+    """Start recording; only objects created afterwards pick up the tracer."""
+    global TRACER
+    TRACER = Tracer(capacity)
+    return TRACER
+
+
+def dump_on_crash(path):
+    """Also dump to *path* when an exception goes unhandled, on any thread."""
+    previous_hook = sys.excepthook
+    previous_thread_hook = threading.excepthook
+
+    def dump():
+        try:
+            count = TRACER.dump(path)
+            print(f"Wrote {count} trace records to {path}", file=sys.stderr)
+        except (OSError, TraceError) as e:
+            print(f"Error writing trace to {path}: {e}", file=sys.stderr)
+
+    def hook(*exc_info):
+        dump()
+        previous_hook(*exc_info)
+
+    def thread_hook(args):
+        dump()
+        previous_thread_hook(args)
+
+    sys.excepthook = hook
+    threading.excepthook = thread_hook
+
+
+def compact_clients(clients):
+    return [dict({key: c[key] for key in _CLIENT_FIELDS if key in c},
+                 workspace={"name": c["workspace"]["name"]}) for c in clients]
+
+
+def compact_monitors(monitors):
+    return [dict({key: m[key] for key in _MONITOR_FIELDS if key in m},
+                 activeWorkspace={"name": m["activeWorkspace"]["name"]}) for m in monitors]
+
+
+def load(path):
+    """(header, records) of a trace file; records are (seq, seconds, kind, fields)."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            raise TraceError(f"{path}: not a hyprquotes trace")
+        if header.get("version") != FORMAT_VERSION:
+            raise TraceError(f"{path}: trace version {header.get('version')} "
+                             f"(this hyprquotes reads {FORMAT_VERSION})")
+        records = []
+        for line in f:
+            sequence, micros, kind, *fields = json.loads(line)
+            records.append((sequence, micros / 1e6, kind, fields))
+    return header, records
+
+
+# ── Replay ───────────────────────────────────────────────────────────────────
+def _states_from_json(states):
+    return {monitor: tuple(state) for monitor, state in states.items()}
+
+
+def _describe(kind, fields):
+    if kind == EVENT:
+        name, data, resynced = fields
+        return f"{name} {data}" + (" (resync)" if resynced else "")
+    if kind == SYNC:
+        clients, monitors, _ = fields
+        return f"{len(monitors)} monitors, {len(clients)} clients"
+    if kind == DECIDE:
+        monitor, show = fields
+        return f"{monitor} {'show' if show else 'hide'}"
+    if kind == DISPATCH:
+        commands, ok, micros = fields
+        return f"{'; '.join(commands)} {'ok' if ok else 'FAILED'} {micros / 1000:.1f} ms"
+    if kind == APPLIED:
+        monitor, action, ok = fields
+        return f"{monitor} {action} {'ok' if ok else 'FAILED'}"
+    return " ".join(str(field) for field in fields)
+
+
+def _summary(samples, scale=1000, unit="ms"):
+    if not samples:
+        return "-"
+    return (f"p50 {statistics.median(samples) * scale:.2f} {unit}, "
+            f"max {max(samples) * scale:.2f} {unit} (n={len(samples)})")
+
+
+def replay(path, speed=0, out=None, timeline=True):
+    """
+    Replay the trace at *path*; returns the number of decisions that
+    differ from the recorded ones. *speed* > 0 sleeps to play the trace
+    that many times faster than it was recorded.
+    """
+    out = out or sys.stdout
+    header, records = load(path)
+    workspace_index, monitor_index = WorkspaceIndex(), MonitorIndex()
+    states = None               # unknown until the first sync in the trace
+    replayed, recorded = [], []  # (time, monitor, show)
+    costs = []                   # seconds spent deciding per input
+    decided_at = {}              # monitor -> (time, action) of the last decision
+    latencies = {"show": [], "hide": []}
+    failed = 0
+    started = time.monotonic()
+    print(f"{path}: {len(records)} records, {header['dropped']} dropped before, "
+          f"pid {header['pid']}, dumped {header['dumped']}", file=out)
+
+    for sequence, at, kind, fields in records:
+        if speed > 0:
+            delay = started + at / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        if timeline:
+            print(f"{at:10.3f}  {kind:<10}  {_describe(kind, fields)}", file=out)
+
+        changed = removed = None
+        if kind == SYNC:
+            clients, monitors, before = fields
+            if states is not None and _states_from_json(before) != states:
+                print(f"{'':10}  !! state before this sync differs: recorded {before}, "
+                      f"replayed {states}", file=out)
+            if states is None:
+                # Start from what the overlay had decided at this point
+                states = _states_from_json(before)
+            begin = time.perf_counter()
+            workspace_index.rebuild(clients)
+            monitor_index.rebuild(monitors)
+            states, changed, removed = visibility_changes(monitor_index, workspace_index, states)
+            costs.append(time.perf_counter() - begin)
+        elif kind == EVENT and states is not None:
+            name, data, resynced = fields
+            if resynced or name in MONITOR_RESYNC_EVENTS:
+                continue    # the sync record that follows carries the result
+            begin = time.perf_counter()
+            if not monitor_index.apply_event(name, data):
+                workspace_index.apply_event(name, data)
+            states, changed, removed = visibility_changes(monitor_index, workspace_index, states)
+            costs.append(time.perf_counter() - begin)
+        elif kind == DECIDE:
+            monitor, show = fields
+            recorded.append((at, monitor, show))
+            decided_at[monitor] = (at, "show" if show else "hide")
+        elif kind == APPLIED:
+            monitor, action, ok = fields
+            failed += not ok
+            decision = decided_at.get(monitor)
+            if ok and decision is not None and decision[1] == action:
+                latencies[action].append(at - decision[0])
+                del decided_at[monitor]
+        elif kind == DISPATCH:
+            failed += not fields[1]
+
+        for monitor, show in (changed or {}).items():
+            replayed.append((at, monitor, show))
+            if timeline:
+                print(f"{'':10}  -> {'show' if show else 'hide'} {monitor}", file=out)
+        for monitor in removed or ():
+            if timeline:
+                print(f"{'':10}  -> remove {monitor}", file=out)
+
+    # Compare what the overlay decided with what the same inputs decide now,
+    # from the first decision the replay could make
+    first = replayed[0][0] if replayed else None
+    expected = [(m, s) for at, m, s in recorded if first is not None and at >= first]
+    actual = [(m, s) for _, m, s in replayed]
+    mismatches = sum(a != b for a, b in zip(expected, actual)) + abs(len(expected) - len(actual))
+    for position, (a, b) in enumerate(zip(expected, actual)):
+        if a != b:
+            print(f"First differing decision #{position}: recorded {a}, replayed {b}", file=out)
+            break
+
+    flicker = 0
+    last = {}
+    for at, monitor, show in replayed:
+        previous = last.get(monitor)
+        if previous is not None and previous[1] != show and at - previous[0] < FLICKER_WINDOW:
+            flicker += 1
+        last[monitor] = (at, show)
+
+    print(f"Replayed in {time.monotonic() - started:.3f} s "
+          f"(trace spans {records[-1][1] if records else 0:.3f} s)", file=out)
+    print(f"Decisions: {len(actual)} replayed, {len(expected)} recorded, "
+          f"{mismatches} differ", file=out)
+    print(f"Flicker (reversed within {FLICKER_WINDOW:g} s): {flicker}", file=out)
+    print(f"Decision to shown: {_summary(latencies['show'])}", file=out)
+    print(f"Decision to hidden: {_summary(latencies['hide'])}", file=out)
+    print(f"Failed dispatches/transitions: {failed}", file=out)
+    print(f"Decision path per input: {_summary(costs, 1e6, 'µs')}", file=out)
+    return mismatches
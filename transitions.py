@@ -0,0 +1,87 @@
+"""
+Show/hide transitions executed off the GTK main loop.
+
+The UI thread only records the state it wants the overlay window to be in
+("show" on the active workspace, "hide" in the scratchpad, or "park" it
+there after the first map). A single worker thread performs the compositor
+dispatches for the *latest* desired state: a transition that is still
+pending when a newer one arrives is cancelled, and one that would leave
+the compositor exactly as it already is gets dropped.
+
+Completion is reported back through *post* (GLib.idle_add in the overlay),
+so the callback runs on the main loop.
+"""
+import threading
+from collections import namedtuple
+
+Transition = namedtuple("Transition", "serial action address")
+
+
+class TransitionWorker:
+    def __init__(self, perform, post, on_done):
+        self.perform = perform
+        self.post = post
+        self.on_done = on_done
+        self.stats = {
+            "submitted": 0,
+            "coalesced": 0,   # superseded while still pending
+            "dropped": 0,     # already in the requested state
+            "executed": 0,
+            "failed": 0,
+        }
+        self._serial = 0
+        self._pending = None
+        self._applied = None
+        self._active = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, action, address):
+        with self._cond:
+            self._serial += 1
+            self.stats["submitted"] += 1
+            if self._pending is not None:
+                self.stats["coalesced"] += 1
+            self._pending = Transition(self._serial, action, address)
+            self._cond.notify()
+            return self._serial
+
+    def is_current(self, serial):
+        """True if no transition has been submitted after *serial*."""
+        return serial == self._serial
+
+    def stop(self):
+        with self._cond:
+            self._active = False
+            self._pending = None
+            self._cond.notify()
+
+    def format_stats(self):
+        return " ".join(f"{key}={value}" for key, value in self.stats.items())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._active and self._pending is None:
+                    self._cond.wait()
+                if not self._active:
+                    return
+                transition, self._pending = self._pending, None
+
+            ok = True
+            state = (transition.action, transition.address)
+            if state == self._applied:
+                self.stats["dropped"] += 1
+            else:
+                try:
+                    self.perform(transition)
+                    self._applied = state
+                    self.stats["executed"] += 1
+                except Exception as e:
+                    # Unknown compositor state: don't skip the next attempt
+                    self._applied = None
+                    self.stats["failed"] += 1
+                    ok = False
+                    print(f"Error applying {transition.action} transition: {e}")
+            self.post(self.on_done, transition, ok)
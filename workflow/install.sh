@@ -104,13 +104,13 @@ else
   sudo mkdir -p "$INSTALL_DIR" "$INSTALL_DIR/assets" "$BIN_DIR"
 fi
 
-# Copy application files
+# Copy application files (hyprquotes.py and its helper modules)
 if $USER_INSTALL; then
-  cp hyprquotes.py "$INSTALL_DIR/hyprquotes.py"
-  chmod 644 "$INSTALL_DIR/hyprquotes.py"
+  cp ./*.py "$INSTALL_DIR/"
+  chmod 644 "$INSTALL_DIR"/*.py
 else
-  sudo cp hyprquotes.py "$INSTALL_DIR/hyprquotes.py"
-  sudo chmod 644 "$INSTALL_DIR/hyprquotes.py"
+  sudo cp ./*.py "$INSTALL_DIR/"
+  sudo chmod 644 "$INSTALL_DIR"/*.py
 fi
 
 # Copy default quotes file to user config (never requires sudo — always user-owned)
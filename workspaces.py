@@ -0,0 +1,230 @@
+"""
+Workspace occupancy index.
+
+Keeps a workspace -> window-address map in sync with Hyprland so that
+"is this workspace empty?" is a dictionary lookup instead of a full
+`clients -j` download. The index is seeded from `clients -j` and then
+patched from openwindow / closewindow / movewindow events.
+
+Workspaces are keyed by name because that is what the events carry;
+addresses are stored without the 0x prefix for the same reason.
+
+MonitorIndex does the same for `monitors -j`: which workspace each output
+is showing, which output has focus, and where each output sits in the
+layout, so every monitor can get its own overlay.
+"""
+import threading
+from collections import namedtuple
+
+# Our own overlay window never counts as an occupant
+IGNORED_WINDOW = "Quote Display"
+# Window rules match every overlay title (see overlay_title)
+OVERLAY_TITLE_PATTERN = f"^({IGNORED_WINDOW}( .*)?)$"
+
+# These change the set of monitors or what they show in ways the events
+# don't fully describe: re-read `monitors -j` instead of patching
+MONITOR_RESYNC_EVENTS = frozenset({"monitoradded", "monitorremoved", "moveworkspace"})
+
+# Position and size in layout (logical) pixels
+Monitor = namedtuple("Monitor", "name x y width height workspace")
+
+
+def overlay_title(pid, monitor):
+    """Title of the overlay window on *monitor*: unique per process and monitor."""
+    return f"{IGNORED_WINDOW} {pid}-{monitor}"
+
+
+def visibility_changes(monitor_index, workspace_index, previous):
+    """
+    Compare every monitor's (workspace, occupied) with *previous*.
+
+    Returns (states, changed, removed): the new states, {monitor: show?}
+    for monitors whose state changed (an overlay shows on an empty
+    workspace), and the monitors in *previous* that are gone.
+    """
+    states = {
+        monitor: (workspace, workspace_index.occupied(workspace))
+        for monitor, workspace in monitor_index.active_workspaces().items()
+    }
+    changed = {monitor: not state[1] for monitor, state in states.items()
+               if state != previous.get(monitor)}
+    return states, changed, previous.keys() - states.keys()
+
+
+def _normalize_address(address):
+    return address[2:] if address.startswith("0x") else address
+
+
+def _is_ignored(window_class, title):
+    return window_class == IGNORED_WINDOW or IGNORED_WINDOW in (title or "")
+
+
+class WorkspaceIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._workspace_of = {}   # address -> workspace name
+        self._windows_on = {}     # workspace name -> set of addresses
+
+    def rebuild(self, clients):
+        """Replace the whole index with the result of `clients -j`."""
+        workspace_of = {}
+        windows_on = {}
+        for client in clients:
+            if not client.get("mapped", True):
+                continue
+            if _is_ignored(client.get("class"), client.get("title")):
+                continue
+            address = _normalize_address(client["address"])
+            workspace = client["workspace"]["name"]
+            workspace_of[address] = workspace
+            windows_on.setdefault(workspace, set()).add(address)
+        with self._lock:
+            self._workspace_of = workspace_of
+            self._windows_on = windows_on
+
+    def _remove(self, address):
+        workspace = self._workspace_of.pop(address, None)
+        if workspace is None:
+            return
+        windows = self._windows_on.get(workspace)
+        if windows is not None:
+            windows.discard(address)
+            if not windows:
+                del self._windows_on[workspace]
+
+    def _add(self, address, workspace):
+        self._workspace_of[address] = workspace
+        self._windows_on.setdefault(workspace, set()).add(address)
+
+    def apply_event(self, name, data):
+        """
+        Patch the index from one socket2 event.
+
+        Returns True if the event was one the index understands.
+        """
+        if name == "openwindow":
+            # ADDRESS,WORKSPACENAME,CLASS,TITLE (the title may contain commas)
+            parts = data.split(",", 3)
+            if len(parts) < 3:
+                return False
+            address, workspace, window_class = parts[:3]
+            title = parts[3] if len(parts) > 3 else ""
+            if _is_ignored(window_class, title):
+                return True
+            with self._lock:
+                self._remove(_normalize_address(address))
+                self._add(_normalize_address(address), workspace)
+            return True
+        if name == "closewindow":
+            with self._lock:
+                self._remove(_normalize_address(data))
+            return True
+        if name == "movewindow":
+            # ADDRESS,WORKSPACENAME
+            address, _, workspace = data.partition(",")
+            address = _normalize_address(address)
+            with self._lock:
+                if address not in self._workspace_of:
+                    return True  # ignored or unknown window
+                self._remove(address)
+                self._add(address, workspace)
+            return True
+        return False
+
+    def occupied(self, workspace):
+        return workspace in self._windows_on
+
+    def snapshot(self):
+        with self._lock:
+            return {ws: sorted(addrs) for ws, addrs in self._windows_on.items()}
+
+    def diff(self, clients):
+        """Describe every difference between the index and `clients -j`."""
+        expected = WorkspaceIndex()
+        expected.rebuild(clients)
+        ours, theirs = self.snapshot(), expected.snapshot()
+        problems = []
+        for workspace in sorted(set(ours) | set(theirs)):
+            missing = set(theirs.get(workspace, ())) - set(ours.get(workspace, ()))
+            extra = set(ours.get(workspace, ())) - set(theirs.get(workspace, ()))
+            for address in sorted(missing):
+                problems.append(f"{workspace}: missing 0x{address}")
+            for address in sorted(extra):
+                problems.append(f"{workspace}: stale 0x{address}")
+        return problems
+
+    def dump(self):
+        lines = []
+        for workspace, addresses in sorted(self.snapshot().items()):
+            lines.append(f"{workspace}: {', '.join('0x' + a for a in addresses)}")
+        return "\n".join(lines) or "(no windows)"
+
+
+class MonitorIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._monitors = {}    # name -> Monitor
+        self.focused = None
+
+    def rebuild(self, monitors):
+        """Replace the index with the result of `monitors -j`."""
+        index = {}
+        focused = None
+        for monitor in monitors:
+            scale = monitor.get("scale") or 1.0
+            width, height = monitor["width"] / scale, monitor["height"] / scale
+            if monitor.get("transform", 0) % 2:
+                width, height = height, width  # rotated 90° or 270°
+            index[monitor["name"]] = Monitor(
+                monitor["name"], monitor["x"], monitor["y"], int(width), int(height),
+                monitor["activeWorkspace"]["name"],
+            )
+            if monitor.get("focused"):
+                focused = monitor["name"]
+        with self._lock:
+            self._monitors = index
+            self.focused = focused
+
+    def _set_workspace(self, name, workspace):
+        monitor = self._monitors.get(name)
+        if monitor is not None:
+            self._monitors[name] = monitor._replace(workspace=workspace)
+
+    def apply_event(self, name, data):
+        """
+        Patch the index from one socket2 event.
+
+        Returns True if the event was one the index understands.
+        """
+        if name == "workspace":
+            # The focused monitor switched workspace
+            with self._lock:
+                self._set_workspace(self.focused, data)
+            return True
+        if name == "focusedmon":
+            # MONITORNAME,WORKSPACENAME
+            monitor, _, workspace = data.partition(",")
+            with self._lock:
+                self.focused = monitor
+                self._set_workspace(monitor, workspace)
+            return True
+        return False
+
+    def get(self, name):
+        return self._monitors.get(name)
+
+    def __contains__(self, name):
+        return name in self._monitors
+
+    def active_workspaces(self):
+        """{monitor name: active workspace name}"""
+        with self._lock:
+            return {name: m.workspace for name, m in self._monitors.items()}
+
+    def dump(self):
+        lines = []
+        for name, m in sorted(self._monitors.items()):
+            focus = " (focused)" if name == self.focused else ""
+            lines.append(f"{name}{focus}: workspace {m.workspace}, "
+                         f"{m.width}x{m.height}+{m.x}+{m.y}")
+        return "\n".join(lines) or "(no monitors)"